@@ -1,270 +1,780 @@
 import math
+import multiprocessing
+import time
+
+import tracing
+from evaluation import PIECE_VALUE_TABLE, HAS_NUMPY, batch_child_scores
+from notation import line_uci
+from pieces import PAWN, KNIGHT, BISHOP, KING
+from search_stats import SearchStats
+from transposition import TranspositionTable, SharedTranspositionTable, EXACT, LOWER, UPPER
+
+
+class SearchTimeout(Exception):
+    """Бюджет поиска (время или узлы) исчерпан"""
+
+
+# Как часто (в узлах) сверяться с часами
+LIMIT_CHECK_INTERVAL = 512
+
+# Запас для delta pruning: взятие, которое даже с этим запасом не дотягивает
+# до alpha (beta для минимизирующей стороны), в quiescence не смотрим
+DELTA_MARGIN = 200
+PROMOTION_GAIN = 800
+
+MAX_PLY = 64
+
+# Мат: MATE_SCORE минус число полуходов от корня до мата, чтобы поиск
+# предпочитал быстрый мат и знал расстояние до него
+MATE_SCORE = 20000
+
+# Бонусы упорядочивания тихих ходов: ниже любых взятий (10000+),
+# история ограничена, чтобы не перебивать киллеры
+KILLER_BONUS = (9000, 8000)
+COUNTER_MOVE_BONUS = 7000
+HISTORY_LIMIT = 6000
+
+# Выигрыш по эндшпильной таблице: ниже найденного поиском мата (MATE_SCORE),
+# чем короче путь к мату, тем выше оценка. Все оценки выше по модулю - маты
+TABLEBASE_WIN = 19000
+
+# С какого числа тихих ходов пакетная оценка NumPy выгоднее поштучной.
+# Замер: python bench.py --eval --positions 200 (200 позиций из случайных партий,
+# по 20 повторов; batch_child_scores против push/_evaluate_board_fast/pop, время
+# на позицию по группам числа ходов). При 0-4 ходах NumPy медленнее (20 мкс
+# против 10), при 5-9 - в 1.1 раза быстрее, при 10-14 - в 1.9, при 30-34 - в 3.8.
+# Порог взят в середине группы 5-9, где выигрыш еще не покрывает лишние вызовы
+BATCH_MIN_MOVES = 8
+
+# Методы, время которых замеряется при ChessAI(profile=True): метод -> статья SearchStats
+PROFILED_METHODS = {
+    '_get_all_possible_moves': 'movegen',
+    '_get_captures': 'movegen',
+    '_is_check': 'legality',
+    '_evaluate_board_fast': 'eval',
+    '_batch_child_scores': 'eval',
+}
+
+
+def mate_in(value):
+    """Оценка -> число ходов до мата (больше нуля - ставим мат, меньше - получаем) или None"""
+    if value is None or abs(value) <= TABLEBASE_WIN:
+        return None
+    moves = (MATE_SCORE - abs(value) + 1) // 2
+    return moves if value > 0 else -moves
+
+
+def _score_to_tt(value, ply):
+    # В таблице мат хранится как расстояние от самой позиции, а не от корня:
+    # та же позиция встречается на разной глубине
+    if value > TABLEBASE_WIN:
+        return value + ply
+    if value < -TABLEBASE_WIN:
+        return value - ply
+    return value
+
+
+def _score_from_tt(value, ply):
+    if value > TABLEBASE_WIN:
+        return value - ply
+    if value < -TABLEBASE_WIN:
+        return value + ply
+    return value
 
 
 class ChessAI:
 
-    def __init__(self, depth=3, color='black'):
+    def __init__(self, depth=3, color='black', time_limit_ms=None, max_nodes=None, tt_size_mb=16,
+                 workers=1, batch_leaves=False, book=None, tablebases=None, profile=False):
         assert depth > 0
         assert color in ['white', 'black']
+        assert workers > 0
 
         self.depth = depth
         self.color = color
         self.opponent_color = 'white' if color == 'black' else 'black'
+        # Узлы последнего поиска: всего и из них - во вспомогательных процессах
         self.nodes_evaluated = 0
+        self.helper_nodes = 0
+        self.quiescence_nodes = 0
+
+        # Поиск идет итеративно до глубины depth, но не дольше бюджета
+        self.time_limit_ms = time_limit_ms
+        self.max_nodes = max_nodes
+        self._deadline = None
+        self._next_limit_check = 0
+        self._cancel_event = None
+        self._ponder_event = None
+        self._search_start = 0.0
+
+        # Таблица живет всю партию: между ходами только сменяется поколение.
+        # При workers > 1 (Lazy SMP) она лежит в общей памяти, и вспомогательные
+        # процессы ищут ту же позицию, делясь найденным через нее
+        self.workers = workers
+        if workers > 1:
+            self.transposition_table = SharedTranspositionTable(tt_size_mb)
+        else:
+            self.transposition_table = TranspositionTable(tt_size_mb)
+        self._pool = None
+        self._stop_event = None
+        self._helper_id = 0
+
+        # Пакетный режим: узлы на глубине 1 оценивают тихих потомков статически,
+        # одним вызовом NumPy (если он установлен), а взятия - через quiescence
+        self.batch_leaves = batch_leaves
+
+        # Дебютная книга (book.OpeningBook): известные позиции не считаем
+        self.book = book
+        # Эндшпильные таблицы (tablebase.Tablebases): при малом материале
+        # результат позиции берется из них, а не из поиска
+        self.tablebases = tablebases
+
+        # Эвристики упорядочивания тихих ходов: киллеры по ply,
+        # история [цвет][from * 64 + to] и ответ на предыдущий ход соперника
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        self.history = [[0] * 4096, [0] * 4096]
+        self.counter_moves = [None] * 4096
+        self._root_stack_size = 0
+
+        # Статистика отсечений: как часто отсекает первый же ход
+        self.beta_cutoffs = 0
+        self.first_move_cutoffs = 0
+
+        # Вызывается после каждой завершенной итерации: on_iteration(глубина, оценка, ход)
+        self.on_iteration = None
+
+        # Статистика последнего поиска (SearchStats) и узлы/время по итерациям
+        self.last_stats = None
+        self.nodes_per_depth = []
+        self.time_per_depth = []
+
+        # Замер времени по частям поиска: обертки ставятся на экземпляр, поэтому
+        # без profile горячие пути не платят ни за что
+        self.profile = profile
+        self._timings = {'movegen': 0.0, 'legality': 0.0, 'eval': 0.0}
+        if profile:
+            for name, bucket in PROFILED_METHODS.items():
+                setattr(self, name, self._timed(getattr(self, name), bucket))
+
+        self.piece_values = PIECE_VALUE_TABLE
+
+    def _timed(self, method, bucket):
+        timings = self._timings
+        clock = time.perf_counter
+
+        def timed(*args):
+            started = clock()
+            try:
+                return method(*args)
+            finally:
+                timings[bucket] += clock() - started
+        return timed
+
+    def set_color(self, color):
+        """Сменить сторону AI; оценки в таблице транспозиций - для старой стороны, она очищается"""
+        assert color in ['white', 'black']
+        if color != self.color:
+            self.color = color
+            self.opponent_color = 'white' if color == 'black' else 'black'
+            self.transposition_table.clear()
 
-        self.transposition_table = {}
-
-        self.piece_values = {
-            'Pawn': 100,
-            'Knight': 320,
-            'Bishop': 330,
-            'Rook': 500,
-            'Queen': 900,
-            'King': 20000
-        }
-
-        self.pawn_table = [
-            [0, 0, 0, 0, 0, 0, 0, 0],
-            [50, 50, 50, 50, 50, 50, 50, 50],
-            [10, 10, 20, 30, 30, 20, 10, 10],
-            [5, 5, 10, 25, 25, 10, 5, 5],
-            [0, 0, 0, 20, 20, 0, 0, 0],
-            [5, -5, -10, 0, 0, -10, -5, 5],
-            [5, 10, 10, -20, -20, 10, 10, 5],
-            [0, 0, 0, 0, 0, 0, 0, 0]
-        ]
-
-        self.knight_table = [
-            [-50, -40, -30, -30, -30, -30, -40, -50],
-            [-40, -20, 0, 0, 0, 0, -20, -40],
-            [-30, 0, 10, 15, 15, 10, 0, -30],
-            [-30, 5, 15, 20, 20, 15, 5, -30],
-            [-30, 0, 15, 20, 20, 15, 0, -30],
-            [-30, 5, 10, 15, 15, 10, 5, -30],
-            [-40, -20, 0, 5, 5, 0, -20, -40],
-            [-50, -40, -30, -30, -30, -30, -40, -50]
-        ]
-
-        self.king_table = [
-            [-30, -40, -40, -50, -50, -40, -40, -30],
-            [-30, -40, -40, -50, -50, -40, -40, -30],
-            [-30, -40, -40, -50, -50, -40, -40, -30],
-            [-30, -40, -40, -50, -50, -40, -40, -30],
-            [-20, -30, -30, -40, -40, -30, -30, -20],
-            [-10, -20, -20, -20, -20, -20, -20, -10],
-            [20, 20, 0, 0, 0, 0, 20, 20],
-            [20, 30, 10, 0, 0, 10, 30, 20]
-        ]
-
-    def get_best_move(self, board):
-        self.nodes_evaluated = 0
-        self.transposition_table.clear()
+    def get_best_move(self, board, cancel_event=None, ponder_event=None):
+        """Лучший ход для self.color; cancel_event (threading.Event) прерывает поиск.
 
-        best_move = None
-        best_value = -math.inf
-        alpha = -math.inf
-        beta = math.inf
+        ponder_event - поиск на времени соперника: пока событие не установлено,
+        бюджет времени не действует, а после него отсчитывается от начала поиска.
+        """
+        start = time.perf_counter()
+        self.transposition_table.new_search()
+        self._start_search(cancel_event, start, ponder_event)
 
         possible_moves = self._get_all_possible_moves(board, self.color)
 
         if not possible_moves:
+            self._finish_stats(board, None, None, 0, start)
             return None
 
-        possible_moves = self._order_moves_smart(board, possible_moves)
-
-        for from_pos, to_pos in possible_moves:
-            piece = board.get_piece(from_pos)
-            captured = board.get_piece(to_pos)
-            old_pos = piece.pos
-            old_has_moved = piece.has_moved
-
-            old_rook_state = None
-            if piece.name == 'King' and abs(to_pos[1] - from_pos[1]) == 2:
-                row = from_pos[0]
-                if to_pos[1] > from_pos[1]:
-                    rook = board.get_piece((row, 7))
-                    old_rook_state = (rook.pos, rook.has_moved) if rook else None
-                else:
-                    rook = board.get_piece((row, 0))
-                    old_rook_state = (rook.pos, rook.has_moved) if rook else None
-
-            board.move_piece(from_pos, to_pos)
-
-            is_capture = captured is not None
-            search_depth = self.depth if not is_capture else self.depth + 1
-
-            value = self._minimax_optimized(board, search_depth - 1, alpha, beta, False)
+        if self.book is not None and board.turn == self.color:
+            book_move = self.book.choose(board)
+            if book_move in possible_moves:
+                if tracing.search >= tracing.INFO:
+                    tracing.log('search', tracing.INFO, f"{self.color}: ход из книги {book_move}")
+                self._finish_stats(board, book_move, None, 0, start, 'book')
+                return book_move
+
+        tablebase_move = self._tablebase_move(board, possible_moves)
+        if tablebase_move is not None:
+            self._finish_stats(board, tablebase_move, None, 0, start, 'tablebase')
+            return tablebase_move
+
+        root_moves = self._order_moves_smart(board, possible_moves)
+        helpers = self._start_helpers(board) if self.workers > 1 else []
+        best_move, best_value, completed_depth = self._iterative_deepening(board, root_moves)
+        if helpers:
+            best_move, best_value, completed_depth = self._join_helpers(
+                helpers, best_move, best_value, completed_depth)
+
+        stats = self._finish_stats(board, best_move, best_value, completed_depth, start)
+        if tracing.search >= tracing.INFO:
+            tracing.log('search', tracing.INFO,
+                        f"{self.color}: {stats.nodes} позиций, глубина {completed_depth}, "
+                        f"{stats.elapsed:.2f} с, оценка: {best_value}, "
+                        f"отсечения первым ходом: {stats.first_move_cutoff_rate:.0%}")
+        return best_move
 
-            board.set_piece(from_pos, piece)
-            board.set_piece(to_pos, captured)
-            piece.pos = old_pos
-            piece.has_moved = old_has_moved
+    def _finish_stats(self, board, move, value, depth, start, source='search'):
+        """Собрать SearchStats законченного поиска в self.last_stats"""
+        stats = SearchStats(self.color)
+        stats.source = source
+        stats.move = move
+        stats.value = value
+        stats.depth = depth
+        stats.elapsed = time.perf_counter() - start
+        stats.nodes = self.nodes_evaluated - self.helper_nodes
+        stats.helper_nodes = self.helper_nodes
+        stats.quiescence_nodes = self.quiescence_nodes
+        stats.nodes_per_depth = list(self.nodes_per_depth)
+        stats.time_per_depth = [round(seconds, 4) for seconds in self.time_per_depth]
+        table = self.transposition_table
+        stats.tt_probes, stats.tt_hits = table.probes, table.hits
+        stats.tt_collisions, stats.tt_stores = table.collisions, table.stores
+        stats.beta_cutoffs = self.beta_cutoffs
+        stats.first_move_cutoffs = self.first_move_cutoffs
+        if self.profile:
+            stats.movegen_time = self._timings['movegen']
+            stats.legality_time = self._timings['legality']
+            stats.eval_time = self._timings['eval']
+        if move is not None:
+            stats.pv_source = self._pv_source(board, move, max(depth, 1))
+        self.last_stats = stats
+        return stats
+
+    def _pv_source(self, board, move, depth):
+        """Отложенный PV для SearchStats: позиция запоминается сейчас, а обход
+        таблицы транспозиций делается, только если PV понадобится"""
+        board_class = type(board)
+        fen = board.fen()
+
+        def principal_variation():
+            root = board_class(fen)
+            return line_uci(root, self.principal_variation(root, move, depth))
+        return principal_variation
+
+    def close(self):
+        """Остановить вспомогательные процессы, освободить общую таблицу, закрыть книгу и таблицы"""
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+        if self.workers > 1:
+            self.transposition_table.close()
+        if self.book is not None:
+            self.book.close()
+            self.book = None
+        if self.tablebases is not None:
+            self.tablebases.close()
+            self.tablebases = None
+
+    def principal_variation(self, board, move, max_length=MAX_PLY):
+        """Главный вариант: ход move и продолжение по лучшим ходам из таблицы транспозиций"""
+        table = self.transposition_table
+        # Обход варианта не должен попадать в статистику обращений к таблице
+        counters = table.probes, table.hits, table.collisions
+        pv = [move]
+        board.push(move)
+        seen = {board.zobrist_key}
+        while len(pv) < max_length:
+            entry = self.transposition_table.probe(board.zobrist_key)
+            if entry is None or entry[4] is None or entry[4] not in board.legal_moves(board.turn):
+                break
+            board.push(entry[4])
+            pv.append(entry[4])
+            if board.zobrist_key in seen:
+                break
+            seen.add(board.zobrist_key)
+        for _ in pv:
+            board.pop()
+        table.probes, table.hits, table.collisions = counters
+        return pv
+
+    def predicted_reply(self, board):
+        """Ожидаемый ответ соперника из таблицы транспозиций (после хода AI) или None"""
+        entry = self.transposition_table.probe(board.zobrist_key)
+        if entry is None or entry[4] is None:
+            return None
+        move = entry[4]
+        return move if move in board.legal_moves(board.turn) else None
 
-            if old_rook_state:
-                row = from_pos[0]
-                if to_pos[1] > from_pos[1]:  # Короткая
-                    rook = board.get_piece((row, 5))
-                    if rook:
-                        board.set_piece((row, 7), rook)
-                        board.set_piece((row, 5), None)
-                        rook.pos, rook.has_moved = old_rook_state
-                else:
-                    rook = board.get_piece((row, 3))
-                    if rook:
-                        board.set_piece((row, 0), rook)
-                        board.set_piece((row, 3), None)
-                        rook.pos, rook.has_moved = old_rook_state
+    def _start_search(self, cancel_event, start, ponder_event=None):
+        self._cancel_event = cancel_event
+        self.nodes_evaluated = 0
+        self.helper_nodes = 0
+        self.quiescence_nodes = 0
+        self.nodes_per_depth = []
+        self.time_per_depth = []
+        for bucket in self._timings:
+            self._timings[bucket] = 0.0
+        self._reset_ordering_heuristics()
+        self._search_start = start
+        self._ponder_event = ponder_event
+        if ponder_event is not None and not ponder_event.is_set():
+            self._deadline = None
+        else:
+            self._deadline = start + self.time_limit_ms / 1000 if self.time_limit_ms else None
+        self._next_limit_check = 0
+        self._schedule_limit_check()
+
+    def _iterative_deepening(self, board, root_moves):
+        """Итерации глубины 1..depth; возвращает (ход, оценка, завершенная глубина)"""
+        if self._helper_id:
+            # Вспомогательные процессы начинают с другого хода корня,
+            # чтобы не идти след в след за главным
+            shift = self._helper_id % len(root_moves)
+            root_moves = root_moves[shift:] + root_moves[:shift]
+        best_move = root_moves[0]
+        best_value = None
+        completed_depth = 0
+        root_stack_size = len(board.undo_stack)
+        self._root_stack_size = root_stack_size
+
+        for depth in range(1, self.depth + 1):
+            iteration_nodes = self.nodes_evaluated
+            iteration_start = time.perf_counter()
+            try:
+                value, root_moves = self._search_root(board, depth, root_moves)
+            except SearchTimeout:
+                # Прерванная итерация не в счет: возвращаем доску в корень
+                while len(board.undo_stack) > root_stack_size:
+                    board.pop()
+                break
+            best_move = root_moves[0]
+            best_value = value
+            completed_depth = depth
+            self.nodes_per_depth.append(self.nodes_evaluated - iteration_nodes)
+            self.time_per_depth.append(time.perf_counter() - iteration_start)
+            if self.on_iteration is not None:
+                self.on_iteration(depth, value, best_move)
+            if tracing.search >= tracing.DEBUG:
+                tracing.log('search', tracing.DEBUG,
+                            f"{self.color}: глубина {depth}, ход {best_move}, оценка {value}, "
+                            f"{self.nodes_evaluated} позиций")
+        return best_move, best_value, completed_depth
+
+    def _start_helpers(self, board):
+        """Запустить workers - 1 вспомогательных поисков той же позиции (Lazy SMP)"""
+        if self._pool is None:
+            self._stop_event = multiprocessing.Event()
+            self._pool = multiprocessing.Pool(self.workers - 1, initializer=_smp_init,
+                                              initargs=(self._stop_event, self.transposition_table,
+                                                        self.tablebases))
+        self._stop_event.clear()
+        helpers = []
+        # Задания пул отправляет из своего потока, когда главный поиск уже
+        # делает ходы на board: передаем позицию строкой, снятой сейчас
+        position = (type(board), board.fen())
+        for helper_id in range(1, self.workers):
+            # Половина помощников идет на ход глубже: так главный поиск
+            # чаще находит в таблице готовые оценки
+            task = (position, self.color, self.depth + helper_id % 2, helper_id,
+                    self.transposition_table.age, self.time_limit_ms, self.max_nodes, self.batch_leaves)
+            helpers.append(self._pool.apply_async(_smp_search, (task,)))
+        return helpers
+
+    def _join_helpers(self, helpers, best_move, best_value, completed_depth):
+        """Остановить помощников и взять ход самой глубокой завершенной итерации"""
+        self._stop_event.set()
+        for helper in helpers:
+            move, value, depth, nodes = helper.get()
+            self.nodes_evaluated += nodes
+            self.helper_nodes += nodes
+            if depth > completed_depth and move is not None:
+                best_move, best_value, completed_depth = move, value, depth
+        return best_move, best_value, completed_depth
+
+    def first_move_cutoff_rate(self):
+        """Доля бета-отсечений, которые дал первый же ход узла"""
+        if not self.beta_cutoffs:
+            return 0.0
+        return self.first_move_cutoffs / self.beta_cutoffs
+
+    def _reset_ordering_heuristics(self):
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        # История полезна и на следующем ходу, но старые заслуги затухают
+        for table in self.history:
+            for index in range(4096):
+                table[index] >>= 1
+        self.beta_cutoffs = 0
+        self.first_move_cutoffs = 0
+
+    def _record_cutoff(self, board, move, depth, ply, color, move_index):
+        self.beta_cutoffs += 1
+        if move_index == 0:
+            self.first_move_cutoffs += 1
+
+        # Взятия (включая взятие на проходе) и так идут первыми,
+        # запоминаем только тихие ходы
+        if board.get_piece(move[1]) is not None or len(move) > 2:
+            return
+        if move[1] == board.en_passant and board.get_piece(move[0]).kind == PAWN:
+            return
+
+        if ply < MAX_PLY:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+
+        (from_row, from_col), (to_row, to_col) = move[0], move[1]
+        index = (from_row * 8 + from_col) * 64 + to_row * 8 + to_col
+        self.history[0 if color == 'white' else 1][index] += depth * depth
+
+        if board.undo_stack:
+            previous = board.undo_stack[-1]
+            (prev_from_row, prev_from_col), (prev_to_row, prev_to_col) = previous[0], previous[1]
+            self.counter_moves[(prev_from_row * 8 + prev_from_col) * 64 + prev_to_row * 8 + prev_to_col] = move
+
+    def _search_root(self, board, depth, root_moves):
+        """Одна итерация: оценка всех ходов корня на глубину depth.
+
+        Возвращает лучшую оценку и ходы, отсортированные по оценкам этой
+        итерации, - так лучший ход идет первым в следующей.
+        """
+        alpha = -math.inf
+        beta = math.inf
+        scored = []
 
-            if value > best_value:
-                best_value = value
-                best_move = (from_pos, to_pos)
+        for index, (from_pos, to_pos) in enumerate(root_moves):
+            board.push((from_pos, to_pos))
+            value = self._minimax_optimized(board, depth - 1, alpha, beta, False)
+            board.pop()
 
+            # Порядок сортировки устойчив: при равных оценках раньше идет ход,
+            # который стоял выше в прошлой итерации
+            scored.append((value, -index, (from_pos, to_pos)))
             alpha = max(alpha, value)
 
-            if beta <= alpha:
-                break
-
-        print(f"AI: {self.nodes_evaluated} позиций, оценка: {best_value}")
-        return best_move
+        scored.sort(reverse=True)
+        return scored[0][0], [move for _, _, move in scored]
+
+    def _schedule_limit_check(self):
+        self._next_limit_check = self.nodes_evaluated + LIMIT_CHECK_INTERVAL
+        if self.max_nodes is not None:
+            self._next_limit_check = min(self._next_limit_check, self.max_nodes)
+
+    def _check_limits(self):
+        self._schedule_limit_check()
+        if self.max_nodes is not None and self.nodes_evaluated >= self.max_nodes:
+            raise SearchTimeout()
+        if self._ponder_event is not None and self._ponder_event.is_set():
+            # Соперник сыграл ожидаемый ход: дальше обычный бюджет времени
+            self._ponder_event = None
+            if self.time_limit_ms:
+                self._deadline = self._search_start + self.time_limit_ms / 1000
+        if self._deadline is not None and time.perf_counter() >= self._deadline:
+            raise SearchTimeout()
+        if self._cancel_event is not None and self._cancel_event.is_set():
+            raise SearchTimeout()
 
     def _minimax_optimized(self, board, depth, alpha, beta, is_maximizing):
         self.nodes_evaluated += 1
-
-        board_hash = self._get_board_hash(board)
-        if board_hash in self.transposition_table:
-            cached_depth, cached_value = self.transposition_table[board_hash]
+        if self.nodes_evaluated >= self._next_limit_check:
+            self._check_limits()
+
+        tablebases = self.tablebases
+        if tablebases is not None and board.piece_count <= tablebases.max_pieces:
+            result = tablebases.probe(board)
+            if result is not None:
+                return self._tablebase_score(result, is_maximizing)
+
+        ply = len(board.undo_stack) - self._root_stack_size
+        board_hash = board.zobrist_key
+        alpha_orig, beta_orig = alpha, beta
+        tt_move = None
+        entry = self.transposition_table.probe(board_hash)
+        if entry is not None:
+            _, cached_depth, cached_value, cached_flag, tt_move, _ = entry
             if cached_depth >= depth:
-                return cached_value
+                cached_value = _score_from_tt(cached_value, ply)
+                if cached_flag == EXACT:
+                    return cached_value
+                if cached_flag == LOWER:
+                    alpha = max(alpha, cached_value)
+                else:
+                    beta = min(beta, cached_value)
+                if alpha >= beta:
+                    return cached_value
 
         if depth == 0:
-            eval_score = self._evaluate_board_fast(board)
-            self.transposition_table[board_hash] = (depth, eval_score)
-            return eval_score
+            return self._quiescence(board, alpha, beta, is_maximizing)
 
         color = self.color if is_maximizing else self.opponent_color
 
-        if board.is_checkmate(color):
-            return -20000 if is_maximizing else 20000
-
         possible_moves = self._get_all_possible_moves(board, color)
 
         if not possible_moves:
+            if self._is_check(board, color):
+                return self._mated_score(board, is_maximizing)
             return 0
 
-        possible_moves = self._order_moves_smart(board, possible_moves)
+        if depth == 1 and self.batch_leaves:
+            # Тихие ходы оценены статически, без поиска: в таблицу такой результат не пишем
+            return self._evaluate_frontier(board, possible_moves, alpha, beta, is_maximizing)
 
-        if is_maximizing:
-            max_eval = -math.inf
-            for from_pos, to_pos in possible_moves:
-                piece = board.get_piece(from_pos)
-                captured = board.get_piece(to_pos)
-                old_pos = piece.pos
-                board.move_piece(from_pos, to_pos)
+        ordered_moves = self._iter_ordered_moves(board, possible_moves, tt_move, ply, color)
+        best_move = None
 
+        if is_maximizing:
+            best_eval = -math.inf
+            for index, move in enumerate(ordered_moves):
+                board.push(move)
                 eval = self._minimax_optimized(board, depth - 1, alpha, beta, False)
+                board.pop()
 
-                board.set_piece(from_pos, piece)
-                board.set_piece(to_pos, captured)
-                piece.pos = old_pos
-
-                max_eval = max(max_eval, eval)
+                if eval > best_eval:
+                    best_eval = eval
+                    best_move = move
                 alpha = max(alpha, eval)
 
                 if beta <= alpha:
+                    self._record_cutoff(board, move, depth, ply, color, index)
                     break
-
-            self.transposition_table[board_hash] = (depth, max_eval)
-            return max_eval
         else:
-            min_eval = math.inf
-            for from_pos, to_pos in possible_moves:
-                piece = board.get_piece(from_pos)
-                captured = board.get_piece(to_pos)
-                old_pos = piece.pos
-                board.move_piece(from_pos, to_pos)
-
+            best_eval = math.inf
+            for index, move in enumerate(ordered_moves):
+                board.push(move)
                 eval = self._minimax_optimized(board, depth - 1, alpha, beta, True)
+                board.pop()
 
-                board.set_piece(from_pos, piece)
-                board.set_piece(to_pos, captured)
-                piece.pos = old_pos
-
-                min_eval = min(min_eval, eval)
+                if eval < best_eval:
+                    best_eval = eval
+                    best_move = move
                 beta = min(beta, eval)
 
                 if beta <= alpha:
+                    self._record_cutoff(board, move, depth, ply, color, index)
                     break
 
-            self.transposition_table[board_hash] = (depth, min_eval)
-            return min_eval
+        if best_eval <= alpha_orig:
+            flag = UPPER
+        elif best_eval >= beta_orig:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.transposition_table.store(board_hash, depth, _score_to_tt(best_eval, ply), flag, best_move)
+        return best_eval
+
+    def _mated_score(self, board, is_maximizing):
+        """Оценка позиции, где ходящей стороне мат: чем дальше от корня, тем меньше по модулю"""
+        score = MATE_SCORE - (len(board.undo_stack) - self._root_stack_size)
+        return -score if is_maximizing else score
+
+    def _tablebase_score(self, result, is_maximizing):
+        """Результат таблицы для стороны, которая ходит, -> оценка для self.color"""
+        outcome, plies = result
+        score = outcome * (TABLEBASE_WIN - plies) if outcome else 0
+        return score if is_maximizing else -score
+
+    def _tablebase_move(self, board, moves):
+        """Лучший ход корня по таблицам: самый быстрый выигрыш, иначе ничья,
+        иначе самое долгое сопротивление; None, если таблицы позицию не покрывают"""
+        tablebases = self.tablebases
+        if tablebases is None or board.piece_count > tablebases.max_pieces or board.turn != self.color:
+            return None
+        if tablebases.probe(board) is None:
+            return None
+        best_move = None
+        best_rank = None
+        for move in moves:
+            board.push(move)
+            result = tablebases.probe(board)
+            board.pop()
+            if result is None:
+                return None
+            outcome, plies = result
+            # Исход для соперника после хода: его проигрыш для нас лучше всего
+            rank = (outcome, plies if outcome < 0 else -plies)
+            if best_rank is None or rank < best_rank:
+                best_rank = rank
+                best_move = move
+        if tracing.search >= tracing.INFO:
+            tracing.log('search', tracing.INFO, f"{self.color}: ход по таблицам {best_move} {best_rank}")
+        return best_move
+
+    def _evaluate_frontier(self, board, moves, alpha, beta, is_maximizing):
+        """Оценка узла глубины 1 в пакетном режиме.
+
+        Взятия и превращения досчитываются quiescence, как в обычном поиске;
+        тихие ходы (в том числе шахи) оцениваются статически - одним вызовом
+        NumPy, если их не меньше BATCH_MIN_MOVES.
+        """
+        quiet = []
+        tactical = []
+        for move in moves:
+            (tactical if self._capture_gain(board, move) else quiet).append(move)
+
+        best_eval = -math.inf if is_maximizing else math.inf
+        self.nodes_evaluated += len(quiet)
+        if quiet:
+            if HAS_NUMPY and len(quiet) >= BATCH_MIN_MOVES:
+                scores = self._batch_child_scores(board, quiet)
+                best_eval = int(scores.max() if is_maximizing else scores.min())
+            else:
+                for move in quiet:
+                    board.push(move)
+                    eval = self._evaluate_board_fast(board)
+                    board.pop()
+                    best_eval = max(best_eval, eval) if is_maximizing else min(best_eval, eval)
+            if is_maximizing:
+                alpha = max(alpha, best_eval)
+            else:
+                beta = min(beta, best_eval)
+
+        for move in tactical:
+            if beta <= alpha:
+                break
+            board.push(move)
+            eval = self._quiescence(board, alpha, beta, not is_maximizing)
+            board.pop()
+            if is_maximizing:
+                best_eval = max(best_eval, eval)
+                alpha = max(alpha, eval)
+            else:
+                best_eval = min(best_eval, eval)
+                beta = min(beta, eval)
+        return best_eval
+
+    def _quiescence(self, board, alpha, beta, is_maximizing):
+        """Поиск только по взятиям и превращениям, чтобы не оценивать позицию посреди размена"""
+        self.nodes_evaluated += 1
+        self.quiescence_nodes += 1
+        if self.nodes_evaluated >= self._next_limit_check:
+            self._check_limits()
+
+        color = self.color if is_maximizing else self.opponent_color
+
+        if self._is_check(board, color):
+            # Под шахом стоять нельзя: смотрим все ответы
+            moves = self._get_all_possible_moves(board, color)
+            if not moves:
+                return self._mated_score(board, is_maximizing)
+            stand_pat = None
+            best_eval = -math.inf if is_maximizing else math.inf
+        else:
+            stand_pat = self._evaluate_board_fast(board)
+            if is_maximizing:
+                if stand_pat >= beta:
+                    return stand_pat
+                alpha = max(alpha, stand_pat)
+            else:
+                if stand_pat <= alpha:
+                    return stand_pat
+                beta = min(beta, stand_pat)
+            best_eval = stand_pat
+            moves = self._get_captures(board, color)
+
+        scored = []
+        for move in moves:
+            gain = self._capture_gain(board, move)
+            if stand_pat is not None:
+                if is_maximizing and stand_pat + gain + DELTA_MARGIN <= alpha:
+                    continue
+                if not is_maximizing and stand_pat - gain - DELTA_MARGIN >= beta:
+                    continue
+            attacker = board.get_piece(move[0])
+            scored.append((gain * 10 - self.piece_values[attacker.kind] // 10, move))
+        scored.sort(key=lambda item: item[0], reverse=True)
+
+        for _, move in scored:
+            board.push(move)
+            eval = self._quiescence(board, alpha, beta, not is_maximizing)
+            board.pop()
+
+            if is_maximizing:
+                best_eval = max(best_eval, eval)
+                alpha = max(alpha, eval)
+            else:
+                best_eval = min(best_eval, eval)
+                beta = min(beta, eval)
+            if beta <= alpha:
+                break
+
+        return best_eval
+
+    def _capture_gain(self, board, move):
+        """Материал, который приносит ход: цена взятой фигуры плюс выигрыш от превращения"""
+        from_pos, to_pos = move[0], move[1]
+        target = board.get_piece(to_pos)
+        gain = self.piece_values[target.kind] if target else 0
+        piece = board.get_piece(from_pos)
+        if piece.kind == PAWN:
+            if to_pos[0] in (0, 7):
+                gain += PROMOTION_GAIN
+            elif not target and to_pos[1] != from_pos[1]:
+                gain += self.piece_values[PAWN]
+        return gain
 
     def _evaluate_board_fast(self, board):
-        score = 0
-
-        # Только материал и простые позиционные бонусы
-        for row in range(8):
-            for col in range(8):
-                piece = board.get_piece((row, col))
-                if piece:
-                    piece_value = self._get_piece_value_fast(piece, row, col)
-
-                    if piece.color == self.color:
-                        score += piece_value
-                    else:
-                        score -= piece_value
-
-        return score
-
-    def _get_piece_value_fast(self, piece, row, col):
-        base_value = self.piece_values[piece.name]
-        positional_bonus = 0
-
-        if piece.name == 'Pawn':
-            positional_bonus = self.pawn_table[row if piece.color == 'white' else 7 - row][col]
-        elif piece.name == 'Knight':
-            positional_bonus = self.knight_table[row][col]
-        elif piece.name == 'King':
-            positional_bonus = self.king_table[row if piece.color == 'white' else 7 - row][col]
-
-        return base_value + positional_bonus
-
-    def _get_board_hash(self, board):
-        board_str = ""
-        for row in range(8):
-            for col in range(8):
-                piece = board.get_piece((row, col))
-                if piece:
-                    board_str += f"{piece.name[0]}{piece.color[0]}"
-                else:
-                    board_str += "."
-        return hash(board_str)
+        # Материал и позиционные бонусы доска считает сама при каждом ходе
+        score = board.score
+        return score[0] - score[1] if self.color == 'white' else score[1] - score[0]
 
     def _get_all_possible_moves(self, board, color):
-        moves = []
-        for row in range(8):
-            for col in range(8):
-                piece = board.get_piece((row, col))
-                if piece and piece.color == color:
-                    valid_moves = piece.get_valid_moves(board)
-                    for move in valid_moves:
-                        if board.is_legal_move((row, col), move, color):
-                            moves.append(((row, col), move))
-        return moves
-
-    def _order_moves_smart(self, board, moves):
+        return board.legal_moves(color)
+
+    def _get_captures(self, board, color):
+        return board.legal_captures(color)
+
+    def _is_check(self, board, color):
+        return board.is_check(color)
+
+    def _batch_child_scores(self, board, moves):
+        return batch_child_scores(board, moves, self.color)
+
+    def _iter_ordered_moves(self, board, moves, tt_move, ply, color):
+        """Ход из таблицы транспозиций отдаем сразу, остальные сортируем,
+        только если он не дал отсечения"""
+        if tt_move is not None and tt_move in moves:
+            yield tt_move
+            moves = [move for move in moves if move != tt_move]
+        yield from self._order_moves_smart(board, moves, ply=ply, color=color)
+
+    def _order_moves_smart(self, board, moves, ply=None, color=None):
+        if not moves:
+            return moves
+        if color is None:
+            color = board.get_piece(moves[0][0]).color
+        opponent_color = 'black' if color == 'white' else 'white'
+
+        killers = self.killers[ply] if ply is not None and ply < MAX_PLY else (None, None)
+        history = self.history[0 if color == 'white' else 1]
+        counter_move = None
+        if ply is not None and board.undo_stack:
+            previous = board.undo_stack[-1]
+            (prev_from_row, prev_from_col), (prev_to_row, prev_to_col) = previous[0], previous[1]
+            counter_move = self.counter_moves[(prev_from_row * 8 + prev_from_col) * 64
+                                              + prev_to_row * 8 + prev_to_col]
 
         def move_priority(move):
-            from_pos, to_pos = move
+            from_pos, to_pos = move[0], move[1]
             score = 0
 
             piece = board.get_piece(from_pos)
             target = board.get_piece(to_pos)
 
-            if piece.name == 'King' and abs(to_pos[1] - from_pos[1]) == 2:
+            if piece.kind == KING and abs(to_pos[1] - from_pos[1]) == 2:
                 score += 5000
 
             if target:
-                score += 10000 + self.piece_values[target.name] - self.piece_values[piece.name] // 10
+                score += 10000 + self.piece_values[target.kind] - self.piece_values[piece.kind] // 10
+            else:
+                if move == killers[0]:
+                    score += KILLER_BONUS[0]
+                elif move == killers[1]:
+                    score += KILLER_BONUS[1]
+                elif move == counter_move:
+                    score += COUNTER_MOVE_BONUS
+                score += min(history[(from_pos[0] * 8 + from_pos[1]) * 64 + to_pos[0] * 8 + to_pos[1]],
+                             HISTORY_LIMIT)
 
             row, col = to_pos
             if 3 <= row <= 4 and 3 <= col <= 4:
@@ -272,9 +782,49 @@ class ChessAI:
             elif 2 <= row <= 5 and 2 <= col <= 5:
                 score += 20
 
-            if piece.name in ['Knight', 'Bishop'] and not piece.has_moved:
+            if piece.kind in (KNIGHT, BISHOP) and not piece.has_moved:
                 score += 30
 
+            # Тихий ход на битое поле, скорее всего, просто теряет фигуру
+            if not target and board.is_square_attacked(to_pos, opponent_color):
+                score -= self.piece_values[piece.kind] // 10
+
             return score
 
         return sorted(moves, key=move_priority, reverse=True)
+
+
+# Состояние вспомогательного процесса Lazy SMP
+_smp_stop_event = None
+_smp_table = None
+_smp_tablebases = None
+_smp_ai = None
+
+
+def _smp_init(stop_event, table, tablebases):
+    global _smp_stop_event, _smp_table, _smp_tablebases
+    _smp_stop_event = stop_event
+    _smp_table = table
+    _smp_tablebases = tablebases
+
+
+def _smp_search(task):
+    """Поиск во вспомогательном процессе: (ход, оценка, глубина, узлы)"""
+    global _smp_ai
+    (board_class, fen), color, depth, helper_id, age, time_limit_ms, max_nodes, batch_leaves = task
+    board = board_class(fen)
+    if _smp_ai is None or _smp_ai.color != color:
+        _smp_ai = ChessAI(depth, color, tt_size_mb=1)
+        _smp_ai.transposition_table = _smp_table
+        _smp_ai.tablebases = _smp_tablebases
+    _smp_ai.depth = depth
+    _smp_ai.time_limit_ms = time_limit_ms
+    _smp_ai.max_nodes = max_nodes
+    _smp_ai.batch_leaves = batch_leaves
+    _smp_ai._helper_id = helper_id
+    _smp_table.age = age
+    _smp_ai._start_search(_smp_stop_event, time.perf_counter())
+
+    root_moves = _smp_ai._order_moves_smart(board, _smp_ai._get_all_possible_moves(board, color))
+    move, value, completed_depth = _smp_ai._iterative_deepening(board, root_moves)
+    return move, value, completed_depth, _smp_ai.nodes_evaluated
@@ -0,0 +1,78 @@
+import copy
+import threading
+from concurrent.futures import Future
+
+
+class AIWorker:
+    """Поиск хода ChessAI в фоновом потоке.
+
+    start() возвращает Future с ходом (или None, если поиск отменили).
+    Поиск идет на копии доски, поэтому отрисовка может читать основную
+    доску, пока движок думает. Таблица транспозиций и эвристики ChessAI
+    общие для всех поисков этого воркера.
+
+    Pondering: start(board, ponder_move=ход) ищет ответ на ожидаемый ход
+    соперника, пока тот думает. Если соперник сыграл его - ponder_hit(),
+    и тот же Future скоро получит ход; иначе - cancel(wait=True).
+    """
+
+    def __init__(self, ai):
+        self.ai = ai
+        self._thread = None
+        self._cancel_event = None
+        self._ponder_event = None
+        self.ponder_move = None
+
+    @property
+    def busy(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def pondering(self):
+        return self.ponder_move is not None and not self._ponder_event.is_set()
+
+    def start(self, board, callback=None, ponder_move=None):
+        """Запустить поиск; callback(move) вызывается из потока поиска"""
+        assert not self.busy, "Поиск уже идет"
+        future = Future()
+        future.set_running_or_notify_cancel()
+        if callback is not None:
+            future.add_done_callback(lambda done: callback(done.result()))
+
+        board = copy.deepcopy(board)
+        self.ponder_move = ponder_move
+        self._ponder_event = None
+        if ponder_move is not None:
+            board.push(ponder_move)
+            self._ponder_event = threading.Event()
+
+        self._cancel_event = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(board, future, self._cancel_event, self._ponder_event),
+            name='chess-ai',
+            daemon=True,
+        )
+        self._thread.start()
+        return future
+
+    def ponder_hit(self):
+        """Соперник сыграл ожидаемый ход: поиск продолжается уже как обычный"""
+        assert self.pondering, "Нет поиска на время соперника"
+        self._ponder_event.set()
+
+    def cancel(self, wait=False):
+        """Прервать текущий поиск; его Future получит None"""
+        self.ponder_move = None
+        if self._cancel_event is not None:
+            self._cancel_event.set()
+        if wait and self._thread is not None:
+            self._thread.join()
+
+    def _run(self, board, future, cancel_event, ponder_event):
+        try:
+            move = self.ai.get_best_move(board, cancel_event=cancel_event, ponder_event=ponder_event)
+        except Exception as error:
+            future.set_exception(error)
+            return
+        future.set_result(None if cancel_event.is_set() else move)
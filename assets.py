@@ -0,0 +1,105 @@
+import pygame
+
+PIECE_SYMBOLS = {
+    'white': {'King': '♔', 'Queen': '♕', 'Rook': '♖',
+              'Bishop': '♗', 'Knight': '♘', 'Pawn': '♙'},
+    'black': {'King': '♚', 'Queen': '♛', 'Rook': '♜',
+              'Bishop': '♝', 'Knight': '♞', 'Pawn': '♟'}
+}
+
+# Шрифты с шахматными символами по порядку предпочтения
+GLYPH_FONTS = 'segoeuisymbol,dejavusans'
+
+# Размер символа фигуры относительно клетки
+GLYPH_SCALE = 0.7
+
+_OUTLINE_OFFSETS = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+
+# Кэши: шрифты по (имя, размер), готовые надписи по (текст, размер, цвет),
+# затемнения по (размер, прозрачность, цвет), символы фигур по (цвет, фигура)
+# для одного размера клетки
+_fonts = {}
+_texts = {}
+_overlays = {}
+_glyphs = {}
+_glyph_square_size = None
+
+
+def font(size, name=None):
+    """Шрифт нужного размера; поиск системного шрифта выполняется один раз"""
+    key = (name, size)
+    cached = _fonts.get(key)
+    if cached is None:
+        if name is None:
+            cached = pygame.font.Font(None, size)
+        else:
+            try:
+                cached = pygame.font.SysFont(name, size)
+            except Exception:
+                cached = pygame.font.Font(None, size)
+        _fonts[key] = cached
+    return cached
+
+
+def text(message, size, color):
+    """Отрисованная надпись шрифтом по умолчанию"""
+    key = (message, size, color)
+    surface = _texts.get(key)
+    if surface is None:
+        surface = font(size).render(message, True, color)
+        _texts[key] = surface
+    return surface
+
+
+def overlay(size, alpha, color=(0, 0, 0)):
+    """Полупрозрачная заливка поверх экрана"""
+    key = (size, alpha, color)
+    surface = _overlays.get(key)
+    if surface is None:
+        surface = pygame.Surface(size)
+        surface.set_alpha(alpha)
+        surface.fill(color)
+        _overlays[key] = surface
+    return surface
+
+
+def piece_glyph(color, name, square_size):
+    """Символ фигуры с контуром, отрисованный один раз для размера клетки.
+
+    При смене размера клетки кэш символов сбрасывается.
+    """
+    global _glyph_square_size
+    if square_size != _glyph_square_size:
+        _glyphs.clear()
+        _glyph_square_size = square_size
+
+    surface = _glyphs.get((color, name))
+    if surface is None:
+        surface = _render_glyph(color, name, square_size)
+        _glyphs[(color, name)] = surface
+    return surface
+
+
+def _render_glyph(color, name, square_size):
+    glyph_font = font(int(square_size * GLYPH_SCALE), GLYPH_FONTS)
+    symbol = PIECE_SYMBOLS[color][name]
+    fill, outline_color = ((255, 255, 255), (0, 0, 0)) if color == 'white' else ((0, 0, 0), (255, 255, 255))
+
+    face = glyph_font.render(symbol, True, fill)
+    outline = glyph_font.render(symbol, True, outline_color)
+    # Поле в 1 пиксель с каждой стороны под контур
+    surface = pygame.Surface((face.get_width() + 2, face.get_height() + 2), pygame.SRCALPHA)
+    for dx, dy in _OUTLINE_OFFSETS:
+        surface.blit(outline, (1 + dx, 1 + dy))
+    surface.blit(face, (1, 1))
+    return surface
+
+
+def clear():
+    """Сбросить все кэши (например, после pygame.quit)"""
+    global _glyph_square_size
+    _fonts.clear()
+    _texts.clear()
+    _overlays.clear()
+    _glyphs.clear()
+    _glyph_square_size = None
@@ -0,0 +1,139 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+from ai_player import ChessAI
+from bitboard import BitboardBoard
+from board import START_FEN
+from evaluation import HAS_NUMPY, batch_child_scores
+
+# Позиции для замеров поиска: дебют, миттельшпиль с тактикой, эндшпиль
+BENCH_POSITIONS = [
+    ('startpos', START_FEN),
+    ('italian', 'r1bqk1nr/pppp1ppp/2n5/2b1p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4'),
+    ('kiwipete', 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1'),
+    ('endgame', '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1'),
+]
+
+
+def time_to_depth(fen, depth, workers):
+    """Время поиска до глубины depth и число узлов (всех процессов)"""
+    board = BitboardBoard()
+    board.set_fen(fen)
+    ai = ChessAI(depth=1, color=board.turn, workers=workers)
+    try:
+        # Прогрев: пул процессов создается при первом поиске, его запуск не меряем
+        ai.get_best_move(board)
+        ai.transposition_table.clear()
+        ai.depth = depth
+        start = time.perf_counter()
+        ai.get_best_move(board)
+        elapsed = time.perf_counter() - start
+        return elapsed, ai.nodes_evaluated
+    finally:
+        ai.close()
+
+
+def run_smp_bench(depth, max_workers):
+    """Масштабирование Lazy SMP: время до глубины, узлы/с и ускорение по числу процессов"""
+    cores = os.cpu_count() or 1
+    print(f"Lazy SMP, глубина {depth}, ядер: {cores}")
+    if max_workers > cores:
+        # Лишние процессы делят ядра с главным: замер покажет замедление, а не ускорение
+        print(f"Внимание: процессов больше, чем ядер ({max_workers} > {cores}), "
+              f"ускорение для {cores + 1}+ процессов не показательно")
+    print(f"{'процессов':>9} {'время, с':>9} {'узлов':>9} {'узл/с':>8} {'ускорение':>9}")
+    baseline = None
+    for workers in range(1, max_workers + 1):
+        total_time = 0.0
+        total_nodes = 0
+        for _, fen in BENCH_POSITIONS:
+            elapsed, nodes = time_to_depth(fen, depth, workers)
+            total_time += elapsed
+            total_nodes += nodes
+        if baseline is None:
+            baseline = total_time
+        print(f"{workers:>9} {total_time:>9.2f} {total_nodes:>9} "
+              f"{int(total_nodes / total_time):>8} {baseline / total_time:>8.2f}x")
+
+
+def _frontier_positions(count, seed=1):
+    """Позиции из случайных партий от BENCH_POSITIONS - как узлы глубины 1 в поиске"""
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        for _, fen in BENCH_POSITIONS:
+            board = BitboardBoard()
+            board.set_fen(fen)
+            for _ in range(rng.randrange(40)):
+                moves = board.legal_moves(board.turn)
+                if not moves:
+                    break
+                board.push(rng.choice(moves))
+            moves = board.legal_moves(board.turn)
+            if moves:
+                positions.append((board, moves))
+    return positions[:count]
+
+
+def run_eval_bench(count, repeat=20):
+    """Поштучная оценка потомков (push/оценка/pop) против пакетной NumPy по числу ходов"""
+    if not HAS_NUMPY:
+        print("Для пакетной оценки нужен NumPy")
+        return False
+    ai = ChessAI(color='white')
+    buckets = {}
+    for board, moves in _frontier_positions(count):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for move in moves:
+                board.push(move)
+                ai._evaluate_board_fast(board)
+                board.pop()
+        scalar = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            batch_child_scores(board, moves, 'white')
+        batch = time.perf_counter() - start
+
+        bucket = buckets.setdefault(len(moves) // 5 * 5, [0, 0.0, 0.0])
+        bucket[0] += repeat
+        bucket[1] += scalar
+        bucket[2] += batch
+
+    print(f"{'ходов':>7} {'поштучно, мкс':>14} {'NumPy, мкс':>11} {'ускорение':>9}")
+    crossover = None
+    for low in sorted(buckets):
+        calls, scalar, batch = buckets[low]
+        if crossover is None and batch < scalar:
+            crossover = low
+        print(f"{low:>3}-{low + 4:<3} {scalar / calls * 1e6:>14.1f} {batch / calls * 1e6:>11.1f} "
+              f"{scalar / batch:>8.2f}x")
+    if crossover is None:
+        print("Пакетная оценка не обгоняет поштучную ни при каком числе ходов")
+    else:
+        print(f"Пакетная оценка выгоднее начиная примерно с {crossover} ходов (BATCH_MIN_MOVES)")
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Замеры скорости поиска ChessAI')
+    parser.add_argument('--depth', type=int, default=4, help='глубина поиска')
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count() or 1,
+                        help='наибольшее число процессов поиска')
+    parser.add_argument('--eval', action='store_true',
+                        help='сравнить поштучную и пакетную (NumPy) оценку потомков')
+    parser.add_argument('--positions', type=int, default=200, help='число позиций для --eval')
+    args = parser.parse_args(argv)
+
+    if args.eval:
+        return 0 if run_eval_bench(args.positions) else 1
+    run_smp_bench(args.depth, args.workers)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,395 @@
+from board import Board
+from pieces import PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, WHITE, BLACK
+
+# Индексы битбордов: по одному 64-битному числу на тип фигуры и цвет
+# (совпадают с кодами piece.kind и piece.side)
+PIECE_INDEX = {'Pawn': PAWN, 'Knight': KNIGHT, 'Bishop': BISHOP, 'Rook': ROOK, 'Queen': QUEEN, 'King': KING}
+COLOR_INDEX = {'white': WHITE, 'black': BLACK}
+
+
+def square(pos):
+    row, col = pos
+    return row * 8 + col
+
+
+def square_pos(sq):
+    return divmod(sq, 8)
+
+
+def _build_leaper_table(offsets):
+    table = []
+    for sq in range(64):
+        row, col = divmod(sq, 8)
+        mask = 0
+        for dr, dc in offsets:
+            r, c = row + dr, col + dc
+            if 0 <= r < 8 and 0 <= c < 8:
+                mask |= 1 << (r * 8 + c)
+        table.append(mask)
+    return table
+
+
+def _build_rays(dr, dc):
+    rays = []
+    for sq in range(64):
+        row, col = divmod(sq, 8)
+        mask = 0
+        r, c = row + dr, col + dc
+        while 0 <= r < 8 and 0 <= c < 8:
+            mask |= 1 << (r * 8 + c)
+            r, c = r + dr, c + dc
+        rays.append(mask)
+    return rays
+
+
+KNIGHT_ATTACKS = _build_leaper_table([
+    (-2, -1), (-2, 1), (-1, -2), (-1, 2),
+    (1, -2), (1, 2), (2, -1), (2, 1)
+])
+KING_ATTACKS = _build_leaper_table([
+    (-1, -1), (-1, 0), (-1, 1),
+    (0, -1), (0, 1),
+    (1, -1), (1, 0), (1, 1)
+])
+# PAWN_ATTACKS[color][sq] - клетки, которые бьет пешка цвета color с поля sq
+PAWN_ATTACKS = [
+    _build_leaper_table([(-1, -1), (-1, 1)]),
+    _build_leaper_table([(1, -1), (1, 1)]),
+]
+
+# Лучи, идущие в сторону возрастания номера клетки (первый блокер - младший бит)
+# и в сторону убывания (первый блокер - старший бит)
+_EAST, _SOUTH = _build_rays(0, 1), _build_rays(1, 0)
+_WEST, _NORTH = _build_rays(0, -1), _build_rays(-1, 0)
+_SOUTH_EAST, _SOUTH_WEST = _build_rays(1, 1), _build_rays(1, -1)
+_NORTH_WEST, _NORTH_EAST = _build_rays(-1, -1), _build_rays(-1, 1)
+
+# Атаки дальнобойных фигур на пустой доске: если в них нет нужной фигуры,
+# лучи с учетом блокеров можно не считать
+ROOK_MASKS = [_EAST[sq] | _SOUTH[sq] | _WEST[sq] | _NORTH[sq] for sq in range(64)]
+BISHOP_MASKS = [_SOUTH_EAST[sq] | _SOUTH_WEST[sq] | _NORTH_WEST[sq] | _NORTH_EAST[sq] for sq in range(64)]
+
+
+def _build_between():
+    # BETWEEN[a][b] - клетки строго между a и b на одной линии (иначе 0)
+    between = [[0] * 64 for _ in range(64)]
+    for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1), (0, -1), (-1, 0), (-1, -1), (-1, 1)):
+        for sq in range(64):
+            row, col = divmod(sq, 8)
+            mask = 0
+            r, c = row + dr, col + dc
+            while 0 <= r < 8 and 0 <= c < 8:
+                between[sq][r * 8 + c] = mask
+                mask |= 1 << (r * 8 + c)
+                r, c = r + dr, c + dc
+    return between
+
+
+BETWEEN = _build_between()
+
+# Позиция (row, col) для номера клетки
+SQUARE_POS = [divmod(sq, 8) for sq in range(64)]
+
+# Горизонтали превращения и начальные горизонтали пешек по цвету
+_PROMOTION_RANK = [0xFF, 0xFF << 56]
+_DOUBLE_PUSH_RANK = [0xFF << 48, 0xFF << 8]
+_ALL = (1 << 64) - 1
+_UNDERPROMOTIONS = ('Rook', 'Bishop', 'Knight')
+
+
+def rook_attacks(sq, occupied):
+    # Лучи развернуты вручную: это самая горячая функция генератора ходов
+    ray = _EAST[sq]
+    blockers = ray & occupied
+    attacks = ray ^ _EAST[(blockers & -blockers).bit_length() - 1] if blockers else ray
+    ray = _SOUTH[sq]
+    blockers = ray & occupied
+    attacks |= ray ^ _SOUTH[(blockers & -blockers).bit_length() - 1] if blockers else ray
+    ray = _WEST[sq]
+    blockers = ray & occupied
+    attacks |= ray ^ _WEST[blockers.bit_length() - 1] if blockers else ray
+    ray = _NORTH[sq]
+    blockers = ray & occupied
+    attacks |= ray ^ _NORTH[blockers.bit_length() - 1] if blockers else ray
+    return attacks
+
+
+def bishop_attacks(sq, occupied):
+    ray = _SOUTH_EAST[sq]
+    blockers = ray & occupied
+    attacks = ray ^ _SOUTH_EAST[(blockers & -blockers).bit_length() - 1] if blockers else ray
+    ray = _SOUTH_WEST[sq]
+    blockers = ray & occupied
+    attacks |= ray ^ _SOUTH_WEST[(blockers & -blockers).bit_length() - 1] if blockers else ray
+    ray = _NORTH_WEST[sq]
+    blockers = ray & occupied
+    attacks |= ray ^ _NORTH_WEST[blockers.bit_length() - 1] if blockers else ray
+    ray = _NORTH_EAST[sq]
+    blockers = ray & occupied
+    attacks |= ray ^ _NORTH_EAST[blockers.bit_length() - 1] if blockers else ray
+    return attacks
+
+
+def iter_squares(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class BitboardBoard(Board):
+    """Доска с битбордами поверх обычного массива фигур.
+
+    Массив self.board по-прежнему хранит объекты фигур, поэтому get_piece,
+    ходы фигур и Game работают без изменений, а атаки, шахи и легальные
+    ходы (legal_moves, legal_captures) считаются по битбордам.
+    """
+
+    def __init__(self, fen=None):
+        self.pieces_bb = [[0] * 6, [0] * 6]
+        self.occupancy = [0, 0]
+        self.occupied = 0
+        super().__init__(fen)
+
+    def setup_pieces(self):
+        super().setup_pieces()
+        self._rebuild_bitboards()
+
+    def _rebuild_bitboards(self):
+        self.pieces_bb = [[0] * 6, [0] * 6]
+        self.occupancy = [0, 0]
+        self.occupied = 0
+        for row in range(8):
+            for col in range(8):
+                piece = self.board[row][col]
+                if piece:
+                    self._toggle(piece, 1 << (row * 8 + col))
+
+    def _toggle(self, piece, bit):
+        side = piece.side
+        self.pieces_bb[side][piece.kind] ^= bit
+        self.occupancy[side] ^= bit
+        self.occupied ^= bit
+
+    def set_piece(self, pos, piece):
+        row, col = pos
+        bit = 1 << (row * 8 + col)
+        old = self.board[row][col]
+        if old:
+            self._toggle(old, bit)
+        if piece:
+            self._toggle(piece, bit)
+        super().set_piece(pos, piece)
+
+    def is_square_attacked(self, square, by_color):
+        """Атакована ли клетка square фигурами цвета by_color"""
+        row, col = square
+        return self._is_attacked(row * 8 + col, COLOR_INDEX[by_color], self.occupied, 0)
+
+    def attackers(self, square, by_color):
+        """Список позиций фигур цвета by_color, атакующих клетку square"""
+        return [square_pos(sq) for sq in iter_squares(self.attackers_mask(square, by_color))]
+
+    def attackers_mask(self, square, by_color):
+        row, col = square
+        sq = row * 8 + col
+        by = COLOR_INDEX[by_color]
+        bbs = self.pieces_bb[by]
+        occupied = self.occupied
+        return ((KNIGHT_ATTACKS[sq] & bbs[KNIGHT])
+                | (KING_ATTACKS[sq] & bbs[KING])
+                | (PAWN_ATTACKS[1 - by][sq] & bbs[PAWN])
+                | (bishop_attacks(sq, occupied) & (bbs[BISHOP] | bbs[QUEEN]))
+                | (rook_attacks(sq, occupied) & (bbs[ROOK] | bbs[QUEEN])))
+
+    def _is_attacked(self, sq, by, occupied, removed):
+        # removed - маска фигур стороны by, которые считаются снятыми с доски
+        bbs = self.pieces_bb[by]
+        keep = ~removed
+        if KNIGHT_ATTACKS[sq] & bbs[KNIGHT] & keep:
+            return True
+        if KING_ATTACKS[sq] & bbs[KING]:
+            return True
+        # Пешка цвета by бьет sq, если с sq "бьет" ее пешка противоположного цвета
+        if PAWN_ATTACKS[1 - by][sq] & bbs[PAWN] & keep:
+            return True
+        diagonal = (bbs[BISHOP] | bbs[QUEEN]) & keep
+        if diagonal & BISHOP_MASKS[sq] and bishop_attacks(sq, occupied) & diagonal:
+            return True
+        straight = (bbs[ROOK] | bbs[QUEEN]) & keep
+        if straight & ROOK_MASKS[sq] and rook_attacks(sq, occupied) & straight:
+            return True
+        return False
+
+    def is_check(self, color):
+        side = COLOR_INDEX[color]
+        king_bb = self.pieces_bb[side][KING]
+        if not king_bb:
+            return False
+        return self._is_attacked(king_bb.bit_length() - 1, 1 - side, self.occupied, 0)
+
+    def is_legal_move(self, from_pos, to_pos, color):
+        piece = self.get_piece(from_pos)
+        if piece.kind == KING and abs(to_pos[1] - from_pos[1]) == 2:
+            return super().is_legal_move(from_pos, to_pos, color)
+        if piece.kind == PAWN and to_pos == self.en_passant and to_pos[1] != from_pos[1]:
+            return super().is_legal_move(from_pos, to_pos, color)
+
+        # Ход проверяется на масках, без перестановки фигур в self.board
+        side = COLOR_INDEX[color]
+        from_bit = 1 << square(from_pos)
+        to_sq = square(to_pos)
+        to_bit = 1 << to_sq
+        occupied = (self.occupied ^ from_bit) | to_bit
+
+        if piece.kind == KING:
+            king_sq = to_sq
+        else:
+            king_bb = self.pieces_bb[side][KING]
+            if not king_bb:
+                return True
+            king_sq = king_bb.bit_length() - 1
+
+        return not self._is_attacked(king_sq, 1 - side, occupied, to_bit)
+
+    def legal_moves(self, color, underpromotions=False):
+        """Легальные ходы по битбордам: таблицы прыгающих фигур, лучи дальнобойных,
+        маски связок и защиты от шаха считаются один раз на позицию"""
+        return self._generate_moves(COLOR_INDEX[color], underpromotions, False)
+
+    def legal_captures(self, color):
+        """Легальные взятия (включая взятие на проходе) и превращения пешек"""
+        return self._generate_moves(COLOR_INDEX[color], False, True)
+
+    def _generate_moves(self, side, underpromotions, captures_only):
+        bbs = self.pieces_bb[side]
+        king_bb = bbs[KING]
+        if not king_bb:
+            return super().legal_moves('white' if side == WHITE else 'black', underpromotions) \
+                if not captures_only else super().legal_captures('white' if side == WHITE else 'black')
+
+        them = 1 - side
+        enemy_bbs = self.pieces_bb[them]
+        own = self.occupancy[side]
+        enemy = self.occupancy[them]
+        occupied = self.occupied
+        squares = self.squares
+        king_sq = king_bb.bit_length() - 1
+        moves = []
+
+        # Дальнобойные фигуры соперника на линиях короля (на пустой доске)
+        diagonal = (enemy_bbs[BISHOP] | enemy_bbs[QUEEN]) & BISHOP_MASKS[king_sq]
+        straight = (enemy_bbs[ROOK] | enemy_bbs[QUEEN]) & ROOK_MASKS[king_sq]
+        checkers = (KNIGHT_ATTACKS[king_sq] & enemy_bbs[KNIGHT]) | (PAWN_ATTACKS[side][king_sq] & enemy_bbs[PAWN])
+        if diagonal:
+            checkers |= bishop_attacks(king_sq, occupied) & diagonal
+        if straight:
+            checkers |= rook_attacks(king_sq, occupied) & straight
+        targets = (enemy if captures_only else ~own) & _ALL
+
+        if checkers & (checkers - 1) == 0:
+            if checkers:
+                # Под шахом: взять шахующую фигуру или закрыться от нее
+                evasion = checkers | BETWEEN[king_sq][checkers.bit_length() - 1]
+            else:
+                evasion = _ALL
+
+            # Связанная фигура ходит только по линии между королем и связывающей фигурой
+            pins = {}
+            snipers = (diagonal & bishop_attacks(king_sq, enemy) if diagonal else 0) \
+                | (straight & rook_attacks(king_sq, enemy) if straight else 0)
+            while snipers:
+                bit = snipers & -snipers
+                snipers ^= bit
+                sniper = bit.bit_length() - 1
+                blockers = BETWEEN[king_sq][sniper] & occupied
+                if blockers and blockers & (blockers - 1) == 0 and blockers & own:
+                    pins[blockers.bit_length() - 1] = BETWEEN[king_sq][sniper] | bit
+
+            forward = -8 if side == WHITE else 8
+            promotion_rank = _PROMOTION_RANK[side]
+            empty = ~occupied & _ALL
+            pieces = own ^ king_bb
+            while pieces:
+                bit = pieces & -pieces
+                pieces ^= bit
+                sq = bit.bit_length() - 1
+                kind = squares[sq] - 6 * side
+                allowed = evasion & pins.get(sq, _ALL)
+                if kind == PAWN:
+                    attacks = PAWN_ATTACKS[side][sq]
+                    destinations = attacks & enemy
+                    push_sq = sq + forward
+                    if (empty >> push_sq) & 1:
+                        if not captures_only or (promotion_rank >> push_sq) & 1:
+                            destinations |= 1 << push_sq
+                        if not captures_only and (_DOUBLE_PUSH_RANK[side] >> sq) & 1 \
+                                and (empty >> (push_sq + forward)) & 1:
+                            destinations |= 1 << (push_sq + forward)
+                    destinations &= allowed
+                    en_passant = self.en_passant
+                    if en_passant:
+                        ep_sq = en_passant[0] * 8 + en_passant[1]
+                        if (attacks >> ep_sq) & 1 and self._en_passant_legal(side, sq, ep_sq, king_sq):
+                            moves.append((SQUARE_POS[sq], en_passant))
+                    from_pos = SQUARE_POS[sq]
+                    while destinations:
+                        low = destinations & -destinations
+                        destinations ^= low
+                        to_sq = low.bit_length() - 1
+                        moves.append((from_pos, SQUARE_POS[to_sq]))
+                        if underpromotions and (promotion_rank >> to_sq) & 1:
+                            for name in _UNDERPROMOTIONS:
+                                moves.append((from_pos, SQUARE_POS[to_sq], name))
+                    continue
+
+                if kind == KNIGHT:
+                    destinations = KNIGHT_ATTACKS[sq]
+                elif kind == BISHOP:
+                    destinations = bishop_attacks(sq, occupied)
+                elif kind == ROOK:
+                    destinations = rook_attacks(sq, occupied)
+                else:
+                    destinations = rook_attacks(sq, occupied) | bishop_attacks(sq, occupied)
+                destinations &= targets & allowed
+                from_pos = SQUARE_POS[sq]
+                while destinations:
+                    low = destinations & -destinations
+                    destinations ^= low
+                    moves.append((from_pos, SQUARE_POS[low.bit_length() - 1]))
+
+        # Король: поле не должно быть битым и после его ухода с линии шаха
+        king_pos = SQUARE_POS[king_sq]
+        without_king = occupied ^ king_bb
+        destinations = KING_ATTACKS[king_sq] & targets
+        while destinations:
+            low = destinations & -destinations
+            destinations ^= low
+            to_sq = low.bit_length() - 1
+            if not self._is_attacked(to_sq, them, without_king | low, low):
+                moves.append((king_pos, SQUARE_POS[to_sq]))
+
+        if not checkers and not captures_only:
+            king = self.board[king_pos[0]][king_pos[1]]
+            if not king.has_moved:
+                king_row = king_pos[0]
+                for rook_col, path, step in ((7, (5, 6), 1), (0, (3, 2, 1), -1)):
+                    rook = self.board[king_row][rook_col]
+                    if not rook or rook.kind != ROOK or rook.side != side or rook.has_moved:
+                        continue
+                    if any((occupied >> (king_row * 8 + col)) & 1 for col in path):
+                        continue
+                    if self._is_attacked(king_sq + step, them, occupied, 0) \
+                            or self._is_attacked(king_sq + 2 * step, them, occupied, 0):
+                        continue
+                    moves.append((king_pos, SQUARE_POS[king_sq + 2 * step]))
+        return moves
+
+    def _en_passant_legal(self, side, from_sq, ep_sq, king_sq):
+        # Взятие на проходе снимает с горизонтали сразу две пешки: проверяем на масках
+        captured_bit = 1 << (ep_sq + (8 if side == WHITE else -8))
+        # Бить можно только пешку соперника, прошедшую через поле ep_sq
+        if not captured_bit & self.pieces_bb[1 - side][PAWN] or (self.occupied >> ep_sq) & 1:
+            return False
+        occupied = (self.occupied ^ (1 << from_sq) ^ captured_bit) | (1 << ep_sq)
+        return not self._is_attacked(king_sq, 1 - side, occupied, captured_bit)
@@ -1,11 +1,77 @@
-from pieces import Rook, Knight, Bishop, Queen, King, Pawn
+from pieces import Rook, Knight, Bishop, Queen, King, Pawn, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, WHITE
+from zobrist import PIECE_KEY_TABLE, SIDE_KEY, CASTLING_KEYS, EN_PASSANT_KEYS
+from evaluation import PIECE_SQUARE_TABLE
+
+PROMOTION_PIECES = {'Queen': Queen, 'Rook': Rook, 'Bishop': Bishop, 'Knight': Knight}
+
+KNIGHT_OFFSETS = [
+    (-2, -1), (-2, 1), (-1, -2), (-1, 2),
+    (1, -2), (1, 2), (2, -1), (2, 1)
+]
+KING_OFFSETS = [
+    (-1, -1), (-1, 0), (-1, 1),
+    (0, -1), (0, 1),
+    (1, -1), (1, 0), (1, 1)
+]
+DIAGONAL_DIRECTIONS = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+STRAIGHT_DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+
+FEN_PIECES = {'p': Pawn, 'n': Knight, 'b': Bishop, 'r': Rook, 'q': Queen, 'k': King}
+FEN_LETTERS = {cls.name: letter for letter, cls in FEN_PIECES.items()}
+
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+# Права рокировки, которые остаются после хода с поля или на поле sq:
+# ход короля или ладьи со своего поля и взятие ладьи снимают права
+CASTLING_MASKS = [15] * 64
+CASTLING_MASKS[60], CASTLING_MASKS[63], CASTLING_MASKS[56] = 15 & ~3, 15 & ~1, 15 & ~2
+CASTLING_MASKS[4], CASTLING_MASKS[7], CASTLING_MASKS[0] = 15 & ~12, 15 & ~4, 15 & ~8
+
+
+def square_name(pos):
+    """(row, col) -> 'e4'"""
+    row, col = pos
+    return 'abcdefgh'[col] + str(8 - row)
+
+
+def parse_square(name):
+    """'e4' -> (row, col)"""
+    if len(name) != 2 or name[0] not in 'abcdefgh' or name[1] not in '12345678':
+        raise ValueError(f"Некорректное поле: {name}")
+    return 8 - int(name[1]), 'abcdefgh'.index(name[0])
 
 class Board:
-    def __init__(self):
+    def __init__(self, fen=None):
         self.board = [[None for _ in range(8)] for _ in range(8)]
         self.white_king_pos = None
         self.black_king_pos = None
+        self.turn = 'white'
+        self.en_passant = None
+        # Полуходы без взятий и ходов пешек (правило 50 ходов) и номер хода, как в FEN
+        self.halfmove_clock = 0
+        self.fullmove_number = 1
+        self._piece_hash = 0
+        # Материал с позиционными бонусами [белые, черные], обновляется в set_piece
+        self.score = [0, 0]
+        self.piece_count = 0
+        # Права рокировки (см. castling_rights), обновляются в move_piece
+        self._castling = 0
+        # Код фигуры на каждом поле (side * 6 + kind, пусто - -1), обновляется в set_piece
+        self.squares = [-1] * 64
+        # Фигуры, снятые с доски при отмене превращения: следующее превращение
+        # берет готовую фигуру отсюда, а не создает новую
+        self._spare_pieces = {}
+        self.undo_stack = []
+        if fen is not None:
+            # set_fen ставит фигуры через set_piece, хеш и оценка считаются по ходу
+            self.set_fen(fen)
+            return
         self.setup_pieces()
+        self._piece_hash = self._compute_piece_hash()
+        self.score = self._compute_score()
+        self.piece_count = sum(1 for row in self.board for piece in row if piece)
+        self.squares = [piece.side * 6 + piece.kind if piece else -1 for row in self.board for piece in row]
+        self._castling = self._compute_castling_rights()
     
     def setup_pieces(self):
         # Черные
@@ -35,29 +101,174 @@ class Board:
         self.white_king_pos = (7, 4)
         self.black_king_pos = (0, 4)
     
+    def set_fen(self, fen):
+        """Загрузить позицию из FEN (расстановка, очередь хода, рокировки, взятие на проходе, счетчики)"""
+        fields = fen.split()
+        rows = fields[0].split('/') if fields else []
+        if len(rows) != 8:
+            raise ValueError(f"Некорректный FEN: {fen}")
+
+        for row in range(8):
+            for col in range(8):
+                self.set_piece((row, col), None)
+        self.white_king_pos = None
+        self.black_king_pos = None
+
+        for row, rank in enumerate(rows):
+            col = 0
+            for ch in rank:
+                if ch.isdigit():
+                    col += int(ch)
+                    continue
+                piece_cls = FEN_PIECES.get(ch.lower())
+                if piece_cls is None or col > 7:
+                    raise ValueError(f"Некорректный FEN: {fen}")
+                piece = piece_cls('white' if ch.isupper() else 'black', (row, col))
+                # Король и ладьи считаются сходившими, пока поле рокировок не скажет обратное
+                piece._has_moved = piece.kind in (KING, ROOK)
+                self.set_piece((row, col), piece)
+                col += 1
+            if col != 8:
+                raise ValueError(f"Некорректный FEN: {fen}")
+
+        castling = fields[2] if len(fields) > 2 else '-'
+        for row, color, kingside, queenside in ((7, 'white', 'K', 'Q'), (0, 'black', 'k', 'q')):
+            for flag, rook_col in ((kingside, 7), (queenside, 0)):
+                if flag not in castling:
+                    continue
+                king = self.board[row][4]
+                rook = self.board[row][rook_col]
+                if king and king.kind == KING and king.color == color:
+                    king._has_moved = False
+                if rook and rook.kind == ROOK and rook.color == color:
+                    rook._has_moved = False
+        self._castling = self._compute_castling_rights()
+
+        self.turn = 'black' if len(fields) > 1 and fields[1] == 'b' else 'white'
+        self.en_passant = parse_square(fields[3]) if len(fields) > 3 and fields[3] != '-' else None
+        try:
+            self.halfmove_clock = int(fields[4]) if len(fields) > 4 else 0
+            self.fullmove_number = int(fields[5]) if len(fields) > 5 else 1
+        except ValueError:
+            raise ValueError(f"Некорректный FEN: {fen}")
+        self.undo_stack = []
+
+    def fen(self):
+        """Позиция в FEN; права рокировки - из castling_rights()"""
+        rows = []
+        for row in self.board:
+            text = ''
+            empty = 0
+            for piece in row:
+                if piece is None:
+                    empty += 1
+                    continue
+                if empty:
+                    text += str(empty)
+                    empty = 0
+                letter = FEN_LETTERS[piece.name]
+                text += letter.upper() if piece.color == 'white' else letter
+            rows.append(text + (str(empty) if empty else ''))
+
+        rights = self.castling_rights()
+        castling = ''.join(flag for bit, flag in zip((1, 2, 4, 8), 'KQkq') if rights & bit) or '-'
+        en_passant = square_name(self.en_passant) if self.en_passant else '-'
+        return (f"{'/'.join(rows)} {self.turn[0]} {castling} {en_passant} "
+                f"{self.halfmove_clock} {self.fullmove_number}")
+
     def get_piece(self, pos):
         row, col = pos
         return self.board[row][col]
     
     def set_piece(self, pos, piece):
         row, col = pos
+        sq = row * 8 + col
+        old = self.board[row][col]
+        if old:
+            self._piece_hash ^= PIECE_KEY_TABLE[old.side][old.kind][sq]
+            self.score[old.side] -= PIECE_SQUARE_TABLE[old.side][old.kind][sq]
+            self.piece_count -= 1
+        if piece:
+            self._piece_hash ^= PIECE_KEY_TABLE[piece.side][piece.kind][sq]
+            self.score[piece.side] += PIECE_SQUARE_TABLE[piece.side][piece.kind][sq]
+            self.piece_count += 1
+            self.squares[sq] = piece.side * 6 + piece.kind
+        else:
+            self.squares[sq] = -1
         self.board[row][col] = piece
-        if piece and piece.name == 'King':
-            if piece.color == 'white':
+        if piece and piece.kind == KING:
+            if piece.side == WHITE:
                 self.white_king_pos = pos
             else:
                 self.black_king_pos = pos
     
+    def _compute_piece_hash(self):
+        key = 0
+        for row in range(8):
+            for col in range(8):
+                piece = self.board[row][col]
+                if piece:
+                    key ^= PIECE_KEY_TABLE[piece.side][piece.kind][row * 8 + col]
+        return key
+
+    def _compute_score(self):
+        score = [0, 0]
+        for row in range(8):
+            for col in range(8):
+                piece = self.board[row][col]
+                if piece:
+                    score[piece.side] += PIECE_SQUARE_TABLE[piece.side][piece.kind][row * 8 + col]
+        return score
+
+    def castling_rights(self):
+        """Права рокировки битовой маской: 1 - белые O-O, 2 - белые O-O-O,
+        4 - черные O-O, 8 - черные O-O-O"""
+        return self._castling
+
+    def _compute_castling_rights(self):
+        # По has_moved короля и ладей; дальше права ведутся в move_piece
+        rights = 0
+        for row, color, shift in ((7, 'white', 0), (0, 'black', 2)):
+            king = self.board[row][4]
+            if not king or king.kind != KING or king.color != color or king.has_moved:
+                continue
+            rook = self.board[row][7]
+            if rook and rook.kind == ROOK and rook.color == color and not rook.has_moved:
+                rights |= 1 << shift
+            rook = self.board[row][0]
+            if rook and rook.kind == ROOK and rook.color == color and not rook.has_moved:
+                rights |= 2 << shift
+        return rights
+
+    @property
+    def zobrist_key(self):
+        """64-битный ключ позиции: фигуры, очередь хода, рокировки и взятие на проходе"""
+        key = self._piece_hash ^ CASTLING_KEYS[self._castling]
+        if self.turn == 'black':
+            key ^= SIDE_KEY
+        if self.en_passant:
+            key ^= EN_PASSANT_KEYS[self.en_passant[1]]
+        return key
+
     def is_valid_pos(self, pos):
         row, col = pos
         return 0 <= row < 8 and 0 <= col < 8
-    def move_piece(self, from_pos, to_pos):
+    def move_piece(self, from_pos, to_pos, promotion='Queen'):
         piece = self.get_piece(from_pos)
         from_row, from_col = from_pos
         to_row, to_col = to_pos
         
+        self.turn = 'black' if piece.color == 'white' else 'white'
+        self._castling &= CASTLING_MASKS[from_row * 8 + from_col] & CASTLING_MASKS[to_row * 8 + to_col]
+        if piece.kind == PAWN and to_pos == self.en_passant and to_col != from_col:
+            # Взятие на проходе: снимаем пешку, стоящую рядом
+            self.set_piece((from_row, to_col), None)
+        if piece.kind == PAWN and abs(to_row - from_row) == 2:
+            self.en_passant = ((from_row + to_row) // 2, from_col)
+        else:
+            self.en_passant = None
 
-        if piece.name == 'King' and abs(to_col - from_col) == 2:
+        if piece.kind == KING and abs(to_col - from_col) == 2:
             self.set_piece(to_pos, piece)
             self.set_piece(from_pos, None)
             piece.pos = to_pos
@@ -75,102 +286,303 @@ class Board:
                 self.set_piece((from_row, 0), None)
                 rook.pos = (from_row, 3)
                 rook.has_moved = True
+        elif piece.kind == PAWN and to_row in (0, 7):
+            self.set_piece(to_pos, self._promoted_piece(piece.color, promotion, to_pos))
+            self.set_piece(from_pos, None)
         else:
             self.set_piece(to_pos, piece)
             self.set_piece(from_pos, None)
             piece.pos = to_pos
             piece.has_moved = True
+    def _promoted_piece(self, color, name, pos):
+        spares = self._spare_pieces.get((color, name))
+        if spares:
+            piece = spares.pop()
+            piece.pos = pos
+        else:
+            piece = PROMOTION_PIECES[name](color, pos)
+        piece._has_moved = True
+        return piece
+
     def is_check(self, color):
         king_pos = self.white_king_pos if color == 'white' else self.black_king_pos
         if not king_pos:
             return False
         opponent_color = 'black' if color == 'white' else 'white'
-        for row in range(8):
-            for col in range(8):
-                piece = self.board[row][col]
-                if piece and piece.color == opponent_color:
-                    if piece.name == 'King':
-                        if abs(row - king_pos[0]) <= 1 and abs(col - king_pos[1]) <= 1:
-                            return True
-                    else:
-                        if king_pos in piece.get_valid_moves(self):
-                            return True
-        return False
-    
+        return self.is_square_attacked(king_pos, opponent_color)
+
+    def is_square_attacked(self, square, by_color):
+        """Атакована ли клетка square фигурами цвета by_color"""
+        return bool(self._scan_attackers(square, by_color, True))
+
+    def attackers(self, square, by_color):
+        """Список позиций фигур цвета by_color, атакующих клетку square"""
+        return self._scan_attackers(square, by_color, False)
+
+    def _scan_attackers(self, square, by_color, first_only):
+        # Идем от клетки наружу: пешки, кони, король, затем лучи слонов и ладей
+        board = self.board
+        sq_row, sq_col = square
+        found = []
+
+        pawn_row = sq_row + 1 if by_color == 'white' else sq_row - 1
+        if 0 <= pawn_row < 8:
+            for c in (sq_col - 1, sq_col + 1):
+                if 0 <= c < 8:
+                    piece = board[pawn_row][c]
+                    if piece and piece.kind == PAWN and piece.color == by_color:
+                        found.append((pawn_row, c))
+                        if first_only:
+                            return found
+
+        for offsets, kind in ((KNIGHT_OFFSETS, KNIGHT), (KING_OFFSETS, KING)):
+            for dr, dc in offsets:
+                r, c = sq_row + dr, sq_col + dc
+                if 0 <= r < 8 and 0 <= c < 8:
+                    piece = board[r][c]
+                    if piece and piece.kind == kind and piece.color == by_color:
+                        found.append((r, c))
+                        if first_only:
+                            return found
+
+        for directions, kinds in ((DIAGONAL_DIRECTIONS, (BISHOP, QUEEN)),
+                                  (STRAIGHT_DIRECTIONS, (ROOK, QUEEN))):
+            for dr, dc in directions:
+                r, c = sq_row + dr, sq_col + dc
+                while 0 <= r < 8 and 0 <= c < 8:
+                    piece = board[r][c]
+                    if piece:
+                        if piece.color == by_color and piece.kind in kinds:
+                            found.append((r, c))
+                            if first_only:
+                                return found
+                        break
+                    r += dr
+                    c += dc
+
+        return found
+
+    def push(self, move):
+        """Сделать ход move = (from_pos, to_pos[, promotion]) с возможностью отмены через pop"""
+        from_pos, to_pos = move[0], move[1]
+        promotion = move[2] if len(move) > 2 else 'Queen'
+        piece = self.board[from_pos[0]][from_pos[1]]
+        captured_pos = to_pos
+        if piece.kind == PAWN and to_pos == self.en_passant and to_pos[1] != from_pos[1]:
+            captured_pos = (from_pos[0], to_pos[1])
+        captured = self.board[captured_pos[0]][captured_pos[1]]
+
+        rook = None
+        rook_had_moved = False
+        if piece.kind == KING and abs(to_pos[1] - from_pos[1]) == 2:
+            rook = self.board[from_pos[0]][7 if to_pos[1] > from_pos[1] else 0]
+            rook_had_moved = rook.has_moved
+
+        self.undo_stack.append((
+            from_pos, to_pos, piece, captured, captured_pos, piece.has_moved,
+            rook, rook_had_moved, self.en_passant, self.turn, self.halfmove_clock, self._castling
+        ))
+        if piece.kind == PAWN or captured:
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
+        if self.turn == 'black':
+            self.fullmove_number += 1
+        self.move_piece(from_pos, to_pos, promotion)
+
+    def pop(self):
+        """Отменить последний ход, сделанный через push"""
+        (from_pos, to_pos, piece, captured, captured_pos, had_moved,
+         rook, rook_had_moved, en_passant, turn, halfmove_clock, castling) = self.undo_stack.pop()
+
+        promoted = self.board[to_pos[0]][to_pos[1]]
+        if promoted is not piece:
+            self._spare_pieces.setdefault((promoted.color, promoted.name), []).append(promoted)
+        self.set_piece(from_pos, piece)
+        self.set_piece(to_pos, None)
+        if captured:
+            self.set_piece(captured_pos, captured)
+        piece.pos = from_pos
+        # Откат хода - не новое изменение флага, поэтому пишем его напрямую,
+        # минуя отладочный сеттер has_moved
+        piece._has_moved = had_moved
+
+        if rook:
+            row = from_pos[0]
+            if to_pos[1] > from_pos[1]:
+                rook_from, rook_to = (row, 7), (row, 5)
+            else:
+                rook_from, rook_to = (row, 0), (row, 3)
+            self.set_piece(rook_to, None)
+            self.set_piece(rook_from, rook)
+            rook.pos = rook_from
+            rook._has_moved = rook_had_moved
+
+        self.en_passant = en_passant
+        self.turn = turn
+        self.halfmove_clock = halfmove_clock
+        self._castling = castling
+        if turn == 'black':
+            self.fullmove_number -= 1
+
+    def legal_moves(self, color, underpromotions=False):
+        """Все легальные ходы стороны color без пробных ходов на доске.
+
+        Связки, шахующие фигуры и маска защиты от шаха считаются один раз
+        на позицию, после чего псевдолегальные ходы просто фильтруются.
+        Превращение в ферзя - обычный ход (from_pos, to_pos); при
+        underpromotions=True добавляются ходы (from_pos, to_pos, 'Rook') и т.д.
+        """
+        board = self.board
+        king_pos = self.white_king_pos if color == 'white' else self.black_king_pos
+        opponent_color = 'black' if color == 'white' else 'white'
+        moves = []
+
+        if king_pos is None:
+            for row in range(8):
+                for col in range(8):
+                    piece = board[row][col]
+                    if piece and piece.color == color:
+                        for to_pos in piece.get_valid_moves(self):
+                            moves.append(((row, col), to_pos))
+            return moves
+
+        king_row, king_col = king_pos
+        checkers = self.attackers(king_pos, opponent_color)
+        pinned = self._pinned_pieces(king_pos, color, opponent_color)
+
+        # Поля за королем на линии шахующей дальнобойной фигуры тоже битые
+        xray = set()
+        evasion = None
+        for checker_row, checker_col in checkers:
+            checker = board[checker_row][checker_col]
+            dr = (king_row > checker_row) - (king_row < checker_row)
+            dc = (king_col > checker_col) - (king_col < checker_col)
+            if checker.kind in (BISHOP, ROOK, QUEEN):
+                xray.add((king_row + dr, king_col + dc))
+            if evasion is None:
+                evasion = {(checker_row, checker_col)}
+                if checker.kind in (BISHOP, ROOK, QUEEN):
+                    r, c = checker_row + dr, checker_col + dc
+                    while (r, c) != king_pos:
+                        evasion.add((r, c))
+                        r += dr
+                        c += dc
+
+        if len(checkers) < 2:
+            for row in range(8):
+                for col in range(8):
+                    piece = board[row][col]
+                    if not piece or piece.color != color or piece.kind == KING:
+                        continue
+                    pin = pinned.get((row, col))
+                    is_pawn = piece.kind == PAWN
+                    for to_pos in piece.get_valid_moves(self):
+                        if is_pawn and to_pos == self.en_passant and to_pos[1] != col:
+                            # Взятие на проходе снимает сразу две пешки с горизонтали,
+                            # поэтому его проверяем честным пробным ходом
+                            self.push(((row, col), to_pos))
+                            in_check = self.is_check(color)
+                            self.pop()
+                            if not in_check:
+                                moves.append(((row, col), to_pos))
+                            continue
+                        if evasion is not None and to_pos not in evasion:
+                            continue
+                        if pin and (to_pos[0] - king_row) * pin[1] != (to_pos[1] - king_col) * pin[0]:
+                            continue
+                        moves.append(((row, col), to_pos))
+                        if underpromotions and is_pawn and to_pos[0] in (0, 7):
+                            for name in ('Rook', 'Bishop', 'Knight'):
+                                moves.append(((row, col), to_pos, name))
+
+        for dr, dc in KING_OFFSETS:
+            r, c = king_row + dr, king_col + dc
+            if 0 <= r < 8 and 0 <= c < 8:
+                target = board[r][c]
+                if target and target.color == color:
+                    continue
+                if (r, c) in xray or self.is_square_attacked((r, c), opponent_color):
+                    continue
+                moves.append((king_pos, (r, c)))
+
+        if not checkers:
+            king = board[king_row][king_col]
+            if not king.has_moved:
+                for rook_col, path, step in ((7, (5, 6), 1), (0, (3, 2, 1), -1)):
+                    rook = board[king_row][rook_col]
+                    if not rook or rook.kind != ROOK or rook.color != color or rook.has_moved:
+                        continue
+                    if any(board[king_row][c] for c in path):
+                        continue
+                    if self.is_square_attacked((king_row, king_col + step), opponent_color):
+                        continue
+                    if self.is_square_attacked((king_row, king_col + 2 * step), opponent_color):
+                        continue
+                    moves.append((king_pos, (king_row, king_col + 2 * step)))
+
+        return moves
+
+    def legal_captures(self, color):
+        """Легальные взятия (включая взятие на проходе) и превращения пешек"""
+        board = self.board
+        captures = []
+        for move in self.legal_moves(color):
+            (from_row, from_col), (to_row, to_col) = move[0], move[1]
+            if board[to_row][to_col] is not None:
+                captures.append(move)
+            elif board[from_row][from_col].kind == PAWN and (to_col != from_col or to_row in (0, 7)):
+                captures.append(move)
+        return captures
+
+    def _pinned_pieces(self, king_pos, color, opponent_color):
+        """Связанные фигуры: {позиция: направление от короля}"""
+        board = self.board
+        king_row, king_col = king_pos
+        pinned = {}
+        for directions, kinds in ((DIAGONAL_DIRECTIONS, (BISHOP, QUEEN)),
+                                  (STRAIGHT_DIRECTIONS, (ROOK, QUEEN))):
+            for dr, dc in directions:
+                r, c = king_row + dr, king_col + dc
+                candidate = None
+                while 0 <= r < 8 and 0 <= c < 8:
+                    piece = board[r][c]
+                    if piece:
+                        if candidate is None:
+                            if piece.color != color:
+                                break
+                            candidate = (r, c)
+                        else:
+                            if piece.color == opponent_color and piece.kind in kinds:
+                                pinned[candidate] = (dr, dc)
+                            break
+                    r += dr
+                    c += dc
+        return pinned
+
     def is_checkmate(self, color):
-        if not self.is_check(color):
-            return False
-        for row in range(8):
-            for col in range(8):
-                piece = self.board[row][col]
-                if piece and piece.color == color:
-                    for move in piece.get_valid_moves(self):
-                        if self.is_legal_move((row, col), move, color):
-                            return False
-        return True
+        return self.is_check(color) and not self.legal_moves(color)
     
     def is_stalemate(self, color):
-        if self.is_check(color):
-            return False
-        for row in range(8):
-            for col in range(8):
-                piece = self.board[row][col]
-                if piece and piece.color == color:
-                    for move in piece.get_valid_moves(self):
-                        if self.is_legal_move((row, col), move, color):
-                            return False
-        return True
+        return not self.is_check(color) and not self.legal_moves(color)
+
     def is_legal_move(self, from_pos, to_pos, color):
         piece = self.get_piece(from_pos)
-        captured = self.get_piece(to_pos)
-        old_pos = piece.pos
-        
         from_row, from_col = from_pos
-        to_row, to_col = to_pos
-        
+        to_col = to_pos[1]
 
-        is_castling = piece.name == 'King' and abs(to_col - from_col) == 2
-        
-        if is_castling:
+        if piece.kind == KING and abs(to_col - from_col) == 2:
+            opponent_color = 'black' if color == 'white' else 'white'
+            if self.is_square_attacked(from_pos, opponent_color):
+                return False
 
+            # Король не может проходить через битое поле
             direction = 1 if to_col > from_col else -1
-            
-
-            if self.is_check(color):
+            if self.is_square_attacked((from_row, from_col + direction), opponent_color):
                 return False
-            
-
-            for step in range(1, 3):
-                intermediate_col = from_col + step * direction
-                self.set_piece((from_row, intermediate_col), piece)
-                self.set_piece(from_pos if step == 1 else (from_row, from_col + (step-1)*direction), None)
-                piece.pos = (from_row, intermediate_col)
-                
-                if self.is_check(color):
-                    # Откатываем
-                    self.set_piece(from_pos, piece)
-                    for c in range(min(from_col, to_col), max(from_col, to_col) + 1):
-                        if c != from_col:
-                            self.set_piece((from_row, c), None)
-                    piece.pos = old_pos
-                    return False
-            
-
-            self.set_piece(from_pos, piece)
-            self.set_piece(to_pos, None)
-            piece.pos = old_pos
-            return True
-        
 
-        self.set_piece(to_pos, piece)
-        self.set_piece(from_pos, None)
-        piece.pos = to_pos
-        
+        self.push((from_pos, to_pos))
         in_check = self.is_check(color)
-        
-        self.set_piece(from_pos, piece)
-        self.set_piece(to_pos, captured)
-        piece.pos = old_pos
-        
-        return not in_check
+        self.pop()
 
+        return not in_check
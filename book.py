@@ -0,0 +1,229 @@
+import argparse
+import mmap
+import os
+import random
+import re
+import struct
+import sys
+
+from bitboard import BitboardBoard
+from board import START_FEN
+from notation import parse_san, move_san
+from transposition import encode_move, decode_move
+
+# Запись книги: Zobrist-ключ, ход, вес (big-endian, как в Polyglot).
+# Файл - записи, отсортированные по ключу, без заголовка
+BOOK_ENTRY = struct.Struct('>QHH')
+
+DEFAULT_BOOK = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'book.bin')
+
+# Вес хода по результату партии для стороны, которая его сделала
+RESULT_WEIGHTS = {'win': 2, 'draw': 1, 'loss': 0}
+
+
+class OpeningBook:
+    """Дебютная книга в бинарном файле.
+
+    Файл отображается в память через mmap и не читается целиком: ходы
+    позиции ищутся двоичным поиском по ключу за O(log n).
+    """
+
+    def __init__(self, path=DEFAULT_BOOK):
+        self.path = path
+        # Отображению файл после создания не нужен: mmap держит свой дескриптор
+        with open(path, 'rb') as book_file:
+            size = os.fstat(book_file.fileno()).st_size
+            if size % BOOK_ENTRY.size:
+                raise ValueError(f"Поврежденная книга: {path}")
+            self.size = size // BOOK_ENTRY.size
+            # Пустой файл отобразить нельзя
+            self._data = mmap.mmap(book_file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+
+    def __len__(self):
+        return self.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+
+    def _key_at(self, index):
+        return struct.unpack_from('>Q', self._data, index * BOOK_ENTRY.size)[0]
+
+    def entries(self, key):
+        """[(ход, вес)] для позиции с ключом key"""
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            if self._key_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        result = []
+        for index in range(low, self.size):
+            entry_key, move, weight = BOOK_ENTRY.unpack_from(self._data, index * BOOK_ENTRY.size)
+            if entry_key != key:
+                break
+            result.append((decode_move(move), weight))
+        return result
+
+    def moves(self, board):
+        """Легальные книжные ходы позиции с весами (ходы с нулевым весом отброшены)"""
+        entries = self.entries(board.zobrist_key)
+        if not entries:
+            return []
+        legal = board.legal_moves(board.turn, underpromotions=True)
+        return [(move, weight) for move, weight in entries if weight and move in legal]
+
+    def choose(self, board, rng=random):
+        """Случайный книжный ход с вероятностью по весу или None"""
+        moves = self.moves(board)
+        if not moves:
+            return None
+        return rng.choices([move for move, _ in moves], weights=[weight for _, weight in moves])[0]
+
+
+def open_book(path=DEFAULT_BOOK):
+    """Книга, если файл есть, иначе None (закрывает ее close() или ChessAI.close())"""
+    return OpeningBook(path) if os.path.exists(path) else None
+
+
+_PGN_COMMENTS = re.compile(r'\{[^}]*\}|;[^\n]*')
+_PGN_TAG = re.compile(r'^\[(\w+)\s+"(.*)"\]\s*$')
+_MOVE_NUMBER = re.compile(r'^\d+\.+')
+_RESULTS = ('1-0', '0-1', '1/2-1/2', '*')
+
+
+def read_pgn(text):
+    """Партии из текста PGN: [(заголовки, [ходы в SAN])]"""
+    games = []
+    headers = {}
+    movetext = []
+
+    def finish():
+        if headers or movetext:
+            games.append((dict(headers), _pgn_moves(' '.join(movetext))))
+        headers.clear()
+        movetext.clear()
+
+    for line in text.splitlines():
+        line = line.strip()
+        tag = _PGN_TAG.match(line)
+        if tag:
+            if movetext:
+                finish()
+            headers[tag.group(1)] = tag.group(2)
+        elif line and not line.startswith('%'):
+            movetext.append(line)
+    finish()
+    return games
+
+
+def _pgn_moves(movetext):
+    text = _PGN_COMMENTS.sub(' ', movetext)
+    # Варианты в скобках могут быть вложенными
+    depth = 0
+    main_line = []
+    for ch in text:
+        if ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        elif depth == 0:
+            main_line.append(ch)
+
+    moves = []
+    for token in ''.join(main_line).split():
+        token = _MOVE_NUMBER.sub('', token)
+        if not token or token.startswith('$') or token in _RESULTS:
+            continue
+        moves.append(token)
+    return moves
+
+
+def build_book(pgn_paths, out_path, max_plies=20, min_games=1):
+    """Собрать книгу из PGN-файлов; возвращает (число партий, число записей).
+
+    Вес хода - сумма очков по партиям (победа 2, ничья 1, поражение 0)
+    для стороны, сделавшей ход; ходы, встреченные реже min_games раз,
+    в книгу не попадают.
+    """
+    counts = {}
+    weights = {}
+    games_used = 0
+    board = BitboardBoard()
+    for path in pgn_paths:
+        with open(path, encoding='utf-8', errors='replace') as pgn_file:
+            games = read_pgn(pgn_file.read())
+        for headers, moves in games:
+            result = headers.get('Result', '*')
+            if result not in _RESULTS:
+                continue
+            board.set_fen(headers.get('FEN', START_FEN))
+            games_used += 1
+            for san in moves[:max_plies]:
+                try:
+                    move = parse_san(board, san)
+                except ValueError:
+                    break
+                key = (board.zobrist_key, encode_move(move))
+                counts[key] = counts.get(key, 0) + 1
+                weights[key] = weights.get(key, 0) + _result_weight(result, board.turn)
+                board.push(move)
+
+    with open(out_path, 'wb') as out:
+        entries = 0
+        for key, code in sorted(counts):
+            if counts[(key, code)] < min_games:
+                continue
+            out.write(BOOK_ENTRY.pack(key, code, min(weights[(key, code)], 0xFFFF)))
+            entries += 1
+    return games_used, entries
+
+
+def _result_weight(result, color):
+    if result == '1/2-1/2' or result == '*':
+        return RESULT_WEIGHTS['draw']
+    won = (result == '1-0') == (color == 'white')
+    return RESULT_WEIGHTS['win' if won else 'loss']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Дебютная книга: сборка из PGN и просмотр')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('build', help='собрать книгу из PGN-файлов')
+    build.add_argument('pgn', nargs='+', help='файлы PGN')
+    build.add_argument('-o', '--output', default=DEFAULT_BOOK, help='файл книги')
+    build.add_argument('--plies', type=int, default=20, help='сколько первых полуходов партии брать')
+    build.add_argument('--min-games', type=int, default=1, help='сколько раз ход должен встретиться')
+
+    probe = commands.add_parser('probe', help='показать книжные ходы позиции')
+    probe.add_argument('--fen', default=None, help='позиция в FEN (по умолчанию начальная)')
+    probe.add_argument('--book', default=DEFAULT_BOOK, help='файл книги')
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        games, entries = build_book(args.pgn, args.output, args.plies, args.min_games)
+        print(f"Партий: {games}, записей в книге: {entries} -> {args.output}")
+        return 0
+
+    board = BitboardBoard()
+    board.set_fen(args.fen or START_FEN)
+    with OpeningBook(args.book) as book:
+        moves = book.moves(board)
+        total = sum(weight for _, weight in moves)
+        for move, weight in sorted(moves, key=lambda item: -item[1]):
+            print(f"{move_san(board, move):<8} {weight:>6} {weight / total:6.1%}")
+        if not moves:
+            print("Позиции нет в книге")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
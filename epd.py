@@ -0,0 +1,149 @@
+import argparse
+import shlex
+import sys
+import time
+
+from ai_player import ChessAI
+from bitboard import BitboardBoard
+from notation import parse_san, move_san
+
+# Глубина, до которой идет поиск, ограниченный временем или узлами
+MAX_DEPTH = 64
+
+
+def parse_epd(line):
+    """Строка EPD -> (FEN, {операция: [операнды]}).
+
+    В EPD четыре поля позиции, затем операции через ';': bm Nf3 Qd4; id "WAC.001";
+    """
+    fields = line.split(None, 4)
+    if len(fields) < 4:
+        raise ValueError(f"Некорректная строка EPD: {line}")
+    operations = {}
+    for operation in (fields[4] if len(fields) > 4 else '').split(';'):
+        tokens = shlex.split(operation)
+        if tokens:
+            operations[tokens[0]] = tokens[1:]
+
+    # Счетчики ходов EPD задает операциями hmvc/fmvn
+    halfmove = operations.get('hmvc', ['0'])[0]
+    fullmove = operations.get('fmvn', ['1'])[0]
+    return ' '.join(fields[:4] + [halfmove, fullmove]), operations
+
+
+def read_epd(path):
+    """Позиции из файла EPD: [(FEN, операции)] (пустые строки и # пропускаются)"""
+    positions = []
+    with open(path, encoding='utf-8') as epd_file:
+        for line in epd_file:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                positions.append(parse_epd(line))
+    return positions
+
+
+def _moves(board, operands):
+    """Ходы bm/am в SAN -> ходы доски; нераспознанные пропускаются"""
+    moves = []
+    for san in operands:
+        try:
+            moves.append(parse_san(board, san))
+        except ValueError:
+            pass
+    return moves
+
+
+def solve_position(fen, operations, depth, time_limit_ms, max_nodes, stats_log=None):
+    """Поиск по позиции с бюджетом; возвращает словарь с результатом.
+
+    Решено, если найденный ход входит в bm и не входит в am. Время до решения -
+    конец итерации, начиная с которой ход решения больше не менялся.
+    stats_log - файл JSON Lines для SearchStats поиска.
+    """
+    board = BitboardBoard(fen)
+    best = _moves(board, operations.get('bm', []))
+    avoid = _moves(board, operations.get('am', []))
+    if not best and not avoid:
+        raise ValueError(f"Нет распознаваемых bm/am: {fen}")
+
+    def solves(move):
+        return (not best or move in best) and move not in avoid
+
+    ai = ChessAI(depth, board.turn, time_limit_ms=time_limit_ms, max_nodes=max_nodes, profile=stats_log is not None)
+    solved_at = [None]
+    start = time.perf_counter()
+
+    def on_iteration(iteration_depth, value, move):
+        if not solves(move):
+            solved_at[0] = None
+        elif solved_at[0] is None:
+            solved_at[0] = (time.perf_counter() - start, iteration_depth)
+
+    ai.on_iteration = on_iteration
+    move = ai.get_best_move(board)
+    elapsed = time.perf_counter() - start
+    ai.close()
+
+    solved = move is not None and solves(move)
+    position_id = operations.get('id', [fen])[0]
+    if stats_log and ai.last_stats is not None:
+        ai.last_stats.dump(stats_log, id=position_id, solved=solved)
+    return {
+        'id': position_id,
+        'move': move_san(board, move) if move else None,
+        'solved': solved,
+        'time': solved_at[0][0] if solved and solved_at[0] else None,
+        'depth': solved_at[0][1] if solved and solved_at[0] else None,
+        'nodes': ai.nodes_evaluated,
+        'nps': ai.nodes_evaluated / elapsed if elapsed > 0 else 0.0,
+        'elapsed': elapsed,
+    }
+
+
+def run_suite(positions, depth, time_limit_ms=None, max_nodes=None, stats_log=None):
+    """Прогнать набор позиций и напечатать таблицу; возвращает число решенных"""
+    print(f"{'позиция':<20} {'ход':>8} {'итог':>5} {'время, с':>9} {'глубина':>8} {'узлы':>10} {'узлов/с':>9}")
+    solved = 0
+    total_nodes = 0
+    total_time = 0.0
+    for fen, operations in positions:
+        result = solve_position(fen, operations, depth, time_limit_ms, max_nodes, stats_log)
+        solved += result['solved']
+        total_nodes += result['nodes']
+        total_time += result['elapsed']
+        time_text = f"{result['time']:.2f}" if result['time'] is not None else '-'
+        depth_text = str(result['depth']) if result['depth'] is not None else '-'
+        print(f"{result['id'][:20]:<20} {result['move'] or '-':>8} {'OK' if result['solved'] else '--':>5} "
+              f"{time_text:>9} {depth_text:>8} {result['nodes']:>10} {result['nps']:>9.0f}")
+
+    if positions:
+        print(f"Решено {solved} из {len(positions)} ({solved / len(positions):.0%}), "
+              f"{total_nodes} узлов за {total_time:.1f} с, {total_nodes / max(total_time, 1e-9):.0f} узлов/с")
+    return solved
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Прогон тестовых позиций EPD (bm/am) через ChessAI')
+    parser.add_argument('epd', help='файл EPD')
+    parser.add_argument('--depth', type=int, default=None,
+                        help=f"наибольшая глубина поиска (по умолчанию {MAX_DEPTH} при ограничении времени или узлов)")
+    parser.add_argument('--movetime', type=int, default=1000, help='время на позицию, мс (0 - без ограничения)')
+    parser.add_argument('--nodes', type=int, default=None, help='предел узлов на позицию')
+    parser.add_argument('--stats', default=None, help='дописать статистику поиска (SearchStats) в JSON Lines')
+    args = parser.parse_args(argv)
+
+    if args.depth is None:
+        if not args.movetime and args.nodes is None:
+            # Поиск до MAX_DEPTH без бюджета не закончится
+            parser.error('без ограничения времени (--movetime 0) задайте --nodes или --depth')
+        args.depth = MAX_DEPTH
+    if args.depth < 1:
+        parser.error('--depth должна быть не меньше 1')
+
+    positions = read_epd(args.epd)
+    run_suite(positions, args.depth, args.movetime or None, args.nodes, args.stats)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,158 @@
+# Таблицы оценки фигур для инкрементальной оценки на доске.
+# Таблицы бонусов записаны с точки зрения белых (строка 0 - восьмая
+# горизонталь); для черных они один раз зеркалируются по вертикали.
+
+PIECE_VALUES = {
+    'Pawn': 100,
+    'Knight': 320,
+    'Bishop': 330,
+    'Rook': 500,
+    'Queen': 900,
+    'King': 20000
+}
+
+PAWN_TABLE = [
+    [0, 0, 0, 0, 0, 0, 0, 0],
+    [50, 50, 50, 50, 50, 50, 50, 50],
+    [10, 10, 20, 30, 30, 20, 10, 10],
+    [5, 5, 10, 25, 25, 10, 5, 5],
+    [0, 0, 0, 20, 20, 0, 0, 0],
+    [5, -5, -10, 0, 0, -10, -5, 5],
+    [5, 10, 10, -20, -20, 10, 10, 5],
+    [0, 0, 0, 0, 0, 0, 0, 0]
+]
+
+KNIGHT_TABLE = [
+    [-50, -40, -30, -30, -30, -30, -40, -50],
+    [-40, -20, 0, 0, 0, 0, -20, -40],
+    [-30, 0, 10, 15, 15, 10, 0, -30],
+    [-30, 5, 15, 20, 20, 15, 5, -30],
+    [-30, 0, 15, 20, 20, 15, 0, -30],
+    [-30, 5, 10, 15, 15, 10, 5, -30],
+    [-40, -20, 0, 5, 5, 0, -20, -40],
+    [-50, -40, -30, -30, -30, -30, -40, -50]
+]
+
+KING_TABLE = [
+    [-30, -40, -40, -50, -50, -40, -40, -30],
+    [-30, -40, -40, -50, -50, -40, -40, -30],
+    [-30, -40, -40, -50, -50, -40, -40, -30],
+    [-30, -40, -40, -50, -50, -40, -40, -30],
+    [-20, -30, -30, -40, -40, -30, -30, -20],
+    [-10, -20, -20, -20, -20, -20, -20, -10],
+    [20, 20, 0, 0, 0, 0, 20, 20],
+    [20, 30, 10, 0, 0, 10, 30, 20]
+]
+
+POSITION_TABLES = {'Pawn': PAWN_TABLE, 'Knight': KNIGHT_TABLE, 'King': KING_TABLE}
+
+
+def _flatten(name, color):
+    table = POSITION_TABLES.get(name)
+    values = []
+    for row in range(8):
+        for col in range(8):
+            bonus = 0
+            if table is not None:
+                bonus = table[row if color == 'white' else 7 - row][col]
+            values.append(PIECE_VALUES[name] + bonus)
+    return values
+
+
+# PIECE_SQUARE[(color, name)][row * 8 + col] - цена фигуры вместе с позиционным бонусом
+PIECE_SQUARE = {
+    (color, name): _flatten(name, color)
+    for color in ('white', 'black')
+    for name in PIECE_VALUES
+}
+
+
+# PIECE_SQUARE_TABLE[side][kind][sq] - то же по целочисленным кодам фигуры
+PIECE_SQUARE_TABLE = [
+    [PIECE_SQUARE[(color, name)] for name in ('Pawn', 'Knight', 'Bishop', 'Rook', 'Queen', 'King')]
+    for color in ('white', 'black')
+]
+
+# PIECE_VALUE_TABLE[kind] - материальная цена фигуры по целочисленному коду
+PIECE_VALUE_TABLE = [PIECE_VALUES[name] for name in ('Pawn', 'Knight', 'Bishop', 'Rook', 'Queen', 'King')]
+
+
+# Пакетная оценка дочерних позиций (нужен NumPy, без него - обычный путь)
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+HAS_NUMPY = np is not None
+
+# Плоскость фигуры - ее код на доске (board.squares): side * 6 + kind
+PLANE_PAWN, PLANE_KING = 0, 5
+# Вид фигуры при превращении
+_PROMOTION_KINDS = {'Knight': 1, 'Bishop': 2, 'Rook': 3, 'Queen': 4}
+
+if HAS_NUMPY:
+    # Все таблицы одним плоским массивом: [плоскость * 64 + поле]
+    PIECE_SQUARE_ARRAY = np.array(PIECE_SQUARE_TABLE, dtype=np.int64).ravel()
+    # Знак плоскости для оценки с точки зрения белых; пустому полю (-1) - ноль
+    _PLANE_SIGNS = np.array([1] * 6 + [-1] * 6 + [0], dtype=np.int64)
+
+
+def move_changes(board, move):
+    """Изменения расстановки от хода: [(плоскость, поле, +1 или -1)]"""
+    (from_row, from_col), (to_row, to_col) = move[0], move[1]
+    from_sq = from_row * 8 + from_col
+    to_sq = to_row * 8 + to_col
+    plane = board.squares[from_sq]
+    target = board.squares[to_sq]
+
+    changes = [(plane, from_sq, -1)]
+    if target >= 0:
+        changes.append((target, to_sq, -1))
+
+    side_base = plane - plane % 6
+    new_plane = plane
+    if plane % 6 == PLANE_PAWN:
+        if to_row in (0, 7):
+            new_plane = side_base + _PROMOTION_KINDS[move[2] if len(move) > 2 else 'Queen']
+        elif target < 0 and from_col != to_col:
+            # Взятие на проходе: пешка соперника стоит рядом с полем from
+            changes.append((6 - side_base, from_row * 8 + to_col, -1))
+    elif plane % 6 == PLANE_KING and abs(to_col - from_col) == 2:
+        rook_from, rook_to = (7, 5) if to_col == 6 else (0, 3)
+        changes.append((side_base + 3, from_row * 8 + rook_from, -1))
+        changes.append((side_base + 3, from_row * 8 + rook_to, 1))
+    changes.append((new_plane, to_sq, 1))
+    return changes
+
+
+def batch_child_scores(board, moves, color):
+    """Оценки позиций после каждого хода (с точки зрения color) одним проходом NumPy.
+
+    Поля from/to всех ходов собираются в массив за одно преобразование,
+    фигуры и взятые фигуры берутся из board.squares индексацией. Обычный
+    ход меняет оценку на PST[фигура, to] - PST[фигура, from] - PST[взятая, to];
+    редкие ходы (превращения, взятия на проходе, рокировки) досчитываются
+    через move_changes.
+    """
+    coords = np.array([move[:2] for move in moves], dtype=np.int64)
+    from_sq = coords[:, 0, 0] * 8 + coords[:, 0, 1]
+    to_sq = coords[:, 1, 0] * 8 + coords[:, 1, 1]
+    squares = np.array(board.squares, dtype=np.int64)
+    planes = squares[from_sq]
+    targets = squares[to_sq]
+
+    captured = np.where(targets >= 0, PIECE_SQUARE_ARRAY[np.maximum(targets, 0) * 64 + to_sq], 0)
+    delta = _PLANE_SIGNS[planes] * (PIECE_SQUARE_ARRAY[planes * 64 + to_sq] - PIECE_SQUARE_ARRAY[planes * 64 + from_sq]) \
+        - _PLANE_SIGNS[targets] * captured
+
+    kinds = planes % 6
+    to_row = coords[:, 1, 0]
+    special = ((kinds == PLANE_PAWN) & ((to_row == 0) | (to_row == 7) | ((targets < 0) & (coords[:, 0, 1] != coords[:, 1, 1])))) \
+        | ((kinds == PLANE_KING) & (np.abs(coords[:, 1, 1] - coords[:, 0, 1]) == 2))
+    for index in np.flatnonzero(special):
+        delta[index] = sum(sign * _PLANE_SIGNS[plane] * PIECE_SQUARE_ARRAY[plane * 64 + sq]
+                           for plane, sq, sign in move_changes(board, moves[index]))
+
+    base = board.score[0] - board.score[1]
+    scores = base + delta
+    return scores if color == 'white' else -scores
@@ -1,13 +1,18 @@
 import pygame
-from board import Board
+import assets
+from bitboard import BitboardBoard
 from ai_player import ChessAI
+from ai_worker import AIWorker
+from book import open_book
+from tablebase import Tablebases
 
 class Game:
     """Класс управления игрой с AI"""
     
-    def __init__(self, screen, ai_enabled=True, ai_color='black', ai_depth=3):
+    def __init__(self, screen, ai_enabled=True, ai_color='black', ai_depth=3, board_cls=BitboardBoard,
+                 ai_time_limit_ms=None, ai_ponder=True, stats_log=None):
         self.screen = screen
-        self.board = Board()
+        self.board = board_cls()
         self.selected_piece = None
         self.selected_pos = None
         self.valid_moves = []
@@ -17,19 +22,44 @@ class Game:
         
 
         self.ai_enabled = ai_enabled
-        self.ai = ChessAI(depth=ai_depth, color=ai_color) if ai_enabled else None
+        self.ai = ChessAI(depth=ai_depth, color=ai_color, time_limit_ms=ai_time_limit_ms,
+                          book=open_book(), tablebases=Tablebases()) if ai_enabled else None
         self.ai_thinking = False
+        self.ai_worker = AIWorker(self.ai) if ai_enabled else None
+        self.ai_future = None
+        # Pondering: пока игрок думает, AI считает ответ на ожидаемый ход
+        self.ai_ponder = ai_ponder
+        # Статистика поиска: панель на экране и журнал JSON Lines (stats_log)
+        self.show_stats = False
+        self.stats_log = stats_log
         
         self.WHITE = (238, 238, 210)
         self.BLACK = (118, 150, 86)
         self.HIGHLIGHT = (186, 202, 68)
         self.VALID_MOVE = (246, 246, 130)
+        self.HOVER = (255, 255, 255)
         
         self.SQUARE_SIZE = 100
         
-        self.font = pygame.font.Font(None, 36)
-        self.big_font = pygame.font.Font(None, 72)
-        self.small_font = pygame.font.Font(None, 24)
+        # Перерисовываются только изменившиеся клетки; полная отрисовка -
+        # в первом кадре и после invalidate()
+        self.dirty = set()
+        self.full_redraw = True
+        # Клетка под курсором: ее рамка перерисовывается, только когда курсор
+        # переходит на другую клетку
+        self.hover_pos = None
+    
+    def handle_motion(self, pos):
+        """Движение мыши: подсветить клетку под курсором"""
+        col = pos[0] // self.SQUARE_SIZE
+        row = pos[1] // self.SQUARE_SIZE
+        hover = (row, col) if self.board.is_valid_pos((row, col)) and not self.game_over else None
+        if hover != self.hover_pos:
+            if self.hover_pos:
+                self.dirty.add(self.hover_pos)
+            if hover:
+                self.dirty.add(hover)
+            self.hover_pos = hover
     
     def handle_click(self, pos):
         """Обработка клика мыши"""
@@ -49,29 +79,28 @@ class Game:
         
         if self.selected_piece:
             if (row, col) in self.valid_moves:
+                move = (self.selected_pos, (row, col))
                 self._make_move(self.selected_pos, (row, col))
+                self._resolve_ponder(move)
             
             elif clicked_piece and clicked_piece.color == self.current_turn:
                 self.select_piece((row, col), clicked_piece)
             else:
-                self.selected_piece = None
-                self.selected_pos = None
-                self.valid_moves = []
+                self._clear_selection()
         
         elif clicked_piece and clicked_piece.color == self.current_turn:
             self.select_piece((row, col), clicked_piece)
     
     def _make_move(self, from_pos, to_pos):
         """Выполнить ход с проверкой мата и пата"""
-        self.board.move_piece(from_pos, to_pos)
-        
-        piece = self.board.get_piece(to_pos)
-        if piece.name == 'Pawn':
-            row, col = to_pos
-            if (row == 0 and self.current_turn == 'white') or \
-            (row == 7 and self.current_turn == 'black'):
-                from pieces import Queen
-                self.board.set_piece(to_pos, Queen(self.current_turn, to_pos))
+        # Превращение пешки в ферзя выполняет сама доска
+        before = [row[:] for row in self.board.board]
+        self.board.push((from_pos, to_pos))
+        # Изменившиеся клетки: с рокировкой и взятием на проходе их больше двух
+        for row in range(8):
+            for col in range(8):
+                if self.board.board[row][col] is not before[row][col]:
+                    self.dirty.add((row, col))
         
         self.current_turn = 'black' if self.current_turn == 'white' else 'white'
         
@@ -83,44 +112,119 @@ class Game:
             self.game_over = True
             self.winner = 'Ничья (Пат)'
         
+        if self.game_over:
+            self.full_redraw = True
+        self._clear_selection()
+
+    def _clear_selection(self):
+        """Снять выделение; клетки выделения и точек ходов нужно перерисовать"""
+        if self.selected_pos:
+            self.dirty.add(self.selected_pos)
+        self.dirty.update(self.valid_moves)
         self.selected_piece = None
         self.selected_pos = None
         self.valid_moves = []
-
     
     def select_piece(self, pos, piece):
         """Выбрать фигуру и показать валидные ходы"""
+        self._clear_selection()
         self.selected_piece = piece
         self.selected_pos = pos
         
-        all_moves = piece.get_valid_moves(self.board)
-        
         self.valid_moves = [
-            move for move in all_moves
-            if self.board.is_legal_move(pos, move, self.current_turn)
+            to_pos for from_pos, to_pos in self.board.legal_moves(self.current_turn)
+            if from_pos == pos
         ]
+        self.dirty.add(pos)
+        self.dirty.update(self.valid_moves)
     
     def update(self):
         """Обновление состояния игры"""
-        # Если ход AI
+        # Если ход AI - запускаем поиск в фоне, окно продолжает отрисовываться
         if self.ai_enabled and self.current_turn == self.ai.color and not self.game_over and not self.ai_thinking:
             self.ai_thinking = True
+            self.ai_future = self.ai_worker.start(self.board)
             pygame.display.set_caption('Шахматы - ИИ думает...')
     
     def make_ai_move(self):
-        """Сделать ход AI (вызывается после отрисовки)"""
-        if self.ai_thinking:
-            move = self.ai.get_best_move(self.board)
+        """Сделать ход AI, если фоновый поиск уже закончился"""
+        if self.ai_thinking and self.ai_future is not None and self.ai_future.done():
+            move = self.ai_future.result()
+            self.ai_future = None
             
             if move:
                 from_pos, to_pos = move
                 self._make_move(from_pos, to_pos)
+                stats = self.ai.last_stats
+                if stats is not None:
+                    # PV читается из таблицы AI, пока ее не начало менять обдумывание
+                    stats.freeze()
+                    if self.stats_log:
+                        stats.dump(self.stats_log)
+                    if self.show_stats:
+                        self.invalidate()
             
             self.ai_thinking = False
             pygame.display.set_caption('Шахматы')
+            self._start_ponder()
+    
+    def _start_ponder(self):
+        """Начать поиск на время игрока: ответ на его самый вероятный ход"""
+        if not self.ai_ponder or self.game_over or self.current_turn == self.ai.color:
+            return
+        predicted = self.ai.predicted_reply(self.board)
+        if predicted is not None:
+            self.ai_future = self.ai_worker.start(self.board, ponder_move=predicted)
+    
+    def _resolve_ponder(self, move):
+        """Игрок походил: при угаданном ходе продолжаем начатый поиск, иначе бросаем его"""
+        if not self.ai_enabled or not self.ai_worker.pondering:
+            return
+        if move == self.ai_worker.ponder_move and not self.game_over:
+            self.ai_worker.ponder_hit()
+            self.ai_thinking = True
+            pygame.display.set_caption('Шахматы - ИИ думает...')
+        else:
+            self.ai_worker.cancel(wait=True)
+            self.ai_future = None
+    
+    def cancel_ai(self):
+        """Прервать поиск AI (выход в меню или закрытие окна)"""
+        if self.ai_worker is not None:
+            self.ai_worker.cancel()
+        self.ai_future = None
+        self.ai_thinking = False
+        pygame.display.set_caption('Шахматы')
+    
+    def close(self):
+        """Дождаться остановки AI и закрыть его книгу и таблицы (конец партии)"""
+        if self.ai_worker is not None:
+            self.ai_worker.cancel(wait=True)
+            self.ai.close()
+        self.ai_future = None
+        self.ai_thinking = False
+    
+    def toggle_stats(self):
+        """Показать или скрыть панель статистики поиска"""
+        if self.ai_enabled:
+            self.show_stats = not self.show_stats
+            self.invalidate()
+    
+    def invalidate(self):
+        """Перерисовать весь экран в следующем кадре"""
+        self.full_redraw = True
     
     def draw(self):
-        """Отрисовка игры"""
+        """Отрисовка игры; возвращает прямоугольники для pygame.display.update"""
+        if not self.full_redraw:
+            rects = [self.draw_square(pos) for pos in self.dirty]
+            self.dirty.clear()
+            if rects and self.show_stats:
+                rects.append(self.draw_stats())
+            return rects
+        
+        self.full_redraw = False
+        self.dirty.clear()
         self.draw_board()
         self.draw_pieces()
         
@@ -130,8 +234,46 @@ class Game:
         if self.valid_moves:
             self.draw_valid_moves() 
         
+        if self.hover_pos:
+            self.draw_hover()
+        
+        if self.show_stats:
+            self.draw_stats()
+        
         if self.game_over:
             self.draw_game_over()
+        return [self.screen.get_rect()]
+    
+    def draw_stats(self):
+        """Непрозрачная панель статистики последнего поиска AI внизу доски"""
+        stats = self.ai.last_stats
+        lines = stats.lines() if stats is not None else ["Поиск еще не запускался"]
+        font = assets.font(22)
+        height = 8 + 20 * len(lines)
+        rect = pygame.Rect(0, 8 * self.SQUARE_SIZE - height, 8 * self.SQUARE_SIZE, height)
+        self.screen.fill((20, 20, 20), rect)
+        for index, line in enumerate(lines):
+            self.screen.blit(font.render(line, True, (230, 230, 230)), (8, rect.y + 4 + 20 * index))
+        return rect
+    
+    def draw_square(self, pos):
+        """Перерисовать одну клетку со всем, что на ней лежит"""
+        row, col = pos
+        rect = pygame.Rect(col * self.SQUARE_SIZE, row * self.SQUARE_SIZE,
+                           self.SQUARE_SIZE, self.SQUARE_SIZE)
+        self.screen.set_clip(rect)
+        self.screen.fill(self.WHITE if (row + col) % 2 == 0 else self.BLACK, rect)
+        piece = self.board.get_piece(pos)
+        if piece:
+            self.draw_piece(piece, pos)
+        if pos == self.selected_pos:
+            self.draw_selection()
+        if pos in self.valid_moves:
+            self.draw_valid_move(pos)
+        if pos == self.hover_pos:
+            self.draw_hover()
+        self.screen.set_clip(None)
+        return rect
     
     def draw_board(self):
         """Отрисовка доски"""
@@ -146,55 +288,21 @@ class Game:
                 )
     
     def draw_pieces(self):
-        """Отрисовка фигур с правильным шрифтом"""
-        piece_symbols = {
-            'white': {'King': '♔', 'Queen': '♕', 'Rook': '♖', 
-                    'Bishop': '♗', 'Knight': '♘', 'Pawn': '♙'},
-            'black': {'King': '♚', 'Queen': '♛', 'Rook': '♜',
-                    'Bishop': '♝', 'Knight': '♞', 'Pawn': '♟'}
-        }
-        
-        try:
-            font = pygame.font.SysFont('segoeuisymbol', 70)
-        except:
-            try:
-                font = pygame.font.SysFont('dejavusans', 70)
-            except:
-                font = pygame.font.Font(None, 70)
-        
+        """Отрисовка фигур готовыми символами из кэша"""
         for row in range(8):
             for col in range(8):
                 piece = self.board.get_piece((row, col))
                 if piece:
-                    symbol = piece_symbols[piece.color][piece.name]
-                    
-                    if piece.color == 'white':
-                        color = (255, 255, 255)
-                    else:
-                        color = (0, 0, 0)
-                    
-                    text = font.render(symbol, True, color)
-                    text_rect = text.get_rect(
-                        center=(col * self.SQUARE_SIZE + self.SQUARE_SIZE // 2,
-                                row * self.SQUARE_SIZE + self.SQUARE_SIZE // 2)
-                    )
-
-                    if piece.color == 'white':
-                        outline = font.render(symbol, True, (0, 0, 0))
-                        for dx, dy in [(-1,-1), (-1,1), (1,-1), (1,1)]:
-                            outline_rect = text_rect.copy()
-                            outline_rect.x += dx
-                            outline_rect.y += dy
-                            self.screen.blit(outline, outline_rect)
-                    else:
-                        outline = font.render(symbol, True, (255, 255, 255))
-                        for dx, dy in [(-1,-1), (-1,1), (1,-1), (1,1)]:
-                            outline_rect = text_rect.copy()
-                            outline_rect.x += dx
-                            outline_rect.y += dy
-                            self.screen.blit(outline, outline_rect)
-                    
-                    self.screen.blit(text, text_rect)
+                    self.draw_piece(piece, (row, col))
+    
+    def draw_piece(self, piece, pos):
+        row, col = pos
+        glyph = assets.piece_glyph(piece.color, piece.name, self.SQUARE_SIZE)
+        glyph_rect = glyph.get_rect(
+            center=(col * self.SQUARE_SIZE + self.SQUARE_SIZE // 2,
+                    row * self.SQUARE_SIZE + self.SQUARE_SIZE // 2)
+        )
+        self.screen.blit(glyph, glyph_rect)
 
     def draw_selection(self):
         """Подсветка выбранной фигуры"""
@@ -207,28 +315,40 @@ class Game:
             5
         )
     
+    def draw_hover(self):
+        """Тонкая рамка клетки под курсором"""
+        row, col = self.hover_pos
+        pygame.draw.rect(
+            self.screen,
+            self.HOVER,
+            (col * self.SQUARE_SIZE, row * self.SQUARE_SIZE,
+             self.SQUARE_SIZE, self.SQUARE_SIZE),
+            2
+        )
+    
     def draw_valid_moves(self):
         """Отрисовка валидных ходов"""
-        for row, col in self.valid_moves:
-            pygame.draw.circle(
-                self.screen,
-                self.VALID_MOVE,
-                (col * self.SQUARE_SIZE + self.SQUARE_SIZE // 2,
-                 row * self.SQUARE_SIZE + self.SQUARE_SIZE // 2),
-                15
-            )
+        for pos in self.valid_moves:
+            self.draw_valid_move(pos)
+    
+    def draw_valid_move(self, pos):
+        row, col = pos
+        pygame.draw.circle(
+            self.screen,
+            self.VALID_MOVE,
+            (col * self.SQUARE_SIZE + self.SQUARE_SIZE // 2,
+             row * self.SQUARE_SIZE + self.SQUARE_SIZE // 2),
+            15
+        )
     
     def draw_game_over(self):
         """Экран окончания игры"""
-        overlay = pygame.Surface((800, 800))
-        overlay.set_alpha(200)
-        overlay.fill((0, 0, 0))
-        self.screen.blit(overlay, (0, 0))
+        self.screen.blit(assets.overlay((800, 800), 200), (0, 0))
         
-        text = self.big_font.render(f"Победа: {self.winner}!", True, (255, 215, 0))
+        text = assets.text(f"Победа: {self.winner}!", 72, (255, 215, 0))
         text_rect = text.get_rect(center=(400, 400))
         self.screen.blit(text, text_rect)
         
-        restart_text = self.font.render("Нажмите ESC для выхода", True, (255, 255, 255))
+        restart_text = assets.text("Нажмите ESC для выхода", 36, (255, 255, 255))
         restart_rect = restart_text.get_rect(center=(400, 500))
         self.screen.blit(restart_text, restart_rect)
\ No newline at end of file
@@ -1,6 +1,23 @@
+import os
+
 import pygame
+import assets
 from game import Game
 
+# Уровень сложности: (максимальная глубина, время на ход в мс).
+# Поиск углубляется, пока не кончится время, поэтому задержка предсказуема
+DIFFICULTY_LEVELS = {
+    'easy': (2, 300),
+    'medium': (4, 1000),
+    'hard': (8, 3000),
+}
+
+
+def wait_events():
+    """Спать до следующего события и забрать его вместе с накопившимися"""
+    return [pygame.event.wait()] + pygame.event.get()
+
+
 class Button:
 
     def __init__(self, x, y, width, height ,text, color, hover_color):
@@ -9,13 +26,12 @@ class Button:
         self.color = color
         self.hover_color = hover_color
         self.current_color = color
-        self.font = pygame.font.Font(None, 48)
     
     def draw(self, screen):
         pygame.draw.rect(screen, self.current_color, self.rect, border_radius=10)
         pygame.draw.rect(screen, (255, 255, 255), self.rect, 3, border_radius=10)
         
-        text_surf = self.font.render(self.text, True, (255, 255, 255))
+        text_surf = assets.text(self.text, 48, (255, 255, 255))
         text_rect = text_surf.get_rect(center=self.rect.center)
         screen.blit(text_surf, text_rect)
     
@@ -38,17 +54,11 @@ def show_menu(screen):
     
     buttons = [ai_button, pvp_button, quit_button]
     
-    clock = pygame.time.Clock()
-    
+    # Меню меняется только от событий (наведение на кнопку), поэтому
+    # перерисовывается после каждой пачки событий, а не 60 раз в секунду
+    events = []
     while True:
-        screen.fill((30, 30, 30))
-        
-        title_font = pygame.font.Font(None, 80)
-        title = title_font.render("ШАХМАТЫ", True, (255, 215, 0))
-        title_rect = title.get_rect(center=(400, 120))
-        screen.blit(title, title_rect)
-        
-        for event in pygame.event.get():
+        for event in events:
             if event.type == pygame.QUIT:
                 return None
             
@@ -68,11 +78,17 @@ def show_menu(screen):
             if quit_button.handle_event(event):
                 return None
         
+        screen.fill((30, 30, 30))
+        
+        title = assets.text("ШАХМАТЫ", 80, (255, 215, 0))
+        title_rect = title.get_rect(center=(400, 120))
+        screen.blit(title, title_rect)
+        
         for button in buttons:
             button.draw(screen)
         
         pygame.display.flip()
-        clock.tick(60)
+        events = wait_events()
 
 def main():
     pygame.init()
@@ -91,7 +107,9 @@ def main():
             difficulty = show_difficulty_menu(screen)
             if difficulty is None:
                 continue
-            game = Game(screen, ai_enabled=True, ai_color='black', ai_depth=difficulty)
+            ai_depth, ai_time_limit_ms = difficulty
+            game = Game(screen, ai_enabled=True, ai_color='black', ai_depth=ai_depth,
+                        ai_time_limit_ms=ai_time_limit_ms, stats_log=os.environ.get('CHESS_STATS'))
         else:
             game = Game(screen, ai_enabled=False)
         
@@ -99,30 +117,56 @@ def main():
         running = True
         
         while running:
-            clock.tick(60)
+            rects = game.draw()
+            if rects:
+                pygame.display.update(rects)
             
-            for event in pygame.event.get():
+            if game.game_over:
+                game.close()
+                if not show_game_over_screen(screen, game.winner):
+                    pygame.quit()
+                    return
+                break
+            
+            if game.ai_thinking:
+                # Пока AI думает, опрашиваем поиск с частотой кадров
+                clock.tick(60)
+                events = pygame.event.get()
+            else:
+                # Простой: ждем ввода, не тратя процессор
+                events = wait_events()
+            
+            for event in events:
                 if event.type == pygame.QUIT:
+                    game.cancel_ai()
+                    game.close()
                     pygame.quit()
                     return
                 
                 elif event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_ESCAPE:
+                        game.cancel_ai()
+                        game.close()
                         running = False
+                    elif event.key == pygame.K_i:
+                        game.toggle_stats()
                 
                 elif event.type == pygame.MOUSEBUTTONDOWN:
                     game.handle_click(pygame.mouse.get_pos())
+                
+                elif event.type == pygame.MOUSEMOTION:
+                    game.handle_motion(event.pos)
+                
+                elif event.type == pygame.VIDEOEXPOSE:
+                    game.invalidate()
+            
+            if not running:
+                break
             
             game.update()
-            game.draw()
-            pygame.display.flip()
             
             if game.ai_thinking:
                 game.make_ai_move()
-            
-            if game.game_over:
-                show_game_over_screen(screen, game.winner)
-                running = False
     
     pygame.quit()
 
@@ -135,17 +179,9 @@ def show_difficulty_menu(screen):
     
     buttons = [easy_button, medium_button, hard_button, back_button]
     
-    clock = pygame.time.Clock()
-    
+    events = []
     while True:
-        screen.fill((30, 30, 30))
-        
-        title_font = pygame.font.Font(None, 60)
-        title = title_font.render("Выберите сложность", True, (255, 215, 0))
-        title_rect = title.get_rect(center=(400, 100))
-        screen.blit(title, title_rect)
-        
-        for event in pygame.event.get():
+        for event in events:
             if event.type == pygame.QUIT:
                 return None
             
@@ -157,51 +193,53 @@ def show_difficulty_menu(screen):
                 button.handle_event(event)
             
             if easy_button.handle_event(event):
-                return 2
+                return DIFFICULTY_LEVELS['easy']
             if medium_button.handle_event(event):
-                return 3
+                return DIFFICULTY_LEVELS['medium']
             if hard_button.handle_event(event):
-                return 4
+                return DIFFICULTY_LEVELS['hard']
             if back_button.handle_event(event):
                 return None
         
+        screen.fill((30, 30, 30))
+        
+        title = assets.text("Выберите сложность", 60, (255, 215, 0))
+        title_rect = title.get_rect(center=(400, 100))
+        screen.blit(title, title_rect)
+        
         for button in buttons:
             button.draw(screen)
         
         pygame.display.flip()
-        clock.tick(60)
+        events = wait_events()
 
 def show_game_over_screen(screen, winner):
-    """Экран окончания игры"""
-    overlay = pygame.Surface((800, 800))
-    overlay.set_alpha(220)
-    overlay.fill((0, 0, 0))
-    screen.blit(overlay, (0, 0))
+    """Экран окончания игры; False - окно закрыли"""
+    screen.blit(assets.overlay((800, 800), 220), (0, 0))
     
-    big_font = pygame.font.Font(None, 72)
-    text = big_font.render(f"Победа: {winner}!", True, (255, 215, 0))
+    text = assets.text(f"Победа: {winner}!", 72, (255, 215, 0))
     text_rect = text.get_rect(center=(400, 300))
     screen.blit(text, text_rect)
     
-    font = pygame.font.Font(None, 40)
-    restart_text = font.render("Нажмите любую клавишу", True, (255, 255, 255))
+    restart_text = assets.text("Нажмите любую клавишу", 40, (255, 255, 255))
     restart_rect = restart_text.get_rect(center=(400, 400))
     screen.blit(restart_text, restart_rect)
     
-    continue_text = font.render("для возврата в меню", True, (255, 255, 255))
+    continue_text = assets.text("для возврата в меню", 40, (255, 255, 255))
     continue_rect = continue_text.get_rect(center=(400, 450))
     screen.blit(continue_text, continue_rect)
     
     pygame.display.flip()
     
-    waiting = True
-    while waiting:
-        for event in pygame.event.get():
+    # Экран неподвижен: спим до события, как в меню
+    while True:
+        for event in wait_events():
             if event.type == pygame.QUIT:
-                pygame.quit()
-                return
+                return False
             if event.type == pygame.KEYDOWN or event.type == pygame.MOUSEBUTTONDOWN:
-                waiting = False
+                return True
+            if event.type == pygame.VIDEOEXPOSE:
+                pygame.display.flip()
 
 
 if __name__ == '__main__':
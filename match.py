@@ -0,0 +1,267 @@
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+from multiprocessing import Pool
+
+from ai_player import ChessAI
+from bitboard import BitboardBoard
+from board import START_FEN
+from notation import move_uci
+
+# Ключи описания движка: depth=4,time=200,nodes=50000,hash=16,batch=1
+ENGINE_KEYS = {'depth': 'depth', 'time': 'time_limit_ms', 'nodes': 'max_nodes',
+               'hash': 'tt_size_mb', 'batch': 'batch_leaves'}
+
+# Партия без результата после стольких полуходов - ничья
+MAX_PLIES = 300
+
+# Без файла дебютов партии начинаются со стольких случайных полуходов:
+# детерминированные движки иначе играют одну и ту же партию
+RANDOM_PLIES = 8
+
+
+def parse_engine(spec):
+    """'depth=4,time=200' -> аргументы ChessAI"""
+    config = {}
+    for item in spec.split(','):
+        if not item:
+            continue
+        key, _, value = item.partition('=')
+        if key not in ENGINE_KEYS or not value:
+            raise ValueError(f"Некорректный параметр движка: {item}")
+        config[ENGINE_KEYS[key]] = bool(int(value)) if key == 'batch' else int(value)
+    return config
+
+
+def read_openings(path):
+    """Позиции в FEN, по одной в строке (пустые строки и # - комментарии)"""
+    openings = []
+    with open(path, encoding='utf-8') as openings_file:
+        for line in openings_file:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                # В EPD после четырех полей позиции идут операции (bm, id ...), а не счетчики ходов
+                fields = line.split()
+                clocks = len(fields) >= 6 and fields[4].isdigit() and fields[5].isdigit()
+                openings.append(' '.join(fields[:6] if clocks else fields[:4]))
+    if not openings:
+        raise ValueError(f"В файле нет позиций: {path}")
+    return openings
+
+
+def random_openings(count, plies, seed=None):
+    """count разных позиций после plies случайных легальных полуходов от начальной"""
+    rng = random.Random(seed)
+    openings = []
+    seen = set()
+    attempts = 0
+    while len(openings) < count and attempts < count * 100:
+        attempts += 1
+        board = BitboardBoard()
+        for _ in range(plies):
+            moves = board.legal_moves(board.turn)
+            if not moves:
+                break
+            board.push(rng.choice(moves))
+        if not board.legal_moves(board.turn) or board.zobrist_key in seen:
+            continue
+        seen.add(board.zobrist_key)
+        openings.append(board.fen())
+    return openings
+
+
+def play_game(task):
+    """Одна партия; возвращает запись для журнала.
+
+    task: (номер, FEN, параметры белых, параметры черных, A играет белыми, лимит полуходов)
+    """
+    game_id, fen, white_config, black_config, a_is_white, max_plies = task
+    board = BitboardBoard()
+    board.set_fen(fen)
+    players = {'white': ChessAI(color='white', **white_config),
+               'black': ChessAI(color='black', **black_config)}
+    repetitions = {board.zobrist_key: 1}
+    moves = []
+    start = time.perf_counter()
+
+    result, reason = '1/2-1/2', 'max plies'
+    while len(moves) < max_plies:
+        color = board.turn
+        if board.is_checkmate(color):
+            result, reason = ('0-1' if color == 'white' else '1-0'), 'checkmate'
+            break
+        if board.is_stalemate(color):
+            reason = 'stalemate'
+            break
+        if board.piece_count == 2:
+            reason = 'insufficient material'
+            break
+        if board.halfmove_clock >= 100:
+            reason = 'fifty moves'
+            break
+        move = players[color].get_best_move(board)
+        moves.append(move_uci(board, move))
+        board.push(move)
+        key = board.zobrist_key
+        repetitions[key] = repetitions.get(key, 0) + 1
+        if repetitions[key] >= 3:
+            reason = 'repetition'
+            break
+
+    for player in players.values():
+        player.close()
+    return {'game': game_id, 'opening': fen, 'white': 'A' if a_is_white else 'B',
+            'result': result, 'reason': reason, 'plies': len(moves),
+            'seconds': round(time.perf_counter() - start, 2), 'moves': moves}
+
+
+def score_for_a(record):
+    """Очки движка A в партии: 1, 0.5 или 0"""
+    if record['result'] == '1/2-1/2':
+        return 0.5
+    white_won = record['result'] == '1-0'
+    return 1.0 if white_won == (record['white'] == 'A') else 0.0
+
+
+def expected_score(elo):
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def elo_difference(wins, draws, losses):
+    """Разница Эло A - B и полуширина 95% интервала; None, если считать рано"""
+    games = wins + draws + losses
+    if not games:
+        return None
+    score = (wins + draws / 2) / games
+    if score <= 0 or score >= 1:
+        return None
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    margin = 1.96 * math.sqrt(variance / games)
+
+    def to_elo(s):
+        s = min(max(s, 1e-6), 1 - 1e-6)
+        return -400 * math.log10(1 / s - 1) + 0.0
+
+    return to_elo(score), (to_elo(score + margin) - to_elo(score - margin)) / 2
+
+
+def sprt_llr(wins, draws, losses, elo0, elo1):
+    """Логарифм отношения правдоподобия H1 (elo1) к H0 (elo0), нормальное приближение"""
+    games = wins + draws + losses
+    if not wins + losses or not games:
+        return 0.0
+    score = (wins + draws / 2) / games
+    variance = (wins + draws / 4) / games - score ** 2
+    if variance <= 0:
+        return 0.0
+    score0, score1 = expected_score(elo0), expected_score(elo1)
+    return (score1 - score0) * (2 * score - score0 - score1) / (2 * variance / games)
+
+
+def sprt_bounds(alpha, beta):
+    """Границы LLR: ниже - принять H0, выше - принять H1"""
+    return math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+
+
+def run_match(config_a, config_b, openings, games, processes, log_path=None, max_plies=MAX_PLIES,
+              sprt=None):
+    """Матч A против B; каждая позиция играется дважды со сменой цвета.
+
+    sprt - (elo0, elo1, alpha, beta) или None. Возвращает (wins, draws, losses) для A.
+    """
+    tasks = []
+    for game_id in range(games):
+        fen = openings[game_id // 2 % len(openings)]
+        a_is_white = game_id % 2 == 0
+        white, black = (config_a, config_b) if a_is_white else (config_b, config_a)
+        tasks.append((game_id, fen, white, black, a_is_white, max_plies))
+    bounds = sprt_bounds(sprt[2], sprt[3]) if sprt else None
+
+    wins = draws = losses = 0
+    log_file = open(log_path, 'a', encoding='utf-8') if log_path else None
+    pool = Pool(processes)
+    try:
+        for record in pool.imap_unordered(play_game, tasks):
+            score = score_for_a(record)
+            wins += score == 1.0
+            draws += score == 0.5
+            losses += score == 0.0
+            if log_file:
+                log_file.write(json.dumps(record) + '\n')
+                log_file.flush()
+
+            line = (f"Партия {record['game'] + 1}: {record['result']} ({record['reason']}, "
+                    f"{record['plies']} полуходов), A: +{wins} ={draws} -{losses}")
+            elo = elo_difference(wins, draws, losses)
+            if elo is not None:
+                line += f", Эло {elo[0]:+.1f} ± {elo[1]:.1f}"
+            if bounds:
+                llr = sprt_llr(wins, draws, losses, sprt[0], sprt[1])
+                line += f", LLR {llr:.2f} [{bounds[0]:.2f}, {bounds[1]:.2f}]"
+            print(line, flush=True)
+
+            if bounds and not bounds[0] < llr < bounds[1]:
+                verdict = 'H1' if llr >= bounds[1] else 'H0'
+                print(f"SPRT: принята {verdict} (elo0={sprt[0]}, elo1={sprt[1]})")
+                break
+    finally:
+        pool.terminate()
+        pool.join()
+        if log_file:
+            log_file.close()
+    return wins, draws, losses
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Матч двух настроек ChessAI друг против друга')
+    parser.add_argument('engine_a', type=parse_engine, help='движок A, например depth=4,time=200')
+    parser.add_argument('engine_b', type=parse_engine, help='движок B, например depth=3')
+    parser.add_argument('-n', '--games', type=int, default=100, help='число партий')
+    parser.add_argument('-j', '--processes', type=int, default=os.cpu_count() or 1,
+                        help='число процессов (по умолчанию все ядра)')
+    parser.add_argument('--openings', default=None, help='файл с начальными позициями в FEN/EPD')
+    parser.add_argument('--random-plies', type=int, default=None,
+                        help=f"без --openings: число случайных полуходов в начале (по умолчанию {RANDOM_PLIES})")
+    parser.add_argument('--seed', type=int, default=None, help='зерно для случайных дебютов')
+    parser.add_argument('--log', default=None, help='журнал партий в JSON Lines')
+    parser.add_argument('--max-plies', type=int, default=MAX_PLIES, help='ничья после стольких полуходов')
+    parser.add_argument('--sprt', type=float, nargs=2, metavar=('ELO0', 'ELO1'), default=None,
+                        help='остановить матч по SPRT с гипотезами elo0 и elo1')
+    parser.add_argument('--alpha', type=float, default=0.05, help='ошибка первого рода SPRT')
+    parser.add_argument('--beta', type=float, default=0.05, help='ошибка второго рода SPRT')
+    args = parser.parse_args(argv)
+
+    if args.openings:
+        openings = read_openings(args.openings)
+    else:
+        plies = RANDOM_PLIES if args.random_plies is None else args.random_plies
+        if plies > 0:
+            # Каждая позиция играется дважды, со сменой цвета
+            openings = random_openings((args.games + 1) // 2, plies, args.seed)
+        else:
+            openings = [START_FEN]
+    if len(openings) == 1 and args.games > 2:
+        # Одна позиция и детерминированный поиск: все пары партий одинаковы,
+        # и Эло с SPRT считались бы по повторам одной партии
+        if args.sprt:
+            parser.error('SPRT на одной начальной позиции бессмыслен: задайте --openings или --random-plies')
+        print("Внимание: одна начальная позиция, партии будут повторяться", file=sys.stderr)
+    sprt = (args.sprt[0], args.sprt[1], args.alpha, args.beta) if args.sprt else None
+    start = time.perf_counter()
+    wins, draws, losses = run_match(args.engine_a, args.engine_b, openings, args.games, args.processes,
+                                    args.log, args.max_plies, sprt)
+
+    games = wins + draws + losses
+    print(f"Итог A против B: +{wins} ={draws} -{losses} из {games} за {time.perf_counter() - start:.0f} с")
+    elo = elo_difference(wins, draws, losses)
+    if elo is not None:
+        print(f"Разница Эло: {elo[0]:+.1f} ± {elo[1]:.1f} (95%)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
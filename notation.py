@@ -0,0 +1,128 @@
+from board import square_name, parse_square
+
+SAN_PIECES = {'N': 'Knight', 'B': 'Bishop', 'R': 'Rook', 'Q': 'Queen', 'K': 'King'}
+SAN_LETTERS = {name: letter for letter, name in SAN_PIECES.items()}
+
+
+def _promotion(move):
+    return move[2] if len(move) > 2 else 'Queen'
+
+
+def parse_san(board, san):
+    """Ход в алгебраической записи (Nf3, exd5, O-O, e8=Q+) -> ход доски для board.turn"""
+    text = san.rstrip('+#!?')
+    moves = board.legal_moves(board.turn, underpromotions=True)
+
+    if text in ('O-O', '0-0', 'O-O-O', '0-0-0'):
+        to_col = 6 if len(text) == 3 else 2
+        for move in moves:
+            piece = board.get_piece(move[0])
+            if piece.name == 'King' and move[1][1] == to_col and move[0][1] - to_col in (2, -2):
+                return move
+        raise ValueError(f"Рокировка невозможна: {san}")
+
+    promotion = None
+    if '=' in text:
+        text, letter = text.split('=', 1)
+        promotion = SAN_PIECES.get(letter)
+        if promotion is None or promotion == 'King':
+            raise ValueError(f"Некорректное превращение: {san}")
+    elif len(text) > 2 and text[-1] in 'NBRQ' and text[-2] in '18':
+        promotion = SAN_PIECES[text[-1]]
+        text = text[:-1]
+
+    name = 'Pawn'
+    if text and text[0] in SAN_PIECES:
+        name = SAN_PIECES[text[0]]
+        text = text[1:]
+    if len(text) < 2:
+        raise ValueError(f"Некорректный ход: {san}")
+    to_pos = parse_square(text[-2:])
+    hint = text[:-2].replace('x', '')
+
+    found = []
+    for move in moves:
+        if move[1] != to_pos or board.get_piece(move[0]).name != name:
+            continue
+        if name == 'Pawn' and to_pos[0] in (0, 7) and _promotion(move) != (promotion or 'Queen'):
+            continue
+        from_name = square_name(move[0])
+        if any(ch not in from_name for ch in hint):
+            continue
+        found.append(move)
+
+    if len(found) != 1:
+        raise ValueError(f"{'Неоднозначный' if found else 'Невозможный'} ход: {san}")
+    return found[0]
+
+
+def move_san(board, move):
+    """Ход доски -> алгебраическая запись (до хода, позиция board)"""
+    from_pos, to_pos = move[0], move[1]
+    piece = board.get_piece(from_pos)
+    if piece.name == 'King' and abs(to_pos[1] - from_pos[1]) == 2:
+        san = 'O-O' if to_pos[1] == 6 else 'O-O-O'
+    else:
+        capture = board.get_piece(to_pos) is not None or (piece.name == 'Pawn' and to_pos[1] != from_pos[1])
+        if piece.name == 'Pawn':
+            san = square_name(from_pos)[0] + 'x' if capture else ''
+            san += square_name(to_pos)
+            if to_pos[0] in (0, 7):
+                san += '=' + SAN_LETTERS[_promotion(move)]
+        else:
+            # Уточнение вертикалью или горизонталью, если так же может пойти другая такая же фигура
+            rivals = [m[0] for m in board.legal_moves(piece.color)
+                      if m[1] == to_pos and m[0] != from_pos and board.get_piece(m[0]).name == piece.name]
+            hint = ''
+            if rivals:
+                from_name = square_name(from_pos)
+                if all(pos[1] != from_pos[1] for pos in rivals):
+                    hint = from_name[0]
+                elif all(pos[0] != from_pos[0] for pos in rivals):
+                    hint = from_name[1]
+                else:
+                    hint = from_name
+            san = SAN_LETTERS[piece.name] + hint + ('x' if capture else '') + square_name(to_pos)
+
+    board.push(move)
+    opponent = board.turn
+    if board.is_check(opponent):
+        san += '#' if not board.legal_moves(opponent) else '+'
+    board.pop()
+    return san
+
+
+UCI_PROMOTIONS = {'q': 'Queen', 'r': 'Rook', 'b': 'Bishop', 'n': 'Knight'}
+UCI_LETTERS = {name: letter for letter, name in UCI_PROMOTIONS.items()}
+
+
+def parse_uci(board, text):
+    """Ход в координатной записи UCI (e2e4, e7e8q) -> ход доски для board.turn"""
+    if len(text) not in (4, 5) or (len(text) == 5 and text[4] not in UCI_PROMOTIONS):
+        raise ValueError(f"Некорректный ход: {text}")
+    from_pos, to_pos = parse_square(text[:2]), parse_square(text[2:4])
+    promotion = UCI_PROMOTIONS[text[4]] if len(text) == 5 else 'Queen'
+    for move in board.legal_moves(board.turn, underpromotions=True):
+        if move[0] == from_pos and move[1] == to_pos and _promotion(move) == promotion:
+            return move
+    raise ValueError(f"Невозможный ход: {text}")
+
+
+def move_uci(board, move):
+    """Ход доски -> координатная запись UCI (до хода, позиция board)"""
+    text = square_name(move[0]) + square_name(move[1])
+    piece = board.get_piece(move[0])
+    if piece.name == 'Pawn' and move[1][0] in (0, 7):
+        text += UCI_LETTERS[_promotion(move)]
+    return text
+
+
+def line_uci(board, moves):
+    """Последовательность ходов из позиции board -> список ходов UCI (доска не меняется)"""
+    names = []
+    for move in moves:
+        names.append(move_uci(board, move))
+        board.push(move)
+    for _ in moves:
+        board.pop()
+    return names
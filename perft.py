@@ -0,0 +1,144 @@
+import argparse
+import sys
+import time
+from multiprocessing import Pool
+
+from board import Board, START_FEN, square_name
+from bitboard import BitboardBoard
+
+BOARD_CLASSES = {'bitboard': BitboardBoard, 'mailbox': Board}
+
+# Эталонные числа листьев по глубинам 1, 2, 3, ...
+# (https://www.chessprogramming.org/Perft_Results)
+PERFT_SUITE = [
+    ('startpos', START_FEN,
+     [20, 400, 8902, 197281, 4865609]),
+    ('kiwipete', 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+     [48, 2039, 97862, 4085603]),
+    ('position3', '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+     [14, 191, 2812, 43238, 674624]),
+    ('position4', 'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+     [6, 264, 9467, 422333]),
+    ('position5', 'rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8',
+     [44, 1486, 62379, 2103487]),
+    ('position6', 'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+     [46, 2079, 89890, 3894594]),
+]
+
+PROMOTION_LETTERS = {'Queen': 'q', 'Rook': 'r', 'Bishop': 'b', 'Knight': 'n'}
+
+
+def perft(board, depth):
+    """Число листьев дерева легальных ходов глубины depth"""
+    if depth == 0:
+        return 1
+    moves = board.legal_moves(board.turn, underpromotions=True)
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        board.push(move)
+        nodes += perft(board, depth - 1)
+        board.pop()
+    return nodes
+
+
+def _perft_root_move(args):
+    board, move, depth = args
+    board.push(move)
+    nodes = perft(board, depth - 1)
+    board.pop()
+    return nodes
+
+
+def divide(board, depth, processes=1):
+    """Perft по каждому ходу из корня: [(ход, число листьев)].
+
+    При processes > 1 ходы корня раздаются пулу процессов, каждый получает
+    свою копию доски.
+    """
+    assert depth >= 1
+    moves = board.legal_moves(board.turn, underpromotions=True)
+    tasks = [(board, move, depth) for move in moves]
+    if processes > 1 and len(moves) > 1:
+        with Pool(processes) as pool:
+            counts = pool.map(_perft_root_move, tasks)
+    else:
+        counts = [_perft_root_move(task) for task in tasks]
+    return list(zip(moves, counts))
+
+
+def move_name(move):
+    """Ход в координатной записи: e2e4, e7e8q"""
+    name = square_name(move[0]) + square_name(move[1])
+    if len(move) > 2:
+        name += PROMOTION_LETTERS[move[2]]
+    return name
+
+
+def run_perft(board, depth, processes=1, show_divide=False):
+    start = time.perf_counter()
+    if processes > 1 or show_divide:
+        results = divide(board, depth, processes)
+        nodes = sum(count for _, count in results)
+    else:
+        results = []
+        nodes = perft(board, depth)
+    elapsed = time.perf_counter() - start
+
+    if show_divide:
+        for move, count in sorted(results, key=lambda item: move_name(item[0])):
+            print(f"{move_name(move)}: {count}")
+        print()
+    return nodes, elapsed
+
+
+def run_suite(depth, processes=1, board_cls=BitboardBoard):
+    """Прогон эталонных позиций; True, если все числа совпали"""
+    all_ok = True
+    total_nodes = 0
+    total_time = 0.0
+    for name, fen, expected in PERFT_SUITE:
+        for d in range(1, min(depth, len(expected)) + 1):
+            board = board_cls()
+            board.set_fen(fen)
+            nodes, elapsed = run_perft(board, d, processes)
+            ok = nodes == expected[d - 1]
+            all_ok = all_ok and ok
+            total_nodes += nodes
+            total_time += elapsed
+            status = 'OK' if ok else f"ОШИБКА (ожидалось {expected[d - 1]})"
+            print(f"{name:<10} глубина {d}: {nodes:>9} {status:<8} "
+                  f"{elapsed:7.2f} с {_nps(nodes, elapsed):>8} узл/с")
+    print(f"Всего: {total_nodes} узлов за {total_time:.2f} с, {_nps(total_nodes, total_time)} узл/с")
+    return all_ok
+
+
+def _nps(nodes, elapsed):
+    return int(nodes / elapsed) if elapsed > 0 else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Perft: проверка и замер скорости генератора ходов')
+    parser.add_argument('depth', type=int, nargs='?', default=3, help='глубина перебора')
+    parser.add_argument('--fen', default=START_FEN, help='позиция в FEN (по умолчанию начальная)')
+    parser.add_argument('--divide', action='store_true', help='вывести число листьев по каждому ходу')
+    parser.add_argument('--suite', action='store_true', help='прогнать эталонный набор позиций')
+    parser.add_argument('-j', '--processes', type=int, default=1, help='число процессов для ходов корня')
+    parser.add_argument('--board', choices=sorted(BOARD_CLASSES), default='bitboard',
+                        help='реализация доски')
+    args = parser.parse_args(argv)
+
+    board_cls = BOARD_CLASSES[args.board]
+    if args.suite:
+        return 0 if run_suite(args.depth, args.processes, board_cls) else 1
+
+    board = board_cls()
+    board.set_fen(args.fen)
+    nodes, elapsed = run_perft(board, args.depth, args.processes, args.divide)
+    print(f"Глубина {args.depth}: {nodes} узлов за {elapsed:.2f} с, {_nps(nodes, elapsed)} узл/с")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,15 +1,28 @@
-class Piece:
+import tracing
+
+# Целочисленные коды типа и цвета фигуры: индексы в таблицах хеша,
+# оценки и битбордов
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+WHITE, BLACK = 0, 1
 
+
+class Piece:
+    # Без __dict__: фигуры создаются тысячами, а атрибуты читаются в каждом узле поиска.
+    # name и kind - атрибуты класса, у экземпляра только цвет, позиция и флаг хода
+    __slots__ = ('color', 'side', 'pos', '_has_moved')
+    name = None
+    kind = None
     
     def __init__(self, color, pos):
         assert color in ['white', 'black'], "Цвет должен быть white или black"
         assert len(pos) == 2, "Позиция должна быть кортежем (row, col)"
         
         self.color = color
+        self.side = WHITE if color == 'white' else BLACK
         self.pos = pos
         self._has_moved = False
-        self.name = self.__class__.__name__
-        print(f"✅ Создана фигура {self.name} {self.color} на {pos}, has_moved={self._has_moved}")
+        if tracing.moves >= tracing.DEBUG:
+            tracing.log('moves', tracing.DEBUG, f"Создана фигура {self.name} {self.color} на {pos}")
     
     @property
     def has_moved(self):
@@ -17,12 +30,10 @@ class Piece:
     
     @has_moved.setter
     def has_moved(self, value):
-        if value != self._has_moved:
-            import traceback
-            print(f"\n⚠️ ИЗМЕНЕНИЕ has_moved для {self.name} {self.color} на {self.pos}")
-            print(f"   Было: {self._has_moved} → Стало: {value}")
-            print("   Вызвано из:")
-            traceback.print_stack(limit=5)
+        if value != self._has_moved and tracing.moves >= tracing.INFO:
+            tracing.log('moves', tracing.INFO,
+                        f"has_moved для {self.name} {self.color} на {self.pos}: {self._has_moved} → {value}",
+                        stack=tracing.moves >= tracing.DEBUG)
         self._has_moved = value
     
     def get_valid_moves(self, board):
@@ -31,6 +42,9 @@ class Piece:
 
 
 class Pawn(Piece):
+    __slots__ = ()
+    name = 'Pawn'
+    kind = PAWN
     
     def get_valid_moves(self, board):
         moves = []
@@ -54,12 +68,22 @@ class Pawn(Piece):
                 target = board.get_piece(new_pos)
                 if target and target.color != self.color:
                     moves.append(new_pos)
+
+        en_passant = board.en_passant
+        if en_passant and en_passant[0] == row + direction and abs(en_passant[1] - col) == 1:
+            # Бить на проходе можно только пешку соперника, которая только что прошла два поля
+            passed = board.get_piece((row, en_passant[1]))
+            if passed and passed.kind == PAWN and passed.color != self.color:
+                moves.append(en_passant)
         
         return moves
 
 
 
 class Rook(Piece):
+    __slots__ = ()
+    name = 'Rook'
+    kind = ROOK
     
     def get_valid_moves(self, board):
         moves = []
@@ -87,6 +111,9 @@ class Rook(Piece):
 
 
 class Knight(Piece):
+    __slots__ = ()
+    name = 'Knight'
+    kind = KNIGHT
     
     def get_valid_moves(self, board):
         moves = []
@@ -109,6 +136,9 @@ class Knight(Piece):
 
 
 class Bishop(Piece):
+    __slots__ = ()
+    name = 'Bishop'
+    kind = BISHOP
     
     def get_valid_moves(self, board):
 
@@ -135,6 +165,9 @@ class Bishop(Piece):
         
         return moves
 class Queen(Piece):
+    __slots__ = ()
+    name = 'Queen'
+    kind = QUEEN
 
     
     def get_valid_moves(self, board):
@@ -167,6 +200,9 @@ class Queen(Piece):
 
 
 class King(Piece):
+    __slots__ = ()
+    name = 'King'
+    kind = KING
 
     
     def get_valid_moves(self, board):
@@ -189,178 +225,62 @@ class King(Piece):
                     moves.append(new_pos)
         
 
-        print(f"\n=== ПРОВЕРКА РОКИРОВКИ для {self.color} короля ===")
-        print(f"Король на позиции: {self.pos}")
-        print(f"has_moved: {self.has_moved}")
-        print(f"Король под шахом: {board.is_check(self.color)}")
-        
         if not self.has_moved and not board.is_check(self.color):
-            print(" Король не двигался и не под шахом")
-            
-
-            print("\n--- Проверка КОРОТКОЙ рокировки ---")
             can_castle_short = self._can_castle_kingside(board)
-            print(f"Короткая рокировка: {' ВОЗМОЖНА' if can_castle_short else ' НЕВОЗМОЖНА'}")
             if can_castle_short:
                 moves.append((row, col + 2))
-            
 
-            print("\n--- Проверка ДЛИННОЙ рокировки ---")
             can_castle_long = self._can_castle_queenside(board)
-            print(f"Длинная рокировка: {' ВОЗМОЖНА' if can_castle_long else ' НЕВОЗМОЖНА'}")
             if can_castle_long:
                 moves.append((row, col - 2))
-        else:
-            print(" Рокировка невозможна (король двигался или под шахом)")
-        
-        print(f"Всего ходов короля: {len(moves)}")
-        print("="*50)
+
+            if tracing.castling >= tracing.INFO:
+                tracing.log('castling', tracing.INFO,
+                            f"Король {self.color} на {self.pos}: короткая "
+                            f"{'возможна' if can_castle_short else 'невозможна'}, длинная "
+                            f"{'возможна' if can_castle_long else 'невозможна'}")
+        elif tracing.castling >= tracing.DEBUG:
+            tracing.log('castling', tracing.DEBUG,
+                        f"Король {self.color} на {self.pos}: рокировка невозможна "
+                        f"(король двигался или под шахом)")
+
+        if tracing.moves >= tracing.DEBUG:
+            tracing.log('moves', tracing.DEBUG, f"Король {self.color} на {self.pos}: {len(moves)} ходов")
         
         return moves
     
     def _can_castle_kingside(self, board):
-
+        """Проверка возможности короткой рокировки"""
         row, col = self.pos
-        
-
-        rook_pos = (row, 7)
-        rook = board.get_piece(rook_pos)
-        
-        print(f"  Ладья на {rook_pos}: {rook}")
-        if not rook:
-            print(f"   Ладьи нет на {rook_pos}")
-            return False
-        print(f"  Ладья: {rook.name}, has_moved: {rook.has_moved}")
-        
-        if rook.name != 'Rook':
-            print(f"   Это не ладья: {rook.name}")
-            return False
-        
-        if rook.has_moved:
-            print(f"   Ладья уже двигалась")
-            return False
-        
-
-        print(f"  Проверка клеток между {col+1} и 7:")
-        for c in range(col + 1, 7):
-            piece = board.get_piece((row, c))
-            print(f"    Клетка ({row}, {c}): {piece if piece else 'пусто'}")
-            if piece is not None:
-                print(f"   Клетка ({row}, {c}) занята")
-                return False
-        
-
-        print(f"  Проверка атакованных клеток:")
-        for c in range(col, col + 3):
-            attacked = self._is_square_attacked_safe(board, (row, c))
-            print(f"    Клетка ({row}, {c}): {' АТАКОВАНА' if attacked else ' безопасна'}")
-            if attacked:
-                return False
-        
-        return True
+        return self._can_castle(board, (row, 7), range(col + 1, 7), range(col, col + 3))
     
     def _can_castle_queenside(self, board):
         """Проверка возможности длинной рокировки"""
         row, col = self.pos
-        
+        return self._can_castle(board, (row, 0), range(1, col), range(col - 2, col + 1))
 
-        rook_pos = (row, 0)
+    def _can_castle(self, board, rook_pos, empty_cols, safe_cols):
+        row = self.pos[0]
         rook = board.get_piece(rook_pos)
-        
-        print(f"  Ладья на {rook_pos}: {rook}")
-        if not rook:
-            print(f"   Ладьи нет на {rook_pos}")
-            return False
-        print(f"  Ладья: {rook.name}, has_moved: {rook.has_moved}")
-        
-        if rook.name != 'Rook':
-            print(f"   Это не ладья: {rook.name}")
-            return False
-        
-        if rook.has_moved:
-            print(f"   Ладья уже двигалась")
-            return False
-        
 
-        print(f"  Проверка клеток между 1 и {col}:")
-        for c in range(1, col):
-            piece = board.get_piece((row, c))
-            print(f"    Клетка ({row}, {c}): {piece if piece else 'пусто'}")
-            if piece is not None:
-                print(f"   Клетка ({row}, {c}) занята")
-                return False
-        
+        if not rook or rook.kind != ROOK or rook.side != self.side:
+            return self._castling_rejected(f"нет ладьи на {rook_pos}")
 
-        print(f"  Проверка атакованных клеток:")
-        for c in range(col - 2, col + 1):
-            attacked = self._is_square_attacked_safe(board, (row, c))
-            print(f"    Клетка ({row}, {c}): {' АТАКОВАНА' if attacked else ' безопасна'}")
-            if attacked:
-                return False
-        
-        return True
-    
-    def _is_square_attacked_safe(self, board, square):
-        """Проверка атаки БЕЗ рекурсии"""
-        opponent_color = 'black' if self.color == 'white' else 'white'
-        sq_row, sq_col = square
-        
+        if rook.has_moved:
+            return self._castling_rejected(f"ладья на {rook_pos} уже двигалась")
 
-        pawn_dir = 1 if opponent_color == 'white' else -1
-        for dc in [-1, 1]:
-            pr, pc = sq_row - pawn_dir, sq_col + dc
-            if board.is_valid_pos((pr, pc)):
-                piece = board.get_piece((pr, pc))
-                if piece and piece.name == 'Pawn' and piece.color == opponent_color:
-                    return True
-        
+        for c in empty_cols:
+            if board.get_piece((row, c)) is not None:
+                return self._castling_rejected(f"клетка ({row}, {c}) занята")
 
-        knight_moves = [
-            (-2, -1), (-2, 1), (-1, -2), (-1, 2),
-            (1, -2), (1, 2), (2, -1), (2, 1)
-        ]
-        for dr, dc in knight_moves:
-            nr, nc = sq_row + dr, sq_col + dc
-            if board.is_valid_pos((nr, nc)):
-                piece = board.get_piece((nr, nc))
-                if piece and piece.name == 'Knight' and piece.color == opponent_color:
-                    return True
-        
-
-        for dr in [-1, 0, 1]:
-            for dc in [-1, 0, 1]:
-                if dr == 0 and dc == 0:
-                    continue
-                nr, nc = sq_row + dr, sq_col + dc
-                if board.is_valid_pos((nr, nc)):
-                    piece = board.get_piece((nr, nc))
-                    if piece and piece.name == 'King' and piece.color == opponent_color:
-                        return True
-        
+        opponent_color = 'black' if self.color == 'white' else 'white'
+        for c in safe_cols:
+            if board.is_square_attacked((row, c), opponent_color):
+                return self._castling_rejected(f"клетка ({row}, {c}) атакована")
 
-        diagonal_dirs = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
-        for dr, dc in diagonal_dirs:
-            for dist in range(1, 8):
-                nr, nc = sq_row + dr * dist, sq_col + dc * dist
-                if not board.is_valid_pos((nr, nc)):
-                    break
-                piece = board.get_piece((nr, nc))
-                if piece:
-                    if piece.color == opponent_color and piece.name in ['Bishop', 'Queen']:
-                        return True
-                    break
-        
+        return True
 
-        straight_dirs = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-        for dr, dc in straight_dirs:
-            for dist in range(1, 8):
-                nr, nc = sq_row + dr * dist, sq_col + dc * dist
-                if not board.is_valid_pos((nr, nc)):
-                    break
-                piece = board.get_piece((nr, nc))
-                if piece:
-                    if piece.color == opponent_color and piece.name in ['Rook', 'Queen']:
-                        return True
-                    break
-        
+    def _castling_rejected(self, reason):
+        if tracing.castling >= tracing.DEBUG:
+            tracing.log('castling', tracing.DEBUG, f"Король {self.color}: рокировка невозможна, {reason}")
         return False
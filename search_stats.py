@@ -0,0 +1,106 @@
+import json
+import time
+
+
+class SearchStats:
+    """Статистика одного поиска ChessAI (ChessAI.last_stats).
+
+    Заполняется по ходу поиска; to_dict() и dump() дают запись для журнала
+    в JSON Lines, lines() - короткий текст для экрана.
+    """
+
+    def __init__(self, color):
+        self.color = color
+        self.timestamp = time.time()
+        # Откуда ход: search, book или tablebase
+        self.source = 'search'
+        self.move = None
+        self.value = None
+        self.depth = 0
+        self.elapsed = 0.0
+        # Узлы главного процесса; к ним относятся и quiescence_nodes, nodes_per_depth
+        # и счетчики TT. Узлы вспомогательных процессов Lazy SMP - отдельно
+        self.nodes = 0
+        self.helper_nodes = 0
+        self.quiescence_nodes = 0
+        # По завершенным итерациям: узлы и время каждой
+        self.nodes_per_depth = []
+        self.time_per_depth = []
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.tt_collisions = 0
+        self.tt_stores = 0
+        self.beta_cutoffs = 0
+        self.first_move_cutoffs = 0
+        # Время по частям поиска (только при ChessAI(profile=True), иначе None)
+        self.movegen_time = None
+        self.legality_time = None
+        self.eval_time = None
+        # Главный вариант в координатной записи UCI. Если задан pv_source,
+        # вариант считается им при первом обращении к pv
+        self._pv = []
+        self.pv_source = None
+
+    @property
+    def pv(self):
+        if self.pv_source is not None:
+            self._pv = self.pv_source()
+            self.pv_source = None
+        return self._pv
+
+    @pv.setter
+    def pv(self, value):
+        self._pv = value
+        self.pv_source = None
+
+    def freeze(self):
+        """Посчитать отложенный PV сейчас (пока таблица транспозиций не изменилась)"""
+        return self.pv
+
+    @property
+    def nps(self):
+        return self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def quiescence_share(self):
+        return self.quiescence_nodes / self.nodes if self.nodes else 0.0
+
+    @property
+    def tt_hit_rate(self):
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+    @property
+    def first_move_cutoff_rate(self):
+        return self.first_move_cutoffs / self.beta_cutoffs if self.beta_cutoffs else 0.0
+
+    def to_dict(self):
+        record = {name: value for name, value in vars(self).items() if not name.startswith('_')}
+        del record['pv_source']
+        record.update(pv=self.pv, nps=round(self.nps), quiescence_share=round(self.quiescence_share, 4),
+                      tt_hit_rate=round(self.tt_hit_rate, 4),
+                      first_move_cutoff_rate=round(self.first_move_cutoff_rate, 4))
+        return record
+
+    def dump(self, path, **extra):
+        """Дописать запись (и поля extra) в файл JSON Lines"""
+        record = self.to_dict()
+        record.update(extra)
+        with open(path, 'a', encoding='utf-8') as stats_file:
+            stats_file.write(json.dumps(record) + '\n')
+
+    def lines(self):
+        """Строки для вывода на экран"""
+        if self.source != 'search':
+            return [f"Ход {self.pv[0] if self.pv else '-'}: {'из книги' if self.source == 'book' else 'по таблицам'}"]
+        lines = [
+            f"Глубина {self.depth}, оценка {self.value}, PV: {' '.join(self.pv[:6])}",
+            f"Узлы {self.nodes} за {self.elapsed:.2f} с, {self.nps:.0f}/с, quiescence {self.quiescence_share:.0%}"
+            + (f", помощники {self.helper_nodes}" if self.helper_nodes else ''),
+            f"По глубинам: {' / '.join(str(nodes) for nodes in self.nodes_per_depth)}",
+            f"TT: {self.tt_probes} обращений, {self.tt_hit_rate:.0%} попаданий, {self.tt_collisions} коллизий",
+            f"Отсечения: {self.beta_cutoffs}, первым ходом {self.first_move_cutoff_rate:.0%}",
+        ]
+        if self.movegen_time is not None:
+            lines.append(f"Время: ходы {self.movegen_time:.2f} с, шахи {self.legality_time:.2f} с, "
+                         f"оценка {self.eval_time:.2f} с")
+        return lines
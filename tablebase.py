@@ -0,0 +1,702 @@
+"""Эндшпильные таблицы для позиций до 4 фигур (вместе с королями).
+
+Таблица строится ретроградным анализом: от матов назад по ходам, по
+полуходу за шаг. Каждая таблица описывает один набор материала
+('KRvK' - у белых король и ладья, у черных король) и хранится в файле
+<набор>.tb: массив int16 (little-endian), который при игре отображается
+в память (mmap) и читается по индексу без распаковки. Позиция приводится симметрией
+к канонической (белый король в треугольнике a1-d1-d4, с пешками - на
+вертикалях a-d), индекс - номер пары королей среди допустимых (462, с
+пешками 1806), поля остальных фигур (пешек - только на 2-7 горизонталях)
+и очередь хода. Значение: 0 - ничья (или невозможная позиция), иначе
+знак - результат для стороны, которая ходит, а |v| - 1 - число
+полуходов до мата. Позиции с правом рокировки и взятием на проходе в
+таблицы не входят, но возможность взятия на проходе после хода пешки
+на два поля при генерации учитывается.
+
+Для раздачи таблицы можно сжать в <набор>.tb.xz (LZMA): такой файл
+распаковывается в .tb один раз, при первом обращении.
+
+Генерация:  python tablebase.py generate KRvK KPvK   (или --pieces 3)
+Сжатие:     python tablebase.py pack
+Проверка:   python tablebase.py probe --fen "8/8/8/4k3/8/8/8/4KR2 w - - 0 1"
+"""
+import argparse
+import itertools
+import lzma
+import mmap
+import os
+import sys
+import time
+from array import array
+
+from bitboard import (KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, rook_attacks, bishop_attacks,
+                      PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, WHITE, BLACK, PIECE_INDEX, COLOR_INDEX)
+
+MAX_PIECES = 4
+
+TABLEBASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tablebases')
+TABLE_SUFFIX = '.tb'
+# Сжатая таблица для раздачи
+PACKED_SUFFIX = '.tb.xz'
+
+# Порядок фигур в названии и в индексе таблицы: от сильной к слабой
+ORDER = 'KQRBNP'
+LETTER_KINDS = {'K': KING, 'Q': QUEEN, 'R': ROOK, 'B': BISHOP, 'N': KNIGHT, 'P': PAWN}
+KIND_LETTERS = {kind: letter for letter, kind in LETTER_KINDS.items()}
+PROMOTION_KINDS = (QUEEN, ROOK, BISHOP, KNIGHT)
+
+# Состояние позиции при генерации
+_ILLEGAL, _UNKNOWN, _RESOLVED = 0, 1, 2
+
+
+def parse_material(name):
+    """'KRvK' -> [(WHITE, KING), (WHITE, ROOK), (BLACK, KING)]"""
+    sides = name.upper().split('V')
+    if len(sides) != 2 or any(not side.startswith('K') or side.count('K') != 1 for side in sides):
+        raise ValueError(f"Некорректный набор материала: {name}")
+    white, black = [], []
+    for color, side, pieces in zip((WHITE, BLACK), sides, (white, black)):
+        if any(letter not in LETTER_KINDS for letter in side):
+            raise ValueError(f"Некорректный набор материала: {name}")
+        pieces.extend((color, LETTER_KINDS[letter]) for letter in sorted(side, key=ORDER.index))
+    if len(white) + len(black) > MAX_PIECES:
+        raise ValueError(f"Таблицы строятся не больше чем для {MAX_PIECES} фигур: {name}")
+    # Короли первыми: по ним считается симметрия и начало индекса
+    return [white[0], black[0]] + white[1:] + black[1:]
+
+
+def _side_key(letters):
+    # Сильнее сторона с большим числом фигур, при равенстве - с более сильными фигурами
+    return len(letters), [-ORDER.index(letter) for letter in letters]
+
+
+def canonical(pieces):
+    """Каноническое имя таблицы для [(color, kind, sq)] и нужно ли отразить цвета.
+
+    Таблица строится только для одной ориентации ('KRvK', но не 'KvKR'):
+    если сильнее черные, позицию отражают по вертикали и меняют цвета.
+    Возвращает (имя, flip, [(kind, sq)] в порядке индекса таблицы: короли,
+    затем остальные белые и черные фигуры).
+    """
+    white = sorted(((kind, sq) for color, kind, sq in pieces if color == WHITE),
+                   key=lambda item: ORDER.index(KIND_LETTERS[item[0]]))
+    black = sorted(((kind, sq) for color, kind, sq in pieces if color == BLACK),
+                   key=lambda item: ORDER.index(KIND_LETTERS[item[0]]))
+    white_letters = ''.join(KIND_LETTERS[kind] for kind, _ in white)
+    black_letters = ''.join(KIND_LETTERS[kind] for kind, _ in black)
+    flip = _side_key(black_letters) > _side_key(white_letters)
+    if flip:
+        white, black = [(kind, sq ^ 56) for kind, sq in black], [(kind, sq ^ 56) for kind, sq in white]
+        white_letters, black_letters = black_letters, white_letters
+    return f"{white_letters}v{black_letters}", flip, [white[0], black[0]] + white[1:] + black[1:]
+
+
+def _normalize(squares, pawns):
+    """Поля после симметрии, ставящей белого короля (squares[0]) в каноническую область.
+
+    С пешками доска отражается только слева направо, без пешек - еще
+    сверху вниз и по диагонали; если белый король на диагонали, черный
+    (squares[1]) ставится по одну сторону от нее.
+    """
+    if squares[0] & 7 > 3:
+        squares = [sq ^ 7 for sq in squares]
+    if pawns:
+        return squares
+    if squares[0] >> 3 > 3:
+        squares = [sq ^ 56 for sq in squares]
+    row, col = squares[0] >> 3, squares[0] & 7
+    if row > col or (row == col and squares[1] >> 3 > squares[1] & 7):
+        squares = [((sq & 7) << 3) | (sq >> 3) for sq in squares]
+    return squares
+
+
+def _king_pairs(pawns):
+    """Канонические пары полей (белый король, черный король), короли не рядом"""
+    pairs = []
+    for white in range(64):
+        for black in range(64):
+            if white != black and not (KING_ATTACKS[white] >> black) & 1 \
+                    and _normalize([white, black], pawns) == [white, black]:
+                pairs.append((white, black))
+    return pairs
+
+
+# Пары королей без пешек и с пешками; номер пары по white * 64 + black (-1 - не каноническая)
+KING_PAIRS = {pawns: _king_pairs(pawns) for pawns in (False, True)}
+KING_PAIR_INDEX = {}
+for _pawns, _pairs in KING_PAIRS.items():
+    KING_PAIR_INDEX[_pawns] = [-1] * 4096
+    for _number, (_white, _black) in enumerate(_pairs):
+        KING_PAIR_INDEX[_pawns][_white * 64 + _black] = _number
+
+
+def _radix(kind):
+    # Пешка не бывает на крайних горизонталях: ее поле кодируется от 8 до 55
+    return 48 if kind == PAWN else 64
+
+
+def table_size(kinds):
+    """Число значений в таблице набора с фигурами kinds (в порядке canonical)"""
+    size = 2 * len(KING_PAIRS[PAWN in kinds])
+    for kind in kinds[2:]:
+        size *= _radix(kind)
+    return size
+
+
+def table_index(ordered, stm):
+    """Индекс позиции в таблице: ordered - [(kind, sq)] в порядке canonical"""
+    kinds = [kind for kind, _ in ordered]
+    pawns = PAWN in kinds
+    squares = _normalize([sq for _, sq in ordered], pawns)
+    index = KING_PAIR_INDEX[pawns][squares[0] * 64 + squares[1]]
+    for kind, sq in zip(kinds[2:], squares[2:]):
+        index = index * 64 + sq if kind != PAWN else index * 48 + sq - 8
+    return index * 2 + stm
+
+
+def encode_result(win, plies):
+    return plies + 1 if win else -(plies + 1)
+
+
+def decode_result(value):
+    """Значение таблицы -> (1 выигрыш / 0 ничья / -1 проигрыш для ходящего, полуходов до мата)"""
+    if value == 0:
+        return 0, 0
+    return (1 if value > 0 else -1), abs(value) - 1
+
+
+def _attacks(kind, color, sq, occupied):
+    if kind == KING:
+        return KING_ATTACKS[sq]
+    if kind == KNIGHT:
+        return KNIGHT_ATTACKS[sq]
+    if kind == PAWN:
+        return PAWN_ATTACKS[color][sq]
+    if kind == ROOK:
+        return rook_attacks(sq, occupied)
+    if kind == BISHOP:
+        return bishop_attacks(sq, occupied)
+    return rook_attacks(sq, occupied) | bishop_attacks(sq, occupied)
+
+
+class _Generator:
+    """Ретроградный анализ одного набора материала"""
+
+    def __init__(self, name, lookup):
+        self.name = name
+        self.pieces = parse_material(name)
+        self.count = len(self.pieces)
+        self.size = 2 << (6 * self.count)
+        # lookup(name, ordered, stm) - значение из уже готовой таблицы меньшего материала
+        self.lookup = lookup
+        self.kings = [self.pieces.index((color, KING)) for color in (WHITE, BLACK)]
+        self.shifts = [6 * (self.count - 1 - i) for i in range(self.count)]
+
+        self.values = array('h', bytes(2 * self.size))
+        self.status = bytearray(self.size)
+        # Сколько тихих ходов внутри таблицы еще не опровергнуто
+        self.remaining = bytearray(self.size)
+        # Не раньше какого полухода позицию можно признать проигранной
+        # (из-за взятий и превращений, ведущих в другие таблицы); -1 - никогда
+        self.loss_floor = array('h', bytes(2 * self.size))
+
+    def squares(self, index):
+        return [(index >> shift) & 63 for shift in self.shifts]
+
+    def generate(self):
+        buckets = {}
+        for index in range(self.size):
+            self._init_position(index, buckets)
+
+        ply = 0
+        while buckets:
+            frontier = buckets.pop(ply, [])
+            while frontier:
+                index, win = frontier.pop()
+                if self.status[index] != _UNKNOWN:
+                    continue
+                self.status[index] = _RESOLVED
+                self.values[index] = encode_result(win, ply)
+                self._propagate(index, win, ply, buckets)
+            ply += 1
+        return self.values
+
+    def compact(self):
+        """Значения в формате файла: только канонические позиции, по table_index"""
+        kinds = [kind for _, kind in self.pieces]
+        ranges = [range(8, 56) if kind == PAWN else range(64) for kind in kinds[2:]]
+        stm_bit = 1 << (6 * self.count)
+        values = self.values
+        result = array('h')
+        for white_king, black_king in KING_PAIRS[PAWN in kinds]:
+            prefix = (white_king << 6) | black_king
+            for rest in itertools.product(*ranges):
+                index = prefix
+                for sq in rest:
+                    index = (index << 6) | sq
+                result.append(values[index])
+                result.append(values[index | stm_bit])
+        return result
+
+    def _attacked(self, sq, by, squares, occupied, skip=-1):
+        for i, (color, kind) in enumerate(self.pieces):
+            if color == by and i != skip and (_attacks(kind, color, squares[i], occupied) >> sq) & 1:
+                return True
+        return False
+
+    def _init_position(self, index, buckets):
+        stm = index >> (6 * self.count)
+        squares = self.squares(index)
+        occupied = 0
+        for sq in squares:
+            occupied |= 1 << sq
+        if bin(occupied).count('1') != self.count:
+            return
+        for (color, kind), sq in zip(self.pieces, squares):
+            if kind == PAWN and sq >> 3 in (0, 7):
+                return
+        opponent = 1 - stm
+        if self._attacked(squares[self.kings[opponent]], stm, squares, occupied):
+            return
+        self.status[index] = _UNKNOWN
+
+        quiet = 0
+        any_move = False
+        conversion_win = None
+        conversion_worst = -1
+        conversion_safe = False
+        for i, target, captured, promotion in self._moves(squares, stm, occupied):
+            any_move = True
+            if captured < 0 and promotion is None:
+                if self.pieces[i][1] == PAWN and abs(target - squares[i]) == 16:
+                    moved = list(squares)
+                    moved[i] = target
+                    en_passant = self._en_passant_result(moved, i)
+                    if en_passant is not None and en_passant[0] > 0:
+                        # Соперник выигрывает взятием на проходе: ход проигрывает
+                        # не позже, чем за это взятие (таблица ему может дать мат быстрее)
+                        conversion_worst = max(conversion_worst, en_passant[1] + 1)
+                        continue
+                quiet += 1
+                continue
+            # Взятие или превращение: результат берем из таблицы меньшего материала
+            value = self._conversion_value(squares, i, target, captured, promotion, opponent)
+            result, plies = decode_result(value)
+            if result < 0:
+                if conversion_win is None or plies + 1 < conversion_win:
+                    conversion_win = plies + 1
+            elif result == 0:
+                conversion_safe = True
+            else:
+                conversion_worst = max(conversion_worst, plies + 1)
+
+        if not any_move:
+            if self._attacked(squares[self.kings[stm]], opponent, squares, occupied):
+                buckets.setdefault(0, []).append((index, False))
+            else:
+                self.status[index] = _RESOLVED
+            return
+
+        self.remaining[index] = quiet
+        if conversion_win is not None:
+            buckets.setdefault(conversion_win, []).append((index, True))
+        if conversion_safe or conversion_win is not None:
+            self.loss_floor[index] = -1
+            return
+        self.loss_floor[index] = max(conversion_worst, 0)
+        if quiet == 0:
+            buckets.setdefault(conversion_worst, []).append((index, False))
+
+    def _moves(self, squares, stm, occupied):
+        """Легальные ходы: (фигура, поле, индекс взятой фигуры или -1, превращение)"""
+        own = 0
+        for (color, _), sq in zip(self.pieces, squares):
+            if color == stm:
+                own |= 1 << sq
+        king = self.kings[stm]
+        for i, (color, kind) in enumerate(self.pieces):
+            if color != stm:
+                continue
+            sq = squares[i]
+            if kind == PAWN:
+                targets = PAWN_ATTACKS[color][sq] & occupied & ~own
+                step = -8 if color == WHITE else 8
+                if not (occupied >> (sq + step)) & 1:
+                    targets |= 1 << (sq + step)
+                    start_row = 6 if color == WHITE else 1
+                    if sq >> 3 == start_row and not (occupied >> (sq + 2 * step)) & 1:
+                        targets |= 1 << (sq + 2 * step)
+            else:
+                targets = _attacks(kind, color, sq, occupied) & ~own
+            while targets:
+                bit = targets & -targets
+                targets ^= bit
+                target = bit.bit_length() - 1
+                captured = squares.index(target) if (occupied >> target) & 1 else -1
+                moved = list(squares)
+                moved[i] = target
+                after = (occupied & ~(1 << sq)) | bit
+                if self._attacked(moved[king], 1 - stm, moved, after, skip=captured):
+                    continue
+                if kind == PAWN and target >> 3 in (0, 7):
+                    for promotion in PROMOTION_KINDS:
+                        yield i, target, captured, promotion
+                else:
+                    yield i, target, captured, None
+
+    def _conversion_value(self, squares, i, target, captured, promotion, stm):
+        pieces = []
+        for j, ((color, kind), sq) in enumerate(zip(self.pieces, squares)):
+            if j == captured:
+                continue
+            if j == i:
+                kind = promotion if promotion is not None else kind
+                sq = target
+            pieces.append((color, kind, sq))
+        name, flip, ordered = canonical(pieces)
+        return self.lookup(name, ordered, stm ^ flip)
+
+    def _en_passant_result(self, squares, pushed):
+        """Лучший для соперника исход взятия на проходе пешки pushed, только что
+        прошедшей два поля (позиция squares, ход соперника): (1/0/-1, полуходов до
+        мата) или None, если такого взятия нет"""
+        color = self.pieces[pushed][0]
+        sq = squares[pushed]
+        passed = sq + (8 if color == WHITE else -8)
+        occupied = 0
+        for piece_sq in squares:
+            occupied |= 1 << piece_sq
+        best = None
+        for j, (capturer_color, kind) in enumerate(self.pieces):
+            if capturer_color == color or kind != PAWN or not (PAWN_ATTACKS[capturer_color][squares[j]] >> passed) & 1:
+                continue
+            moved = list(squares)
+            moved[j] = passed
+            after = (occupied & ~(1 << squares[j]) & ~(1 << sq)) | (1 << passed)
+            if self._attacked(moved[self.kings[capturer_color]], color, moved, after, skip=pushed):
+                continue
+            pieces = [(c, k, s) for n, ((c, k), s) in enumerate(zip(self.pieces, moved)) if n != pushed]
+            name, flip, ordered = canonical(pieces)
+            result, plies = decode_result(self.lookup(name, ordered, color ^ flip))
+            outcome = (-result, plies + 1 if result else 0)
+            if best is None or _rank(outcome) > _rank(best):
+                best = outcome
+        return best
+
+    def _propagate(self, index, win, ply, buckets):
+        """Обновить позиции, из которых тихим ходом попадают в index"""
+        stm = index >> (6 * self.count)
+        mover = 1 - stm
+        squares = self.squares(index)
+        occupied = 0
+        for sq in squares:
+            occupied |= 1 << sq
+        base = mover << (6 * self.count)
+        for i, (color, kind) in enumerate(self.pieces):
+            if color != mover:
+                continue
+            sq = squares[i]
+            double_origin = -1
+            if kind == PAWN:
+                origins = 0
+                back = 8 if color == WHITE else -8
+                origin = sq + back
+                if 8 <= origin < 56 and not (occupied >> origin) & 1:
+                    origins |= 1 << origin
+                    double_row = 4 if color == WHITE else 3
+                    if sq >> 3 == double_row and not (occupied >> (origin + back)) & 1:
+                        double_origin = origin + back
+                        origins |= 1 << double_origin
+            else:
+                origins = _attacks(kind, color, sq, occupied) & ~occupied
+            shift = self.shifts[i]
+            cleared = (index & ~(63 << shift)) - (stm << (6 * self.count)) + base
+            en_passant = self._en_passant_result(squares, i) if double_origin >= 0 else None
+            while origins:
+                bit = origins & -origins
+                origins ^= bit
+                origin = bit.bit_length() - 1
+                previous = cleared | (origin << shift)
+                if self.status[previous] != _UNKNOWN:
+                    continue
+                resolved_ply = ply
+                if en_passant is not None and origin == double_origin:
+                    # После хода на два поля у соперника есть и взятие на проходе
+                    if en_passant[0] > 0:
+                        # Ход и так учтен как проигрывающий (см. _init_position)
+                        continue
+                    if not win:
+                        if en_passant[0] == 0:
+                            # Взятием соперник уходит в ничью: ход не выигрывает
+                            continue
+                        # Соперник выберет самое долгое сопротивление
+                        resolved_ply = max(ply, en_passant[1])
+                if not win:
+                    # Из previous есть ход в проигранную для соперника позицию
+                    buckets.setdefault(resolved_ply + 1, []).append((previous, True))
+                    continue
+                self.remaining[previous] -= 1
+                floor = self.loss_floor[previous]
+                if self.remaining[previous] == 0 and floor >= 0:
+                    buckets.setdefault(max(ply + 1, floor), []).append((previous, False))
+
+
+def _rank(result):
+    # Порядок исходов для выбирающей стороны: быстрый выигрыш > ничья > долгий проигрыш
+    outcome, plies = result
+    return outcome, -plies if outcome > 0 else plies
+
+
+def dependencies(name):
+    """Наборы материала, в которые name переходит взятием или превращением"""
+    pieces = parse_material(name)
+    result = set()
+    for j, (color, kind) in enumerate(pieces):
+        if kind != KING:
+            rest = [(c, k, 0) for i, (c, k) in enumerate(pieces) if i != j]
+            result.add(canonical(rest)[0])
+        if kind == PAWN:
+            for promotion in PROMOTION_KINDS:
+                promoted = [(c, promotion if i == j else k, 0) for i, (c, k) in enumerate(pieces)]
+                result.add(canonical(promoted)[0])
+    return result
+
+
+def all_materials(max_pieces):
+    """Все канонические наборы материала до max_pieces фигур"""
+    names = set()
+    for extra in range(max_pieces - 1):
+        for combo in itertools.combinations_with_replacement('QRBNP' * 2, extra):
+            for split in range(extra + 1):
+                for white in itertools.combinations(combo, split):
+                    black = list(combo)
+                    for letter in white:
+                        black.remove(letter)
+                    pieces = [(WHITE, KING, 0), (BLACK, KING, 0)]
+                    pieces += [(WHITE, LETTER_KINDS[letter], 0) for letter in white]
+                    pieces += [(BLACK, LETTER_KINDS[letter], 0) for letter in black]
+                    names.add(canonical(pieces)[0])
+    return sorted(names, key=lambda name: (len(name), name))
+
+
+def write_table(path, values):
+    """Сохранить значения таблицы: int16, little-endian, без сжатия"""
+    if sys.byteorder != 'little':
+        values = array('h', values)
+        values.byteswap()
+    with open(path, 'wb') as table_file:
+        values.tofile(table_file)
+
+
+def read_table(path):
+    """Значения таблицы из файла write_table (целиком в память, для генерации)"""
+    values = array('h')
+    with open(path, 'rb') as table_file:
+        values.frombytes(table_file.read())
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+
+def pack_table(path):
+    """Сжать таблицу path (.tb) в path + '.xz' для раздачи"""
+    with open(path, 'rb') as table_file:
+        data = lzma.compress(table_file.read())
+    with open(path + '.xz', 'wb') as packed_file:
+        packed_file.write(data)
+
+
+def unpack_table(path):
+    """Распаковать path + '.xz' в path (.tb). Файл появляется целиком: пишем
+    во временный и переименовываем, так что процессы Lazy SMP, открывшие
+    таблицу одновременно, не увидят его недописанным"""
+    with open(path + '.xz', 'rb') as packed_file:
+        data = lzma.decompress(packed_file.read())
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, 'wb') as table_file:
+        table_file.write(data)
+    os.replace(temporary, path)
+
+
+def _table_path(directory, name):
+    """Путь к файлу .tb набора name (распакованному из .tb.xz, если нужно) или None.
+
+    Файл другого размера (старый формат с индексом 64^n) считается отсутствующим.
+    """
+    path = os.path.join(directory, name + TABLE_SUFFIX)
+    if not os.path.exists(path) and os.path.exists(path + '.xz'):
+        unpack_table(path)
+    if not os.path.exists(path):
+        return None
+    if os.path.getsize(path) != 2 * table_size([kind for _, kind in parse_material(name)]):
+        return None
+    return path
+
+
+def generate(names, directory=TABLEBASE_DIR, force=False, log=print):
+    """Построить таблицы names (и все, от которых они зависят) и сохранить их в directory"""
+    os.makedirs(directory, exist_ok=True)
+    ready = {}
+
+    def lookup(name, ordered, stm):
+        return ready[name][table_index(ordered, stm)]
+
+    def build(name):
+        if name in ready:
+            return
+        path = os.path.join(directory, name + TABLE_SUFFIX)
+        if not force and _table_path(directory, name) is not None:
+            ready[name] = read_table(path)
+            return
+        for dependency in sorted(dependencies(name)):
+            build(dependency)
+        start = time.perf_counter()
+        generator = _Generator(name, lookup)
+        generator.generate()
+        values = generator.compact()
+        write_table(path, values)
+        ready[name] = values
+        log(f"{name}: {time.perf_counter() - start:.1f} с -> {path} ({os.path.getsize(path) // 1024} КиБ)")
+        if os.path.exists(path + '.xz'):
+            # Сжатая копия старой таблицы иначе подменила бы новую при раздаче
+            pack_table(path)
+
+    for name in names:
+        build(canonical([(c, k, 0) for c, k in parse_material(name)])[0])
+
+
+class Tablebases:
+    """Доступ к готовым таблицам: файлы отображаются в память при первом обращении.
+
+    Отображение общее для всех процессов (страницы файла в кеше ОС), поэтому
+    вспомогательные процессы Lazy SMP не держат свою копию таблиц.
+    """
+
+    def __init__(self, directory=TABLEBASE_DIR):
+        self.directory = directory
+        self._tables = {}
+        self.max_pieces = 0
+        if os.path.isdir(directory):
+            for file_name in os.listdir(directory):
+                for suffix in (TABLE_SUFFIX, PACKED_SUFFIX):
+                    if file_name.endswith(suffix):
+                        self.max_pieces = max(self.max_pieces, len(file_name) - len('v' + suffix))
+
+    def __getstate__(self):
+        # В другой процесс передаем только каталог, файлы там откроются заново
+        return {'directory': self.directory}
+
+    def __setstate__(self, state):
+        self.__init__(state['directory'])
+
+    def close(self):
+        for table in self._tables.values():
+            if table is not None:
+                table[0].release()
+                table[1].close()
+        self._tables.clear()
+
+    def _table(self, name):
+        if name not in self._tables:
+            try:
+                path = _table_path(self.directory, name)
+            except (OSError, lzma.LZMAError):
+                # Каталог только для чтения или битый архив: считаем, что таблицы нет
+                path = None
+            if path is not None:
+                with open(path, 'rb') as table_file:
+                    data = mmap.mmap(table_file.fileno(), 0, access=mmap.ACCESS_READ)
+                self._tables[name] = (memoryview(data).cast('h'), data)
+            else:
+                self._tables[name] = None
+        table = self._tables[name]
+        return table[0] if table is not None else None
+
+    def _en_passant_possible(self, board):
+        # Поле en passant выставляется после любого хода пешки на два поля,
+        # но мешает только тогда, когда взятие на проходе действительно есть
+        if not board.en_passant:
+            return False
+        row, col = board.en_passant
+        pawn_row = row + 1 if board.turn == 'white' else row - 1
+        for pawn_col in (col - 1, col + 1):
+            if 0 <= pawn_col < 8:
+                piece = board.board[pawn_row][pawn_col]
+                if piece and piece.name == 'Pawn' and piece.color == board.turn:
+                    return True
+        return False
+
+    def probe(self, board):
+        """(1/0/-1 для стороны, которая ходит, полуходов до мата) или None, если таблицы нет"""
+        if board.castling_rights() or self._en_passant_possible(board):
+            return None
+        pieces = []
+        for row in range(8):
+            for col in range(8):
+                piece = board.board[row][col]
+                if piece:
+                    if len(pieces) == self.max_pieces:
+                        return None
+                    pieces.append((COLOR_INDEX[piece.color], PIECE_INDEX[piece.name], row * 8 + col))
+        name, flip, ordered = canonical(pieces)
+        table = self._table(name)
+        if table is None:
+            return None
+        stm = COLOR_INDEX[board.turn] ^ flip
+        return decode_result(table[table_index(ordered, stm)])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Эндшпильные таблицы: генерация и проверка')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('generate', help='построить таблицы')
+    build.add_argument('materials', nargs='*', help='наборы материала, например KRvK KPvK')
+    build.add_argument('--pieces', type=int, default=None,
+                       help=f"все наборы до этого числа фигур (не больше {MAX_PIECES})")
+    build.add_argument('--dir', default=TABLEBASE_DIR, help='каталог таблиц')
+    build.add_argument('--force', action='store_true', help='пересобрать уже готовые таблицы')
+
+    pack = commands.add_parser('pack', help='сжать готовые таблицы в .tb.xz для раздачи')
+    pack.add_argument('--dir', default=TABLEBASE_DIR, help='каталог таблиц')
+
+    probe = commands.add_parser('probe', help='результат позиции по таблицам')
+    probe.add_argument('--fen', required=True, help='позиция в FEN')
+    probe.add_argument('--dir', default=TABLEBASE_DIR, help='каталог таблиц')
+    args = parser.parse_args(argv)
+
+    if args.command == 'generate':
+        names = list(args.materials)
+        if args.pieces:
+            names += all_materials(min(args.pieces, MAX_PIECES))
+        if not names:
+            parser.error('укажите наборы материала или --pieces')
+        generate(names, args.dir, args.force)
+        return 0
+
+    if args.command == 'pack':
+        for file_name in sorted(os.listdir(args.dir)):
+            if file_name.endswith(TABLE_SUFFIX):
+                path = os.path.join(args.dir, file_name)
+                pack_table(path)
+                print(f"{path}.xz: {os.path.getsize(path + '.xz') // 1024} КиБ")
+        return 0
+
+    from bitboard import BitboardBoard
+    board = BitboardBoard()
+    board.set_fen(args.fen)
+    tablebases = Tablebases(args.dir)
+    result = tablebases.probe(board)
+    if result is None:
+        print("Позиции нет в таблицах")
+    else:
+        outcome, plies = result
+        print({1: f"Выигрыш, мат за {plies} полуходов", 0: "Ничья",
+               -1: f"Проигрыш, мат за {plies} полуходов"}[outcome])
+    tablebases.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
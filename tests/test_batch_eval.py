@@ -0,0 +1,51 @@
+import random
+
+import pytest
+
+from ai_player import ChessAI
+from bitboard import BitboardBoard
+from evaluation import HAS_NUMPY, batch_child_scores
+from perft import PERFT_SUITE
+
+pytestmark = pytest.mark.skipif(not HAS_NUMPY, reason='пакетной оценке нужен NumPy')
+
+FENS = [fen for _, fen, _ in PERFT_SUITE] + [
+    '4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1',                # взятие на проходе белыми
+    '4k3/8/8/8/3Pp3/8/8/4K3 b - d3 0 1',                # и черными
+    'r3k2r/8/8/8/8/8/8/R3K2R b KQkq - 0 1',             # рокировки черных
+    '1r2k3/P1P5/8/8/8/8/1p4p1/R1B1K3 w - - 0 1',        # превращения со взятием и без
+    '1r2k3/P1P5/8/8/8/8/1p4p1/R1B1K3 b - - 0 1',
+]
+
+
+def scalar_scores(board, moves, color):
+    ai = ChessAI(color=color)
+    scores = []
+    for move in moves:
+        board.push(move)
+        scores.append(ai._evaluate_board_fast(board))
+        board.pop()
+    return scores
+
+
+def check(board):
+    moves = board.legal_moves(board.turn, underpromotions=True)
+    for color in ('white', 'black'):
+        assert list(batch_child_scores(board, moves, color)) == scalar_scores(board, moves, color)
+
+
+@pytest.mark.parametrize('fen', FENS)
+def test_batch_matches_push_pop(fen):
+    check(BitboardBoard(fen))
+
+
+def test_batch_matches_push_pop_in_games():
+    rng = random.Random(15)
+    for _ in range(4):
+        board = BitboardBoard()
+        for _ in range(120):
+            moves = board.legal_moves(board.turn, underpromotions=True)
+            if not moves:
+                break
+            check(board)
+            board.push(rng.choice(moves))
@@ -0,0 +1,88 @@
+import random
+
+import pytest
+
+from ai_player import ChessAI
+from bitboard import BitboardBoard
+from book import BOOK_ENTRY, OpeningBook, build_book, open_book, read_pgn
+from notation import parse_uci
+
+PGN = '''[Event "1"]
+[Result "1-0"]
+
+1. e4 e5 2. Nf3 {главная} Nc6 (2... d6 3. d4) 3. Bb5 a6 1-0
+
+[Event "2"]
+[Result "0-1"]
+
+1. e4 c5 2. Nf3 d6 0-1
+
+[Event "3"]
+[Result "1/2-1/2"]
+
+1. d4 d5 1/2-1/2
+'''
+
+
+@pytest.fixture
+def book_path(tmp_path):
+    pgn = tmp_path / 'games.pgn'
+    pgn.write_text(PGN, encoding='utf-8')
+    path = tmp_path / 'book.bin'
+    assert build_book([str(pgn)], str(path), max_plies=4) == (3, 9)
+    return str(path)
+
+
+def test_read_pgn_skips_comments_and_variations():
+    games = read_pgn(PGN)
+    assert [headers['Result'] for headers, _ in games] == ['1-0', '0-1', '1/2-1/2']
+    assert games[0][1] == ['e4', 'e5', 'Nf3', 'Nc6', 'Bb5', 'a6']
+
+
+def test_weights_by_result(book_path):
+    board = BitboardBoard()
+    with OpeningBook(book_path) as book:
+        assert len(book) == 9
+        # e4: победа и поражение белых (2 + 0), d4: ничья (1)
+        assert sorted(book.moves(board)) == sorted([(parse_uci(board, 'e2e4'), 2), (parse_uci(board, 'd2d4'), 1)])
+        board.push(parse_uci(board, 'e2e4'))
+        # e5 проиграл (вес 0) - в записях он есть, среди ходов для игры его нет
+        assert sorted(book.entries(board.zobrist_key)) == \
+            sorted([(parse_uci(board, 'e7e5'), 0), (parse_uci(board, 'c7c5'), 2)])
+
+
+def test_choose_skips_zero_weight(book_path):
+    board = BitboardBoard()
+    board.push(parse_uci(board, 'e2e4'))
+    with OpeningBook(book_path) as book:
+        assert book.moves(board) == [(parse_uci(board, 'c7c5'), 2)]
+        assert book.choose(board, random.Random(1)) == parse_uci(board, 'c7c5')
+        board.push(parse_uci(board, 'c7c5'))
+        board.push(parse_uci(board, 'g1f3'))
+        board.push(parse_uci(board, 'd7d6'))
+        # Дальше max_plies=4 партии в книгу не попали
+        assert book.choose(board) is None
+
+
+def test_search_plays_book_move(book_path):
+    ai = ChessAI(depth=1, color='white', book=open_book(book_path))
+    board = BitboardBoard()
+    assert ai.get_best_move(board) in (parse_uci(board, 'e2e4'), parse_uci(board, 'd2d4'))
+    assert ai.last_stats.source == 'book'
+    ai.close()
+    assert ai.book is None
+
+
+def test_open_book_missing(tmp_path):
+    assert open_book(str(tmp_path / 'none.bin')) is None
+
+
+def test_empty_and_broken_book(tmp_path):
+    empty = tmp_path / 'empty.bin'
+    empty.write_bytes(b'')
+    with OpeningBook(str(empty)) as book:
+        assert len(book) == 0 and book.choose(BitboardBoard()) is None
+    broken = tmp_path / 'broken.bin'
+    broken.write_bytes(bytes(BOOK_ENTRY.size + 1))
+    with pytest.raises(ValueError):
+        OpeningBook(str(broken))
@@ -0,0 +1,67 @@
+import random
+
+import pytest
+
+from bitboard import BitboardBoard
+from board import Board, START_FEN
+from epd import parse_epd
+from perft import PERFT_SUITE
+
+FENS = [fen for _, fen, _ in PERFT_SUITE] + [
+    'rnbqkbnr/ppp1pppp/8/3pP3/8/8/PPPP1PPP/RNBQKBNR w KQkq d6 0 3',
+    '4k3/8/8/8/8/8/8/R3K2R b KQ - 12 40',
+    '8/8/8/4k3/8/8/8/4K3 w - - 0 1',
+]
+
+
+@pytest.mark.parametrize('board_class', [Board, BitboardBoard])
+@pytest.mark.parametrize('fen', FENS)
+def test_round_trip(board_class, fen):
+    assert board_class(fen).fen() == fen
+
+
+def test_default_board_is_start_position():
+    assert Board().fen() == START_FEN
+    assert BitboardBoard().fen() == START_FEN
+
+
+def test_round_trip_during_game():
+    rng = random.Random(24)
+    board = BitboardBoard()
+    for _ in range(200):
+        moves = board.legal_moves(board.turn, underpromotions=True)
+        if not moves:
+            break
+        board.push(rng.choice(moves))
+        fen = board.fen()
+        assert BitboardBoard(fen).fen() == fen
+        # Из FEN восстанавливается та же позиция, а не только та же строка
+        assert sorted(Board(fen).legal_moves(board.turn)) == sorted(board.legal_moves(board.turn))
+
+
+@pytest.mark.parametrize('fen', [
+    '',
+    'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP w KQkq - 0 1',
+    'rnbqkbnr/pppppppp/9/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+    'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNX w KQkq - 0 1',
+    'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - x 1',
+])
+def test_invalid_fen(fen):
+    with pytest.raises(ValueError):
+        Board(fen)
+
+
+def test_parse_epd():
+    fen, operations = parse_epd('1k1r4/pp1b1R2/3q2pp/4p3/2B5/4Q3/PPP2B2/2K5 b - - bm Qd1+; id "BK.01";')
+    assert fen == '1k1r4/pp1b1R2/3q2pp/4p3/2B5/4Q3/PPP2B2/2K5 b - - 0 1'
+    assert operations == {'bm': ['Qd1+'], 'id': ['BK.01']}
+
+
+def test_parse_epd_move_counters():
+    fen, _ = parse_epd('8/8/8/4k3/8/8/8/4K3 w - - hmvc 7; fmvn 31;')
+    assert fen.endswith(' 7 31')
+
+
+def test_parse_epd_too_short():
+    with pytest.raises(ValueError):
+        parse_epd('8/8/8/4k3/8/8/8/4K3 w -')
@@ -0,0 +1,57 @@
+import random
+
+import pytest
+
+from bitboard import BitboardBoard
+from board import Board
+from perft import PERFT_SUITE
+
+
+def snapshot(board):
+    """Все, что push должен менять, а pop - возвращать"""
+    state = (
+        board.fen(), board.zobrist_key, list(board.squares), list(board.score), board.piece_count,
+        board.castling_rights(), board.white_king_pos, board.black_king_pos, len(board.undo_stack),
+        [(piece, piece.pos, piece.has_moved) for row in board.board for piece in row if piece],
+    )
+    if isinstance(board, BitboardBoard):
+        state += ([list(bitboards) for bitboards in board.pieces_bb], list(board.occupancy), board.occupied)
+    return state
+
+
+@pytest.mark.parametrize('board_class', [Board, BitboardBoard])
+@pytest.mark.parametrize('fen', [fen for _, fen, _ in PERFT_SUITE])
+def test_pop_restores_every_move(board_class, fen):
+    board = board_class(fen)
+    before = snapshot(board)
+    for move in board.legal_moves(board.turn, underpromotions=True):
+        board.push(move)
+        board.pop()
+        assert snapshot(board) == before, move
+
+
+@pytest.mark.parametrize('board_class', [Board, BitboardBoard])
+def test_pop_unwinds_game(board_class):
+    rng = random.Random(3)
+    board = board_class()
+    history = [snapshot(board)]
+    for _ in range(120):
+        moves = board.legal_moves(board.turn, underpromotions=True)
+        if not moves:
+            break
+        board.push(rng.choice(moves))
+        history.append(snapshot(board))
+    while board.undo_stack:
+        history.pop()
+        board.pop()
+        assert snapshot(board) == history[-1]
+
+
+def test_promotion_and_undo():
+    board = BitboardBoard('8/1P6/8/8/8/8/k7/4K3 w - - 0 1')
+    before = snapshot(board)
+    for promotion in ('Queen', 'Rook', 'Bishop', 'Knight'):
+        board.push(((1, 1), (0, 1), promotion))
+        assert board.get_piece((0, 1)).name == promotion
+        board.pop()
+        assert snapshot(board) == before
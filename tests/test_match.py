@@ -0,0 +1,73 @@
+import math
+
+import pytest
+
+from bitboard import BitboardBoard
+from match import (elo_difference, expected_score, parse_engine, random_openings, score_for_a,
+                   sprt_bounds, sprt_llr)
+
+
+def elo(score):
+    return -400 * math.log10(1 / score - 1)
+
+
+def test_expected_score():
+    assert expected_score(0) == 0.5
+    assert expected_score(400) == pytest.approx(10 / 11)
+    assert expected_score(-400) == pytest.approx(1 / 11)
+
+
+def test_elo_difference():
+    # 60 побед, 20 ничьих, 20 поражений: 70% очков, дисперсия на партию 0.16
+    difference, margin = elo_difference(60, 20, 20)
+    assert difference == pytest.approx(elo(0.7))
+    half_width = 1.96 * math.sqrt(0.16 / 100)
+    assert margin == pytest.approx((elo(0.7 + half_width) - elo(0.7 - half_width)) / 2)
+
+
+def test_elo_difference_is_symmetric():
+    assert elo_difference(20, 20, 60)[0] == pytest.approx(-elo_difference(60, 20, 20)[0])
+    assert elo_difference(50, 0, 50)[0] == 0
+
+
+@pytest.mark.parametrize('wins, draws, losses', [(0, 0, 0), (10, 0, 0), (0, 0, 7)])
+def test_elo_difference_undefined(wins, draws, losses):
+    assert elo_difference(wins, draws, losses) is None
+
+
+def test_sprt_llr():
+    # Тот же счет: среднее 0.7, дисперсия (60 + 20 / 4) / 100 - 0.49 = 0.16
+    score0, score1 = expected_score(0), expected_score(5)
+    expected = (score1 - score0) * (2 * 0.7 - score0 - score1) / (2 * 0.16 / 100)
+    assert sprt_llr(60, 20, 20, 0, 5) == pytest.approx(expected)
+    assert sprt_llr(20, 20, 60, 0, 5) < 0
+    assert sprt_llr(0, 10, 0, 0, 5) == 0.0
+
+
+def test_sprt_bounds():
+    lower, upper = sprt_bounds(0.05, 0.05)
+    assert lower == pytest.approx(math.log(0.05 / 0.95))
+    assert upper == pytest.approx(math.log(0.95 / 0.05))
+    assert lower == pytest.approx(-upper)
+
+
+def test_score_for_a():
+    assert score_for_a({'result': '1-0', 'white': 'A'}) == 1.0
+    assert score_for_a({'result': '1-0', 'white': 'B'}) == 0.0
+    assert score_for_a({'result': '0-1', 'white': 'B'}) == 1.0
+    assert score_for_a({'result': '1/2-1/2', 'white': 'A'}) == 0.5
+
+
+def test_parse_engine():
+    assert parse_engine('depth=4,time=200') == {'depth': 4, 'time_limit_ms': 200}
+    with pytest.raises(ValueError):
+        parse_engine('speed=9')
+
+
+def test_random_openings():
+    openings = random_openings(6, 4, seed=1)
+    assert openings == random_openings(6, 4, seed=1)
+    assert len(set(openings)) == 6
+    for fen in openings:
+        board = BitboardBoard(fen)
+        assert board.fullmove_number == 3 and board.turn == 'white'
@@ -0,0 +1,38 @@
+import pytest
+
+from perft import BOARD_CLASSES, PERFT_SUITE, perft
+from notation import parse_square
+
+# Глубины берем, пока листьев не больше этого, чтобы тесты шли секунды
+MAX_LEAVES = 100000
+
+CASES = [(name, fen, depth + 1, leaves)
+         for name, fen, counts in PERFT_SUITE
+         for depth, leaves in enumerate(counts) if leaves <= MAX_LEAVES]
+
+
+@pytest.mark.parametrize('board_name', sorted(BOARD_CLASSES))
+@pytest.mark.parametrize('name, fen, depth, expected', CASES)
+def test_perft_suite(board_name, name, fen, depth, expected):
+    board = BOARD_CLASSES[board_name](fen)
+    assert perft(board, depth) == expected
+    # После обхода доска возвращается в исходную позицию
+    assert board.fen() == fen
+
+
+@pytest.mark.parametrize('board_name', sorted(BOARD_CLASSES))
+def test_en_passant_capture(board_name):
+    board = BOARD_CLASSES[board_name]('4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1')
+    move = (parse_square('e5'), parse_square('d6'))
+    assert move in board.legal_moves('white')
+    board.push(move)
+    assert board.get_piece(parse_square('d5')) is None
+    board.pop()
+    assert board.get_piece(parse_square('d5')).name == 'Pawn'
+
+
+@pytest.mark.parametrize('board_name', sorted(BOARD_CLASSES))
+def test_en_passant_needs_enemy_pawn(board_name):
+    # Поле взятия задано, но рядом своя пешка: бить некого
+    board = BOARD_CLASSES[board_name]('4k3/8/8/3PP3/8/8/8/4K3 w - d6 0 1')
+    assert (parse_square('e5'), parse_square('d6')) not in board.legal_moves('white')
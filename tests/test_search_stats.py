@@ -0,0 +1,80 @@
+import json
+
+from ai_player import ChessAI
+from bitboard import BitboardBoard
+from notation import move_uci
+from search_stats import SearchStats
+
+
+def test_to_dict_fields():
+    stats = SearchStats('white')
+    stats.nodes, stats.elapsed = 500, 0.25
+    stats.quiescence_nodes = 100
+    stats.tt_probes, stats.tt_hits = 40, 10
+    stats.beta_cutoffs, stats.first_move_cutoffs = 8, 6
+    record = stats.to_dict()
+    assert 'pv_source' not in record
+    assert not any(name.startswith('_') for name in record)
+    assert record['pv'] == []
+    assert (record['nps'], record['quiescence_share'], record['tt_hit_rate'], record['first_move_cutoff_rate']) \
+        == (2000, 0.2, 0.25, 0.75)
+    assert json.loads(json.dumps(record)) == record
+
+
+def test_rates_without_data():
+    record = SearchStats('black').to_dict()
+    assert (record['nps'], record['quiescence_share'], record['tt_hit_rate'], record['first_move_cutoff_rate']) \
+        == (0, 0.0, 0.0, 0.0)
+
+
+def test_lazy_pv():
+    calls = []
+    stats = SearchStats('white')
+    stats.pv_source = lambda: calls.append(1) or ['e2e4', 'e7e5']
+    assert calls == []
+    assert stats.to_dict()['pv'] == ['e2e4', 'e7e5']
+    assert stats.pv == ['e2e4', 'e7e5']
+    assert calls == [1]
+    stats.pv = ['d2d4']
+    assert stats.pv == ['d2d4']
+
+
+def test_dump_appends_json_lines(tmp_path):
+    path = tmp_path / 'stats.jsonl'
+    stats = SearchStats('white')
+    stats.dump(path, id='first')
+    stats.dump(path, id='second', solved=True)
+    records = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+    assert [record['id'] for record in records] == ['first', 'second']
+    assert records[1]['solved'] is True
+
+
+def test_stats_of_search():
+    board = BitboardBoard()
+    ai = ChessAI(depth=2, color='white')
+    move = ai.get_best_move(board)
+    stats = ai.last_stats
+    assert (stats.source, stats.move, stats.depth) == ('search', move, 2)
+    assert stats.nodes == ai.nodes_evaluated and stats.helper_nodes == 0
+    assert len(stats.nodes_per_depth) == len(stats.time_per_depth) == 2
+    assert stats.to_dict()['pv'][0] == move_uci(board, move)
+
+
+def test_stats_reset_when_no_moves():
+    ai = ChessAI(depth=2, color='white')
+    ai.get_best_move(BitboardBoard())
+    # Пат белым: ходов нет, статистика прошлого поиска не должна остаться
+    assert ai.get_best_move(BitboardBoard('4k3/8/8/8/8/8/5q2/7K w - - 0 1')) is None
+    stats = ai.last_stats
+    assert stats.move is None and stats.nodes_per_depth == [] and stats.to_dict()['pv'] == []
+
+
+def test_cutoff_heuristics_skip_en_passant():
+    board = BitboardBoard('4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 2')
+    ai = ChessAI(depth=2, color='white')
+    en_passant, quiet = ((3, 4), (2, 3)), ((7, 4), (7, 3))
+    ai._record_cutoff(board, en_passant, 3, 0, 'white', 0)
+    assert ai.beta_cutoffs == 1
+    assert en_passant not in ai.killers[0] and not any(ai.history[0])
+    ai._record_cutoff(board, quiet, 3, 0, 'white', 1)
+    assert ai.killers[0][0] == quiet and any(ai.history[0])
@@ -0,0 +1,35 @@
+from multiprocessing import shared_memory
+
+import pytest
+
+from ai_player import ChessAI
+from bitboard import BitboardBoard
+from perft import PERFT_SUITE
+
+
+def test_lazy_smp_search_and_close():
+    ai = ChessAI(depth=2, workers=2)
+    try:
+        processes = None
+        for _, fen, _ in PERFT_SUITE:
+            board = BitboardBoard(fen)
+            ai.set_color(board.turn)
+            move = ai.get_best_move(board)
+            # Помощники ищут ту же позицию, а не ту, что стоит на доске в момент отправки задания
+            assert move in board.legal_moves(board.turn)
+            assert board.fen() == fen
+            assert ai.last_stats.helper_nodes > 0
+            assert ai.last_stats.nodes + ai.last_stats.helper_nodes == ai.nodes_evaluated
+            # Все поиски идут на одном пуле
+            processes = processes or list(ai._pool._pool)
+            assert list(ai._pool._pool) == processes
+        name = ai.transposition_table._shm.name
+    finally:
+        ai.close()
+
+    assert ai._pool is None
+    assert not any(process.is_alive() for process in processes)
+    # Общая таблица освобождена вместе с блоком памяти
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=name)
+    ai.close()
@@ -0,0 +1,122 @@
+import pathlib
+
+import pytest
+
+from ai_player import ChessAI
+from bitboard import BitboardBoard, WHITE, BLACK, KING, PAWN
+from notation import parse_uci
+from tablebase import (KING_PAIRS, PACKED_SUFFIX, TABLE_SUFFIX, Tablebases, _Generator, generate, pack_table,
+                       table_index, table_size)
+
+
+@pytest.fixture(scope='module')
+def directory(tmp_path_factory):
+    # KPvK тянет за собой все наборы из 3 фигур (превращения), около полуминуты
+    path = tmp_path_factory.mktemp('tablebases')
+    generate(['KPvK'], str(path), log=lambda message: None)
+    return str(path)
+
+
+@pytest.fixture
+def tablebases(directory):
+    tablebases = Tablebases(directory)
+    yield tablebases
+    tablebases.close()
+
+
+def probe(tablebases, fen):
+    return tablebases.probe(BitboardBoard(fen))
+
+
+def test_table_sizes(directory):
+    assert len(KING_PAIRS[False]) == 462 and len(KING_PAIRS[True]) == 1806
+    assert table_size([KING, KING]) == 2 * 462
+    assert table_size([KING, KING, PAWN]) == 2 * 1806 * 48
+    with open(f"{directory}/KPvK{TABLE_SUFFIX}", 'rb') as table_file:
+        assert len(table_file.read()) == 2 * table_size([KING, KING, PAWN])
+
+
+@pytest.mark.parametrize('fen, expected', [
+    ('k7/8/1K6/8/8/8/8/6Q1 w - - 0 1', (1, 1)),         # Qg8#
+    ('k7/1Q6/1K6/8/8/8/8/8 b - - 0 1', (-1, 0)),       # мат уже стоит
+    ('k7/1Q6/8/8/8/8/8/7K b - - 0 1', (0, 0)),         # Kxb7
+    ('7k/5Q2/6K1/8/8/8/8/8 b - - 0 1', (0, 0)),        # пат
+    ('8/8/8/4k3/8/8/8/4KB2 w - - 0 1', (0, 0)),        # слона не хватает
+    ('4k3/8/4K3/4P3/8/8/8/8 w - - 0 1', None),         # король впереди пешки: выигрыш
+    ('4k3/4P3/4K3/8/8/8/8/8 b - - 0 1', (0, 0)),       # пат
+    ('k7/8/8/8/8/8/P7/7K w - - 0 1', (0, 0)),          # крайняя пешка, король в углу
+])
+def test_known_results(tablebases, fen, expected):
+    result = probe(tablebases, fen)
+    if expected is None:
+        assert result[0] == 1
+    else:
+        assert result == expected
+
+
+def test_colours_and_symmetry(tablebases):
+    # Та же позиция с переменой цветов и отражением по горизонтали и вертикали
+    assert probe(tablebases, 'k7/8/1K6/8/8/8/8/6Q1 w - - 0 1') == \
+        probe(tablebases, '6q1/8/8/8/8/1k6/8/K7 b - - 0 1')
+    assert probe(tablebases, '4k3/8/4K3/4P3/8/8/8/8 w - - 0 1') == \
+        probe(tablebases, '8/8/8/8/3p4/3k4/8/3K4 b - - 0 1')
+
+
+def test_no_table_for_castling_or_more_pieces(tablebases):
+    assert probe(tablebases, '4k3/8/8/8/8/8/8/R3K3 w Q - 0 1') is None
+    assert probe(tablebases, '4k3/8/8/8/8/8/8/RR2K3 w - - 0 1') is None
+
+
+def test_search_follows_tablebase(tablebases):
+    board = BitboardBoard('k7/8/1K6/8/8/8/8/6Q1 w - - 0 1')
+    ai = ChessAI(depth=1, color='white', tablebases=tablebases)
+    assert ai.get_best_move(board) == parse_uci(board, 'g1g8')
+    assert ai.last_stats.source == 'tablebase'
+
+
+def test_packed_table_is_unpacked_once(tmp_path, directory):
+    pack_table(f"{directory}/KRvK{TABLE_SUFFIX}")
+    packed = tmp_path / f"KRvK{PACKED_SUFFIX}"
+    packed.write_bytes((pathlib.Path(directory) / f"KRvK{PACKED_SUFFIX}").read_bytes())
+    tablebases = Tablebases(str(tmp_path))
+    assert tablebases.max_pieces == 3
+    assert probe(tablebases, '8/8/8/4k3/8/8/8/R3K3 w - - 0 1')[0] == 1
+    tablebases.close()
+    assert (tmp_path / f"KRvK{TABLE_SUFFIX}").exists()
+
+
+@pytest.mark.parametrize('fen, black_pawn', [
+    ('7k/8/8/8/4p3/8/3P4/4K3 w - - 0 1', 'e4'),
+    ('7k/8/8/8/2p5/8/3P4/4K3 w - - 0 1', 'c4'),
+    ('7k/8/8/8/5p2/8/3P4/4K3 w - - 0 1', 'f4'),
+])
+def test_en_passant_result(tablebases, fen, black_pawn):
+    # Белые играют d2-d4; взятие на проходе ведет в таблицу KPvK (с переменой цветов)
+    def lookup(name, ordered, stm):
+        return tablebases._table(name)[table_index(ordered, stm)]
+
+    generator = _Generator('KPvKP', lookup)
+    assert generator.pieces == [(WHITE, KING), (BLACK, KING), (WHITE, PAWN), (BLACK, PAWN)]
+    squares = [square(name) for name in ('e1', 'h8', 'd4', black_pawn)]
+    result = generator._en_passant_result(squares, 2)
+    if black_pawn == 'f4':
+        assert result is None
+        return
+
+    board = BitboardBoard(fen)
+    board.push(parse_uci(board, 'd2d4'))
+    board.push(parse_uci(board, black_pawn + 'd3'))
+    outcome, plies = tablebases.probe(board)
+    assert result == (-outcome, plies + 1 if outcome else 0)
+
+
+def square(name):
+    return (8 - int(name[1])) * 8 + 'abcdefgh'.index(name[0])
+
+
+def test_table_of_wrong_size_is_ignored(tmp_path):
+    # Файл старого формата (индекс 64^n) того же имени не читается
+    (tmp_path / f"KRvK{TABLE_SUFFIX}").write_bytes(bytes(2 * 2 * 64 ** 3))
+    tablebases = Tablebases(str(tmp_path))
+    assert probe(tablebases, '8/8/8/4k3/8/8/8/R3K3 w - - 0 1') is None
+    tablebases.close()
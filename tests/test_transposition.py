@@ -0,0 +1,78 @@
+import math
+import time
+
+import pytest
+
+from ai_player import ChessAI, MATE_SCORE, _score_from_tt, _score_to_tt
+from bitboard import BitboardBoard
+from perft import PERFT_SUITE
+from transposition import EXACT, LOWER, UPPER, TranspositionTable, SharedTranspositionTable
+
+
+@pytest.fixture(params=['local', 'shared'])
+def table(request):
+    if request.param == 'local':
+        yield TranspositionTable(1)
+        return
+    shared = SharedTranspositionTable(1)
+    yield shared
+    shared.close()
+
+
+def test_store_and_probe(table):
+    table.store(12345, 4, -250, UPPER, ((6, 4), (4, 4)))
+    assert table.probe(12345)[:5] == (12345, 4, -250, UPPER, ((6, 4), (4, 4)))
+    assert table.probe(12345 + table.size) is None
+    assert (table.probes, table.hits, table.collisions) == (2, 1, 1)
+
+
+def test_deeper_entry_of_current_search_is_kept(table):
+    table.store(7, 6, 10, EXACT, ((6, 4), (4, 4)))
+    table.store(7, 2, 99, LOWER, ((6, 3), (4, 3)))
+    table.store(7 + table.size, 1, 5, EXACT, None)
+    assert table.probe(7)[1:4] == (6, 10, EXACT)
+
+
+def test_entry_of_previous_search_is_replaced(table):
+    table.store(7, 6, 10, EXACT, ((6, 4), (4, 4)))
+    table.new_search()
+    table.store(7 + table.size, 1, 5, LOWER, None)
+    assert table.probe(7 + table.size)[1:4] == (1, 5, LOWER)
+
+
+def test_best_move_survives_store_without_move(table):
+    table.store(7, 2, 10, LOWER, ((7, 6), (5, 5)))
+    table.store(7, 3, 20, UPPER, None)
+    assert table.probe(7)[1:5] == (3, 20, UPPER, ((7, 6), (5, 5)))
+
+
+def test_mate_score_is_stored_relative_to_position():
+    # Мат через 3 полухода от позиции, найденной на глубине 5 от корня
+    at_root = MATE_SCORE - 8
+    stored = _score_to_tt(at_root, 5)
+    assert stored == MATE_SCORE - 3
+    assert _score_from_tt(stored, 2) == MATE_SCORE - 5
+    assert _score_from_tt(_score_to_tt(-at_root, 5), 2) == -(MATE_SCORE - 5)
+    assert _score_to_tt(150, 5) == 150
+
+
+def search(ai, board, depth, alpha, beta):
+    ai._start_search(None, time.perf_counter())
+    return ai._minimax_optimized(board, depth, alpha, beta, True)
+
+
+@pytest.mark.parametrize('fen', [fen for _, fen, _ in PERFT_SUITE[:4]])
+def test_bounds_from_windowed_searches(fen):
+    board = BitboardBoard(fen)
+    depth = 2
+    exact = search(ChessAI(depth, board.turn), board, depth, -math.inf, math.inf)
+
+    # Один ИИ с общей таблицей: отказы вверх и вниз оставляют в ней границы,
+    # которые не должны исказить последующие поиски
+    ai = ChessAI(depth, board.turn)
+    # Отказ вниз дает верхнюю границу оценки, отказ вверх - нижнюю
+    assert exact <= search(ai, board, depth, exact + 50, exact + 100) <= exact + 50
+    assert exact - 50 <= search(ai, board, depth, exact - 100, exact - 50) <= exact
+    assert search(ai, board, depth, exact - 1, exact + 1) == exact
+    assert search(ai, board, depth, -math.inf, math.inf) == exact
+    assert ai.transposition_table.probe(board.zobrist_key)[3] == EXACT
@@ -0,0 +1,118 @@
+import io
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from bitboard import BitboardBoard
+from board import START_FEN
+from notation import move_uci, parse_uci
+from perft import PERFT_SUITE
+from uci import UciEngine, _allocate_time, _parse_go
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize('fen', [fen for _, fen, _ in PERFT_SUITE])
+def test_move_uci_round_trip(fen):
+    board = BitboardBoard(fen)
+    moves = board.legal_moves(board.turn, underpromotions=True)
+    assert [parse_uci(board, move_uci(board, move)) for move in moves] == moves
+
+
+@pytest.mark.parametrize('fen, text, move', [
+    (START_FEN, 'g1f3', ((7, 6), (5, 5))),
+    ('r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1', 'e1g1', ((7, 4), (7, 6))),
+    ('4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1', 'e5d6', ((3, 4), (2, 3))),
+    ('8/1P6/8/8/8/8/k7/4K3 w - - 0 1', 'b7b8q', ((1, 1), (0, 1))),
+    ('8/1P6/8/8/8/8/k7/4K3 w - - 0 1', 'b7b8n', ((1, 1), (0, 1), 'Knight')),
+])
+def test_parse_uci(fen, text, move):
+    assert parse_uci(BitboardBoard(fen), text) == move
+
+
+@pytest.mark.parametrize('text', ['e2', 'e2e4x', 'e7e8k', 'z2e4', 'e2e5', 'e1g1'])
+def test_parse_uci_rejects(text):
+    with pytest.raises(ValueError):
+        parse_uci(BitboardBoard(), text)
+
+
+def test_parse_go():
+    assert _parse_go('wtime 60000 btime 30000 winc 1000 movestogo 20'.split()) == \
+        {'wtime': 60000, 'btime': 30000, 'winc': 1000, 'movestogo': 20}
+    assert _parse_go(['infinite']) == {'infinite': True}
+    assert _parse_go('ponder searchmoves e2e4 d2d4 mate 3'.split()) == \
+        {'ponder': True, 'searchmoves': ['e2e4', 'd2d4'], 'mate': 3}
+    with pytest.raises(ValueError):
+        _parse_go(['depth'])
+
+
+def test_allocate_time():
+    assert _allocate_time({'wtime': 60000, 'winc': 1000, 'movestogo': 20}, 'white') == 3500
+    assert _allocate_time({'wtime': 60000}, 'black') is None
+    assert _allocate_time({'btime': 40}, 'black') == 1
+
+
+def test_position_with_moves():
+    output = io.StringIO()
+    engine = UciEngine(output)
+    engine.handle('position startpos moves e2e4 c7c5 g1f3')
+    assert engine.board.fen() == 'rnbqkbnr/pp1ppppp/8/2p5/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq - 1 2'
+    engine.handle('position startpos moves e2e5')
+    assert 'Невозможный ход: e2e5' in output.getvalue()
+
+
+def test_engine_without_pygame():
+    # Движок отвечает на go и не загружает pygame
+    script = ('import sys, uci; uci.sys.stdin = iter(["uci", "position startpos", "go depth 1"]); '
+              'uci.main(); print("pygame" in sys.modules)')
+    lines = subprocess.run([sys.executable, '-c', script], cwd=ROOT, capture_output=True, text=True,
+                           timeout=60).stdout.splitlines()
+    assert 'uciok' in lines
+    assert any(line.startswith('bestmove ') and line != 'bestmove 0000' for line in lines)
+    assert lines[-1] == 'False'
+
+
+def wait_for(output, text, timeout=10.0):
+    deadline = time.perf_counter() + timeout
+    while text not in output.getvalue() and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    return text in output.getvalue()
+
+
+def test_infinite_waits_for_stop():
+    output = io.StringIO()
+    engine = UciEngine(output)
+    engine.handle('position startpos')
+    # Глубина 1 считается мгновенно, но bestmove можно отправить только после stop
+    engine.handle('go infinite depth 1')
+    assert not wait_for(output, 'bestmove', 0.3)
+    engine.handle('stop')
+    assert 'bestmove ' in output.getvalue()
+    engine.handle('quit')
+
+
+def test_ponder_waits_for_ponderhit():
+    output = io.StringIO()
+    engine = UciEngine(output)
+    engine.handle('position startpos moves e2e4')
+    engine.handle('go ponder depth 1')
+    assert not wait_for(output, 'bestmove', 0.3)
+    engine.handle('ponderhit')
+    assert wait_for(output, 'bestmove')
+    engine.handle('quit')
+
+
+def test_go_mate_and_searchmoves():
+    output = io.StringIO()
+    engine = UciEngine(output)
+    engine.handle('position fen k7/8/1K6/8/8/8/8/6Q1 w - - 0 1')
+    engine.handle('go mate 1 searchmoves g1g8')
+    engine.wait()
+    lines = output.getvalue().splitlines()
+    assert 'info string searchmoves не поддерживается, ищем по всем ходам' in lines
+    assert lines[-1] == 'bestmove g1g8'
+    assert any(' score mate 1 ' in line for line in lines)
+    engine.handle('quit')
@@ -0,0 +1,54 @@
+import random
+
+import pytest
+
+from bitboard import BitboardBoard
+from board import Board
+from notation import parse_uci
+
+
+@pytest.mark.parametrize('board_class', [Board, BitboardBoard])
+@pytest.mark.parametrize('seed', range(4))
+def test_incremental_key_matches_recomputed(board_class, seed):
+    rng = random.Random(seed)
+    board = board_class()
+    for _ in range(150):
+        moves = board.legal_moves(board.turn, underpromotions=True)
+        if not moves:
+            break
+        board.push(rng.choice(moves))
+        fresh = board_class(board.fen())
+        assert board.zobrist_key == fresh.zobrist_key
+        assert board.castling_rights() == board._compute_castling_rights()
+        assert board._piece_hash == board._compute_piece_hash()
+
+
+def play(board, moves):
+    for text in moves.split():
+        board.push(parse_uci(board, text))
+    return board.zobrist_key
+
+
+def test_transposition_gives_same_key():
+    assert play(BitboardBoard(), 'g1f3 g8f6 b1c3 b8c6') == play(BitboardBoard(), 'b1c3 b8c6 g1f3 g8f6')
+
+
+def test_key_depends_on_side_castling_and_en_passant():
+    keys = {BitboardBoard(fen).zobrist_key for fen in (
+        'r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1',
+        'r3k2r/8/8/8/8/8/8/R3K2R b KQkq - 0 1',
+        'r3k2r/8/8/8/8/8/8/R3K2R w Kkq - 0 1',
+        'r3k2r/8/8/8/8/8/8/R3K2R w - - 0 1',
+    )}
+    assert len(keys) == 4
+    assert BitboardBoard('4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1').zobrist_key != \
+        BitboardBoard('4k3/8/8/3pP3/8/8/8/4K3 w - - 0 1').zobrist_key
+
+
+def test_rook_moving_back_keeps_rights_lost():
+    # Ладья ушла и вернулась: позиция та же, но права рокировки (и ключ) - нет
+    board = BitboardBoard('r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1')
+    before = board.zobrist_key
+    play(board, 'h1h2 h8h7 h2h1 h7h8')
+    assert board.castling_rights() == 2 | 8
+    assert board.zobrist_key != before
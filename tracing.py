@@ -0,0 +1,87 @@
+"""Отладочная трассировка по категориям.
+
+Уровень каждой категории - обычный атрибут модуля, поэтому выключенная
+трассировка в горячем коде стоит одного сравнения, а сообщение даже не
+форматируется:
+
+    if tracing.castling >= tracing.DEBUG:
+        tracing.log('castling', tracing.DEBUG, f"...")
+
+Включить можно из кода (tracing.enable('search')) или переменной окружения
+CHESS_TRACE=castling:2,search. Записи печатаются в stderr; capture()
+дополнительно (или вместо печати) складывает их в кольцевой буфер.
+"""
+import collections
+import os
+import sys
+import time
+import traceback
+
+OFF, INFO, DEBUG = 0, 1, 2
+
+CATEGORIES = ('castling', 'moves', 'search')
+
+# Текущие уровни категорий
+castling = OFF
+moves = OFF
+search = OFF
+
+_buffer = None
+_echo = True
+
+
+def enable(category, level=DEBUG):
+    assert category in CATEGORIES, f"Неизвестная категория: {category}"
+    globals()[category] = level
+
+
+def disable(category=None):
+    """Выключить категорию, а без аргумента - все"""
+    for name in CATEGORIES if category is None else (category,):
+        enable(name, OFF)
+
+
+def capture(size=1000, echo=False):
+    """Собирать последние size записей в кольцевой буфер; echo - печатать их тоже"""
+    global _buffer, _echo
+    _buffer = collections.deque(maxlen=size)
+    _echo = echo
+
+
+def stop_capture():
+    """Выключить буфер и вернуть собранные записи [(время, категория, уровень, текст)]"""
+    global _buffer, _echo
+    records = captured()
+    _buffer = None
+    _echo = True
+    return records
+
+
+def captured():
+    return list(_buffer) if _buffer is not None else []
+
+
+def log(category, level, message, stack=False):
+    """Записать сообщение; уровень вызывающий код проверяет сам, до форматирования"""
+    if stack:
+        message += '\n' + ''.join(traceback.format_stack(limit=6)[:-1]).rstrip()
+    if _buffer is not None:
+        _buffer.append((time.perf_counter(), category, level, message))
+    if _echo:
+        print(f"[{category}] {message}", file=sys.stderr)
+
+
+def _configure_from_env(value):
+    # Ошибка в переменной окружения не должна ронять импорт: такие элементы пропускаем
+    for item in value.split(','):
+        name, _, level = item.strip().partition(':')
+        if not name:
+            continue
+        if name not in CATEGORIES or (level and not level.isdigit()):
+            print(f"CHESS_TRACE: пропущено '{item.strip()}' (категории: {', '.join(CATEGORIES)}; "
+                  f"уровень - число)", file=sys.stderr)
+            continue
+        enable(name, int(level) if level else DEBUG)
+
+
+_configure_from_env(os.environ.get('CHESS_TRACE', ''))
@@ -0,0 +1,189 @@
+import struct
+from multiprocessing import shared_memory
+
+# Тип оценки, сохраненной в таблице
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Грубая оценка памяти на одну запись: кортеж из 6 полей плюс ссылка в списке
+ENTRY_BYTES = 128
+
+
+class TranspositionTable:
+    """Таблица транспозиций фиксированного размера.
+
+    Запись - кортеж (key, depth, value, flag, move, age). Ячейка выбирается
+    по младшим битам Zobrist-ключа. Замена: более глубокая запись текущего
+    поиска не вытесняется более мелкой (ни для другой позиции, ни для той же),
+    а записи прошлых поисков (другой age)
+    заменяются всегда, поэтому таблицу можно не очищать между ходами.
+    """
+
+    def __init__(self, size_mb=16):
+        entries = max(1, size_mb * 1024 * 1024 // ENTRY_BYTES)
+        self.size = 1 << (entries.bit_length() - 1)
+        self.mask = self.size - 1
+        self.entries = [None] * self.size
+        self.age = 0
+
+        self.probes = 0
+        self.hits = 0
+        self.collisions = 0
+        self.stores = 0
+
+    def new_search(self):
+        """Начало нового поиска: старые записи становятся кандидатами на замену"""
+        self.age = (self.age + 1) & 0xFF
+        self.probes = 0
+        self.hits = 0
+        self.collisions = 0
+        self.stores = 0
+
+    def clear(self):
+        self.entries = [None] * self.size
+
+    def probe(self, key):
+        self.probes += 1
+        entry = self.entries[key & self.mask]
+        if entry is None:
+            return None
+        if entry[0] != key:
+            self.collisions += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def store(self, key, depth, value, flag, move):
+        index = key & self.mask
+        entry = self.entries[index]
+        if entry is not None and entry[5] == self.age and entry[1] > depth:
+            return
+        if entry is not None and entry[0] == key and move is None:
+            # Не теряем лучший ход, найденный раньше для этой же позиции
+            move = entry[4]
+        self.entries[index] = (key, depth, value, flag, move, self.age)
+        self.stores += 1
+
+    def usage(self):
+        """Доля занятых ячеек (в промилле), как hashfull в UCI"""
+        sample = self.entries[:1000]
+        return sum(1 for entry in sample if entry is not None) * 1000 // len(sample)
+
+
+# Разделяемая таблица: запись - два 64-битных слова (key ^ data, data).
+# data: value (32 бита со сдвигом), depth (8), flag (2), age (6), move (16)
+SHARED_ENTRY = struct.Struct('<QQ')
+_VALUE_OFFSET = 1 << 31
+_PROMOTIONS = [None, 'Queen', 'Rook', 'Bishop', 'Knight']
+
+
+def encode_move(move):
+    if move is None:
+        return 0
+    (from_row, from_col), (to_row, to_col) = move[0], move[1]
+    promotion = _PROMOTIONS.index(move[2]) if len(move) > 2 else 0
+    # +1, чтобы ход a8a8 (все нули) не путался с отсутствием хода
+    return ((promotion << 12) | ((from_row * 8 + from_col) << 6) | (to_row * 8 + to_col)) + 1
+
+
+def decode_move(code):
+    if code == 0:
+        return None
+    code -= 1
+    from_sq = (code >> 6) & 63
+    to_sq = code & 63
+    move = (divmod(from_sq, 8), divmod(to_sq, 8))
+    promotion = code >> 12
+    if promotion:
+        move += (_PROMOTIONS[promotion],)
+    return move
+
+
+class SharedTranspositionTable:
+    """Таблица транспозиций в multiprocessing.shared_memory для поиска в несколько процессов.
+
+    Интерфейс тот же, что у TranspositionTable. Записи пишутся без блокировок:
+    в первом слове хранится key ^ data, поэтому запись, порванная
+    одновременной записью другого процесса, просто не проходит проверку
+    ключа. При передаче в другой процесс (pickle) таблица подключается
+    к тому же блоку памяти по имени.
+    """
+
+    def __init__(self, size_mb=16, name=None, size=None):
+        if name is None:
+            entries = max(1, size_mb * 1024 * 1024 // SHARED_ENTRY.size)
+            self.size = 1 << (entries.bit_length() - 1)
+            self._shm = shared_memory.SharedMemory(create=True, size=self.size * SHARED_ENTRY.size)
+            self._owner = True
+        else:
+            self.size = size
+            self._shm = shared_memory.SharedMemory(name=name)
+            self._owner = False
+        self.mask = self.size - 1
+        self._buf = self._shm.buf
+        self.age = 0
+
+        self.probes = 0
+        self.hits = 0
+        self.collisions = 0
+        self.stores = 0
+
+    def __getstate__(self):
+        return {'name': self._shm.name, 'size': self.size, 'age': self.age}
+
+    def __setstate__(self, state):
+        self.__init__(name=state['name'], size=state['size'])
+        self.age = state['age']
+
+    def new_search(self):
+        self.age = (self.age + 1) & 0x3F
+        self.probes = 0
+        self.hits = 0
+        self.collisions = 0
+        self.stores = 0
+
+    def clear(self):
+        self._buf[:] = bytes(len(self._buf))
+
+    def probe(self, key):
+        self.probes += 1
+        checked, data = SHARED_ENTRY.unpack_from(self._buf, (key & self.mask) * SHARED_ENTRY.size)
+        if data == 0 and checked == 0:
+            return None
+        if checked ^ data != key:
+            self.collisions += 1
+            return None
+        self.hits += 1
+        return (key, (data >> 32) & 0xFF, (data & 0xFFFFFFFF) - _VALUE_OFFSET,
+                (data >> 40) & 0x3, decode_move(data >> 48), (data >> 42) & 0x3F)
+
+    def store(self, key, depth, value, flag, move):
+        offset = (key & self.mask) * SHARED_ENTRY.size
+        checked, data = SHARED_ENTRY.unpack_from(self._buf, offset)
+        same_key = data != 0 and checked ^ data == key
+        if data != 0 and (data >> 42) & 0x3F == self.age and (data >> 32) & 0xFF > depth:
+            return
+        move_code = encode_move(move)
+        if same_key and move_code == 0:
+            move_code = data >> 48
+        data = ((int(value) + _VALUE_OFFSET) & 0xFFFFFFFF) | (min(depth, 0xFF) << 32) \
+            | (flag << 40) | (self.age << 42) | (move_code << 48)
+        SHARED_ENTRY.pack_into(self._buf, offset, key ^ data, data)
+        self.stores += 1
+
+    def usage(self):
+        sample = min(1000, self.size)
+        used = 0
+        for index in range(sample):
+            if SHARED_ENTRY.unpack_from(self._buf, index * SHARED_ENTRY.size)[1]:
+                used += 1
+        return used * 1000 // sample
+
+    def close(self):
+        """Отключиться от памяти; владелец таблицы также освобождает блок. Повторный вызов ничего не делает"""
+        if self._buf is None:
+            return
+        self._buf.release()
+        self._buf = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
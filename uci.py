@@ -0,0 +1,277 @@
+import sys
+import threading
+import time
+
+# Модули доски и поиска импортируются при первой надобности: ответ на
+# "uci" не ждет загрузки таблиц оценки, Zobrist-ключей и NumPy
+
+ENGINE_NAME = 'chess-game-project'
+ENGINE_AUTHOR = 'ItzVavan, Rizzalenok, RusNikUr'
+
+# Глубина для поиска без ограничения по глубине (movetime, nodes, infinite)
+MAX_DEPTH = 64
+
+# Доля оставшегося времени на ход, если GUI не прислал movestogo
+MOVES_TO_GO = 30
+# Запас на задержки GUI и вывод
+MOVE_OVERHEAD_MS = 50
+
+# Опции UCI: имя -> (тип, значение по умолчанию, минимум, максимум)
+OPTIONS = {
+    'Hash': ('spin', 16, 1, 1024),
+    'Threads': ('spin', 1, 1, 64),
+    'OwnBook': ('check', True, None, None),
+    # Поиск на времени соперника (go ponder / ponderhit) есть всегда, опция - для GUI
+    'Ponder': ('check', False, None, None),
+}
+
+# Параметры go без значения и параметры со списком ходов до следующего параметра
+GO_FLAGS = ('infinite', 'ponder')
+GO_VALUES = ('depth', 'nodes', 'movetime', 'wtime', 'btime', 'winc', 'binc', 'movestogo', 'mate')
+GO_LISTS = ('searchmoves',)
+
+
+class UciEngine:
+    """Движок по протоколу UCI: команды построчно, ответы в output"""
+
+    def __init__(self, output=None):
+        self.output = output or sys.stdout
+        self.options = {name: option[1] for name, option in OPTIONS.items()}
+        self.board = None
+        self.ai = None
+        self._search_thread = None
+        self._cancel_event = None
+        self._ponder_event = None
+        self._infinite = False
+        self._search_start = 0.0
+        self._output_lock = threading.Lock()
+
+    def send(self, line):
+        with self._output_lock:
+            self.output.write(line + '\n')
+            self.output.flush()
+
+    def handle(self, line):
+        """Выполнить команду; False - пора завершаться"""
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+        if command == 'quit':
+            self.stop()
+            if self.ai is not None:
+                self.ai.close()
+            return False
+        handler = getattr(self, '_cmd_' + command, None)
+        if handler is None:
+            self.send(f"info string Неизвестная команда: {command}")
+        else:
+            try:
+                handler(args)
+            except ValueError as error:
+                self.send(f"info string {error}")
+        return True
+
+    def stop(self):
+        """Прервать идущий поиск и дождаться bestmove"""
+        if self._search_thread is not None:
+            self._cancel_event.set()
+            self._search_thread.join()
+            self._search_thread = None
+
+    def wait(self):
+        """Дождаться конца поиска с ограничением (ввод закончился); бесконечный прерывается"""
+        if self._search_thread is not None and not self._infinite and not self._pondering():
+            self._search_thread.join()
+        self.stop()
+
+    def _pondering(self):
+        return self._ponder_event is not None and not self._ponder_event.is_set()
+
+    def _cmd_uci(self, args):
+        self.send(f"id name {ENGINE_NAME}")
+        self.send(f"id author {ENGINE_AUTHOR}")
+        for name, (kind, default, low, high) in OPTIONS.items():
+            if kind == 'spin':
+                self.send(f"option name {name} type spin default {default} min {low} max {high}")
+            else:
+                self.send(f"option name {name} type check default {str(default).lower()}")
+        self.send('uciok')
+
+    def _cmd_isready(self, args):
+        self._engine()
+        self.send('readyok')
+
+    def _cmd_debug(self, args):
+        pass
+
+    def _cmd_setoption(self, args):
+        # setoption name <имя> [value <значение>]
+        if 'name' not in args:
+            raise ValueError("setoption без name")
+        rest = args[args.index('name') + 1:]
+        if 'value' in rest:
+            name = ' '.join(rest[:rest.index('value')])
+            value = ' '.join(rest[rest.index('value') + 1:])
+        else:
+            name, value = ' '.join(rest), None
+        if name not in OPTIONS:
+            raise ValueError(f"Неизвестная опция: {name}")
+        kind, _, low, high = OPTIONS[name]
+        if kind == 'spin':
+            self.options[name] = min(max(int(value), low), high)
+        else:
+            self.options[name] = value == 'true'
+        # Движок с новыми настройками создастся при следующем поиске
+        self.stop()
+        if self.ai is not None:
+            self.ai.close()
+            self.ai = None
+
+    def _cmd_ucinewgame(self, args):
+        self.stop()
+        if self.ai is not None:
+            self.ai.transposition_table.clear()
+
+    def _cmd_position(self, args):
+        # position startpos|fen <FEN> [moves <ход> ...]
+        from bitboard import BitboardBoard
+        from board import START_FEN
+        from notation import parse_uci
+
+        self.stop()
+        if 'moves' in args:
+            moves = args[args.index('moves') + 1:]
+            args = args[:args.index('moves')]
+        else:
+            moves = []
+        if args[:1] == ['startpos']:
+            fen = START_FEN
+        elif args[:1] == ['fen']:
+            fen = ' '.join(args[1:])
+        else:
+            raise ValueError("position: нужно startpos или fen")
+
+        board = BitboardBoard()
+        board.set_fen(fen)
+        for text in moves:
+            board.push(parse_uci(board, text))
+        self.board = board
+
+    def _cmd_go(self, args):
+        self.stop()
+        if self.board is None:
+            self._cmd_position(['startpos'])
+        limits = _parse_go(args)
+        if 'searchmoves' in limits:
+            self.send("info string searchmoves не поддерживается, ищем по всем ходам")
+        ai = self._engine()
+
+        ai.set_color(self.board.turn)
+        # Мат в N ходов находится поиском на 2N - 1 полуходов
+        ai.depth = limits.get('depth', 2 * limits['mate'] - 1 if limits.get('mate') else MAX_DEPTH)
+        ai.max_nodes = limits.get('nodes')
+        ai.time_limit_ms = limits.get('movetime') or _allocate_time(limits, self.board.turn)
+        ai.on_iteration = self._report_iteration
+        self._infinite = limits.get('infinite', False)
+        # go ponder: ищем на времени соперника до ponderhit (или stop)
+        self._ponder_event = threading.Event() if limits.get('ponder') else None
+
+        self._cancel_event = threading.Event()
+        self._search_start = time.perf_counter()
+        self._search_thread = threading.Thread(target=self._search,
+                                               args=(self.board, self._cancel_event, self._ponder_event),
+                                               daemon=True)
+        self._search_thread.start()
+
+    def _cmd_stop(self, args):
+        self.stop()
+
+    def _cmd_ponderhit(self, args):
+        # Соперник сыграл ожидаемый ход: дальше обычный поиск со своим бюджетом
+        if self._ponder_event is not None:
+            self._ponder_event.set()
+
+    def _engine(self):
+        if self.ai is None:
+            from ai_player import ChessAI
+            from book import open_book
+            from tablebase import Tablebases
+
+            self.ai = ChessAI(MAX_DEPTH, tt_size_mb=self.options['Hash'], workers=self.options['Threads'],
+                              book=open_book() if self.options['OwnBook'] else None,
+                              tablebases=Tablebases())
+        return self.ai
+
+    def _search(self, board, cancel_event, ponder_event):
+        from notation import move_uci
+
+        move = None
+        try:
+            move = self.ai.get_best_move(board, cancel_event, ponder_event)
+            # При go infinite и до ponderhit bestmove отправлять нельзя, даже если
+            # поиск кончился сам (ход из книги, таблицы, предел глубины)
+            while not cancel_event.is_set() and (self._infinite or self._pondering()):
+                cancel_event.wait(0.05)
+        finally:
+            # GUI ждет bestmove после каждого go, даже если поиск упал
+            self.send(f"bestmove {move_uci(board, move) if move else '0000'}")
+
+    def _report_iteration(self, depth, value, move):
+        from ai_player import mate_in
+        from notation import line_uci
+
+        elapsed = time.perf_counter() - self._search_start
+        nodes = self.ai.nodes_evaluated
+        names = line_uci(self.board, self.ai.principal_variation(self.board, move, depth))
+        mate = mate_in(value)
+        score = f"mate {mate}" if mate is not None else f"cp {value}"
+        self.send(f"info depth {depth} score {score} nodes {nodes} "
+                  f"nps {int(nodes / elapsed) if elapsed > 0 else 0} time {int(elapsed * 1000)} "
+                  f"hashfull {self.ai.transposition_table.usage()} pv {' '.join(names)}")
+
+
+def _parse_go(args):
+    """Параметры go: GO_FLAGS -> True, GO_VALUES -> число, searchmoves -> список ходов"""
+    limits = {}
+    index = 0
+    while index < len(args):
+        name = args[index]
+        if name in GO_FLAGS:
+            limits[name] = True
+        elif name in GO_VALUES:
+            if index + 1 >= len(args):
+                raise ValueError(f"go: нет значения {name}")
+            limits[name] = int(args[index + 1])
+            index += 1
+        elif name in GO_LISTS:
+            moves = []
+            while index + 1 < len(args) and args[index + 1] not in GO_FLAGS + GO_VALUES + GO_LISTS:
+                moves.append(args[index + 1])
+                index += 1
+            limits[name] = moves
+        index += 1
+    return limits
+
+
+def _allocate_time(limits, color):
+    """Время на ход из оставшегося на часах или None, если часов нет"""
+    remaining = limits.get('wtime' if color == 'white' else 'btime')
+    if remaining is None or limits.get('infinite'):
+        return None
+    increment = limits.get('winc' if color == 'white' else 'binc', 0)
+    budget = remaining // limits.get('movestogo', MOVES_TO_GO) + increment // 2
+    return max(1, min(budget, remaining - MOVE_OVERHEAD_MS))
+
+
+def main():
+    engine = UciEngine()
+    for line in sys.stdin:
+        if not engine.handle(line):
+            break
+    engine.wait()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,38 @@
+import random
+
+# Фиксированное зерно: ключи одинаковы при каждом запуске, их можно
+# сохранять на диск вместе с позициями
+_rng = random.Random(0x5EED_C4E55)
+
+
+def _random64():
+    return _rng.getrandbits(64)
+
+
+PIECE_NAMES = ['Pawn', 'Knight', 'Bishop', 'Rook', 'Queen', 'King']
+
+# PIECE_KEYS[(color, name)][row * 8 + col]
+PIECE_KEYS = {
+    (color, name): [_random64() for _ in range(64)]
+    for color in ('white', 'black')
+    for name in PIECE_NAMES
+}
+
+# Те же ключи по целочисленным кодам: PIECE_KEY_TABLE[side][kind][sq]
+PIECE_KEY_TABLE = [[PIECE_KEYS[(color, name)] for name in PIECE_NAMES] for color in ('white', 'black')]
+
+SIDE_KEY = _random64()
+
+# Биты прав рокировки: белые O-O, белые O-O-O, черные O-O, черные O-O-O
+CASTLING_KEYS = [0] * 16
+_castling_bits = [_random64() for _ in range(4)]
+for _mask in range(16):
+    for _bit in range(4):
+        if _mask & (1 << _bit):
+            CASTLING_KEYS[_mask] ^= _castling_bits[_bit]
+
+EN_PASSANT_KEYS = [_random64() for _ in range(8)]
+
+
+def piece_key(piece, row, col):
+    return PIECE_KEYS[(piece.color, piece.name)][row * 8 + col]